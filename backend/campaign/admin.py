@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 def approve_reject_campaigns(queryset, action):
     count, status_message = None, None
     qs = queryset.filter(status=Campaign.CampaignStatusChoice.ON_MODERATION)
-    user_ids = list(qs.values_list('user_id', flat=True).distinct())
+    campaigns = list(qs.values_list('id', 'user_id'))
 
     if action == 'approve':
         count = qs.update(status=Campaign.CampaignStatusChoice.ACTIVE)
@@ -22,9 +22,13 @@ def approve_reject_campaigns(queryset, action):
         count = qs.update(status=Campaign.CampaignStatusChoice.REJECTED)
         status_message = 'rejected'
 
-    from main_app.utils import invalidate_cache
-    for uid in user_ids:
-        invalidate_cache(f'campaign_list_{uid}', f'my_campaigns_{uid}')
+    from main_app.caching import PUBLIC_CAMPAIGNS, invalidate_namespaces, user_campaigns
+    from .representations import invalidate_campaign_representations
+    from .warming import schedule_cache_warm
+    invalidate_campaign_representations(*(campaign_id for campaign_id, _ in campaigns))
+    invalidate_namespaces(PUBLIC_CAMPAIGNS, *(user_campaigns(uid) for _, uid in campaigns))
+    if campaigns:
+        schedule_cache_warm(*(campaign_id for campaign_id, _ in campaigns))
 
     logger.info(f'{count} campaign(s) {status_message}.')
     return f'{count} campaign(s) {status_message}.'
@@ -39,7 +43,9 @@ class CampaignDocumentInline(admin.TabularInline):
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'status', 'created_at', 'deadline')
+    list_select_related = ('user',)
     list_filter = ('status',)
+    raw_id_fields = ('user',)
     inlines = [CampaignDocumentInline]
     actions = ['approve_campaigns', 'reject_campaigns']
 
@@ -57,4 +63,6 @@ class CampaignAdmin(admin.ModelAdmin):
 @admin.register(CampaignDocument)
 class CampaignDocumentAdmin(admin.ModelAdmin):
     list_display = ('campaign', 'document', 'uploaded_at')
+    list_select_related = ('campaign',)
+    raw_id_fields = ('campaign',)
     readonly_fields = ('uploaded_at',)
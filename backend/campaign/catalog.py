@@ -0,0 +1,317 @@
+"""
+In-process snapshot of the public campaign catalog.
+
+Each worker keeps the fields public listings filter and sort on (status, goal,
+raised amount, deadline) for every public campaign in typed arrays, one per column,
+with each sort order precomputed as an array of row positions per status. A filtered,
+sorted page is then a slice of one of those arrays, or a merge of a few, instead of
+a query sorting the campaign table; the rows themselves come from the per-object
+representation cache.
+
+Snapshots are immutable and replaced whole, so readers never lock; a worker refreshes
+its snapshot in a background thread while requests keep reading the current one.
+Refreshes are incremental, from `CampaignChange`, a log the database appends to on
+every write to status, goal and deadline: only the changed campaigns are read again,
+and patched into a copy of the snapshot's sort orders rather than sorted anew. The log
+is read by writing transaction rather than by id, so a change whose transaction
+commits late is still picked up: each refresh reads the changes of every transaction
+that was still running at the previous one. Snapshots are also rebuilt in full every
+`CATALOG_FULL_REFRESH_INTERVAL`, which bounds the effect of pruned log rows.
+
+Raised amounts change with every donation, so they are not logged, keeping the log
+off the donation path: the raised order is as of the last time a campaign was read,
+by a full rebuild or after a logged change, and so at most
+`CATALOG_FULL_REFRESH_INTERVAL` old. The amounts listed come from the representation
+cache and are current. With `DONATION_COUNTER_SHARDS` the amounts read include those
+still in counter shards.
+"""
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+import heapq
+from itertools import compress, islice
+from operator import itemgetter
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Campaign, CampaignChange
+from .serializers import CATALOG_ORDERINGS
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_CODES = {status: code for code, status in enumerate(Campaign.PUBLIC_STATUSES)}
+# Status code of a row whose campaign left the catalog since the last full build.
+TOMBSTONE = -1
+# Share of a snapshot's rows past which changes are applied by a full sort rather than patched in.
+PATCH_MAX_SHARE = 0.1
+
+
+def _cents(amount):
+    return int(amount * 100)
+
+
+class CatalogSnapshot:
+    """
+    Immutable column arrays of public campaigns with precomputed sort orders.
+
+    A full build holds the campaigns in ascending id order. A patched snapshot appends
+    new campaigns and keeps rows that left the catalog as tombstones, out of every
+    order, until the next full build.
+    """
+
+    __slots__ = ('ids', 'statuses', 'goal_cents', 'raised_cents', 'deadlines', 'orders', 'rows', 'live')
+
+    def __init__(self, records):
+        records = sorted(records, key=itemgetter(0))
+        ids, statuses, goal_cents, raised_cents, deadlines = zip(*records) if records else ((),) * 5
+        self.ids = array('q', ids)
+        self.statuses = array('b', statuses)
+        self.goal_cents = array('q', goal_cents)
+        self.raised_cents = array('q', raised_cents)
+        self.deadlines = array('i', deadlines)
+        self.rows = {campaign_id: position for position, campaign_id in enumerate(self.ids)}
+        self.live = len(records)
+
+        # orders[field][status code] holds row positions ascending by (field, id); key None holds every status.
+        self.orders = {}
+        for field in CATALOG_ORDERINGS:
+            # Sorting is stable and rows are in id order, so ties stay ordered by id.
+            positions = range(len(records)) if field == 'id' else sorted(
+                range(len(records)), key=self._column(field).__getitem__,
+            )
+            positions = array('i', positions)
+            status_order = array('b', map(self.statuses.__getitem__, positions))
+            self.orders[field] = {None: positions, **{
+                code: array('i', compress(positions, map(code.__eq__, status_order)))
+                for code in STATUS_CODES.values()
+            }}
+
+    def _column(self, field):
+        return {'goal_amount': self.goal_cents, 'raised_amount': self.raised_cents, 'deadline': self.deadlines}[field]
+
+    def sort_key(self, field):
+        """Return the key ordering row positions by (field, id)."""
+        ids = self.ids
+        if field == 'id':
+            return ids.__getitem__
+        column = self._column(field)
+
+        def key(position):
+            return column[position], ids[position]
+        return key
+
+    def records(self):
+        """Return the snapshot's live rows as (id, status code, goal cents, raised cents, deadline ordinal) tuples."""
+        rows = zip(self.ids, self.statuses, self.goal_cents, self.raised_cents, self.deadlines)
+        return (record for record in rows if record[1] != TOMBSTONE)
+
+    def patched(self, campaign_ids, records):
+        """
+        Return a new snapshot with the rows of `campaign_ids` replaced by `records`.
+
+        `records` holds the campaigns still public. The arrays are copied and only the
+        changed rows are moved in the sort orders, found and inserted by bisection, so
+        the cost grows with the number of changes rather than the size of the catalog.
+        Past `PATCH_MAX_SHARE` of the rows it is rebuilt and sorted instead.
+        """
+        if len(campaign_ids) > len(self) * PATCH_MAX_SHARE:
+            return CatalogSnapshot([record for record in self.records() if record[0] not in campaign_ids] + records)
+
+        snapshot = object.__new__(CatalogSnapshot)
+        for name in ('ids', 'statuses', 'goal_cents', 'raised_cents', 'deadlines'):
+            setattr(snapshot, name, array(getattr(self, name).typecode, getattr(self, name)))
+        snapshot.rows = dict(self.rows)
+        snapshot.live = self.live
+        snapshot.orders = {
+            field: {code: array('i', positions) for code, positions in by_status.items()}
+            for field, by_status in self.orders.items()
+        }
+        snapshot._patch(campaign_ids, {record[0]: record for record in records})
+        return snapshot
+
+    def _patch(self, campaign_ids, records):
+        for campaign_id in campaign_ids:
+            position = self.rows.get(campaign_id)
+            if position is not None and self.statuses[position] != TOMBSTONE:
+                # Found by its current (field, id) key, which is unique, before the columns change.
+                for field, by_status in self.orders.items():
+                    key = self.sort_key(field)
+                    for positions in (by_status[None], by_status[self.statuses[position]]):
+                        del positions[bisect_left(positions, key(position), key=key)]
+                self.statuses[position] = TOMBSTONE
+                self.live -= 1
+
+            record = records.get(campaign_id)
+            if record is None:
+                continue
+            if position is None:
+                position = self.rows[campaign_id] = len(self.ids)
+                for column in (self.ids, self.statuses, self.goal_cents, self.raised_cents, self.deadlines):
+                    column.append(0)
+            (self.ids[position], self.statuses[position], self.goal_cents[position],
+             self.raised_cents[position], self.deadlines[position]) = record
+            self.live += 1
+
+            for field, by_status in self.orders.items():
+                key = self.sort_key(field)
+                for positions in (by_status[None], by_status[record[1]]):
+                    positions.insert(bisect_left(positions, key(position), key=key), position)
+
+    def select(self, statuses=None, ordering='-id'):
+        """Return a `CatalogSelection` of the campaigns in `statuses` (all when None) sorted by `ordering`."""
+        return CatalogSelection(self, statuses, ordering)
+
+    def __len__(self):
+        return self.live
+
+
+class CatalogSelection:
+    """A lazily sliced, sorted selection of catalog ids; `len()` and slicing are all pagination needs."""
+
+    def __init__(self, snapshot, statuses, ordering):
+        self.snapshot = snapshot
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        orders = snapshot.orders[self.field]
+        if statuses is None:
+            self.parts = [orders[None]]
+        else:
+            self.parts = [orders[STATUS_CODES[status]] for status in dict.fromkeys(statuses)]
+
+    def __len__(self):
+        return sum(len(part) for part in self.parts)
+
+    def _positions(self):
+        parts = [reversed(part) if self.descending else part for part in self.parts]
+        if len(parts) == 1:
+            return parts[0]
+
+        return heapq.merge(*parts, key=self.snapshot.sort_key(self.field), reverse=self.descending)
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice):
+            raise TypeError('Catalog selections only support slicing.')
+        ids = self.snapshot.ids
+        return [ids[position] for position in islice(self._positions(), page.start, page.stop)]
+
+
+def _public_records(campaigns):
+    campaigns = campaigns.public()
+    fields = ['id', 'status', 'goal_amount', 'deadline', 'raised_amount']
+    if settings.DONATION_COUNTER_SHARDS:
+        # Rank by the amounts still in counter shards too, as the listed representations show them.
+        campaigns = campaigns.with_pending_raised()
+        fields.append('pending_raised')
+    return [
+        (campaign_id, STATUS_CODES[status], _cents(goal), _cents(sum(raised)), deadline.toordinal())
+        for campaign_id, status, goal, deadline, *raised in campaigns.values_list(*fields)
+    ]
+
+
+def _transaction_horizon():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def _changes_since(horizon):
+    """
+    Return the current transaction horizon and the changes logged by transactions at or past `horizon`.
+
+    Every transaction before a horizon had ended when it was read, so changes read
+    after it can only come from transactions at or past it.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH horizon AS (SELECT txid_snapshot_xmin(txid_current_snapshot()) AS xmin)
+            SELECT horizon.xmin, change.id, change.campaign_id, change.txid
+            FROM horizon
+            LEFT JOIN campaign_campaignchange AS change ON change.txid >= %s
+            """,
+            [horizon],
+        )
+        rows = cursor.fetchall()
+    return rows[0][0], [row[1:] for row in rows if row[1] is not None]
+
+
+class CampaignCatalog:
+    """A worker's current `CatalogSnapshot`, refreshed from the change log at most every `CATALOG_REFRESH_INTERVAL`."""
+
+    def __init__(self):
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._built_at = None
+        self._horizon = None
+        # Change ids at or past the horizon already applied, so they are not applied twice.
+        self._seen = {}
+
+    def get(self):
+        """Return the current snapshot; a due refresh runs in the background meanwhile."""
+        if self.snapshot is None:
+            with self._lock:
+                if self.snapshot is None:
+                    self.refresh()
+        elif time.monotonic() - self._checked_at >= settings.CATALOG_REFRESH_INTERVAL:
+            # Only one refresh runs at a time; requests keep reading the snapshot they have.
+            if self._lock.acquire(blocking=False):
+                threading.Thread(target=self._refresh_in_background, name='catalog-refresh', daemon=True).start()
+        return self.snapshot
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Failed to refresh the campaign catalog')
+        finally:
+            self._checked_at = time.monotonic()
+            connection.close()
+            self._lock.release()
+
+    def refresh(self, full=False):
+        """Apply the logged changes to a new snapshot, or rebuild it from the campaign table."""
+        now = time.monotonic()
+        if full or self.snapshot is None or now - self._built_at >= settings.CATALOG_FULL_REFRESH_INTERVAL:
+            self._rebuild()
+        else:
+            self._apply_changes()
+        self._checked_at = now
+
+    def _rebuild(self):
+        # Read before the campaigns: changes after it are applied again by the next refresh.
+        self._horizon = _transaction_horizon()
+        self._seen = {}
+        self.snapshot = CatalogSnapshot(_public_records(Campaign.objects.all()))
+        self._built_at = time.monotonic()
+
+    def _apply_changes(self):
+        horizon, changes = _changes_since(self._horizon)
+        new = [(change_id, campaign_id) for change_id, campaign_id, _ in changes if change_id not in self._seen]
+        self._seen = {change_id: txid for change_id, _, txid in changes if txid >= horizon}
+        self._horizon = horizon
+        if not new:
+            return
+
+        changed = {campaign_id for _, campaign_id in new}
+        self.snapshot = self.snapshot.patched(changed, _public_records(Campaign.objects.filter(id__in=changed)))
+
+
+_catalog = CampaignCatalog()
+
+
+def get_catalog():
+    """Return this worker's public campaign catalog snapshot, refreshed when due."""
+    return _catalog.get()
+
+
+def prune_campaign_changes():
+    """Delete change log rows older than `CATALOG_CHANGE_RETENTION`; returns how many were deleted."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CATALOG_CHANGE_RETENTION)
+    return CampaignChange.objects.filter(changed_at__lt=cutoff).delete()[0]
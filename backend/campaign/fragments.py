@@ -0,0 +1,115 @@
+"""
+Cached fragments the campaign list is assembled from.
+
+A user's campaign list is every public campaign plus the user's own campaigns that
+are not public (on moderation or rejected). The ids of public campaigns are the
+same for everyone, so they are cached once, as fragments covering fixed ranges of
+ids ("buckets"), under the public namespace. Only the ids of the user's non-public
+campaigns are cached per user. A page merges both by `-id` and takes the campaigns'
+representations from the per-object cache, so cache memory grows with the catalog
+plus per-user ownership rather than with users times the catalog.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Max
+
+from main_app.caching import PUBLIC_CAMPAIGNS, get_many_or_build, get_or_build, user_campaigns, versioned_key
+
+from .models import Campaign
+from .representations import campaign_representations
+
+# Buckets fetched per cache round trip when walking the catalog, doubled on every
+# round up to the maximum so sparse id ranges are crossed quickly.
+BUCKETS_PER_FETCH = 4
+MAX_BUCKETS_PER_FETCH = 64
+
+
+def _ids(queryset):
+    return list(queryset.order_by('-id').values_list('id', flat=True))
+
+
+def _public_head():
+    """Return the highest id of a public campaign, or 0 when there is none."""
+    return get_or_build(
+        versioned_key('campaign_public_head', PUBLIC_CAMPAIGNS),
+        lambda: Campaign.objects.public().aggregate(head=Max('id'))['head'] or 0,
+    )
+
+
+def _public_buckets(indexes):
+    """Return the public campaign ids of each bucket, newest first, building missing buckets from one query."""
+    bucket_size = settings.CAMPAIGN_FRAGMENT_BUCKET_SIZE
+    prefix = versioned_key('campaign_public_bucket', PUBLIC_CAMPAIGNS)
+    keys = {index: f'{prefix}:{index}' for index in indexes}
+    indexes_by_key = {key: index for index, key in keys.items()}
+
+    def build(missing_keys):
+        missing = [indexes_by_key[key] for key in missing_keys]
+        filled = {index: [] for index in missing}
+        campaigns = Campaign.objects.public().filter(
+            id__gte=min(missing) * bucket_size,
+            id__lt=(max(missing) + 1) * bucket_size,
+        )
+        for campaign_id in _ids(campaigns):
+            index = campaign_id // bucket_size
+            if index in filled:
+                filled[index].append(campaign_id)
+        return {keys[index]: ids for index, ids in filled.items()}
+
+    cached = get_many_or_build(list(keys.values()), build)
+    return [cached[keys[index]] for index in indexes]
+
+
+def public_campaign_ids(position, reverse, limit):
+    """
+    Return up to `limit` public campaign ids next to the `position` id.
+
+    Ids come below `position`, newest first, or above it, oldest first, when
+    `reverse` is set. A `position` of None starts from the newest campaign.
+    """
+    head = _public_head()
+    bucket_size = settings.CAMPAIGN_FRAGMENT_BUCKET_SIZE
+    last_bucket = head // bucket_size
+
+    if reverse:
+        index, step = (position + 1) // bucket_size, 1
+    else:
+        index, step = (head if position is None else position - 1) // bucket_size, -1
+
+    ids, per_fetch = [], BUCKETS_PER_FETCH
+    while len(ids) < limit and 0 <= index <= last_bucket:
+        indexes = list(range(index, index + step * per_fetch, step))
+        indexes = [bucket for bucket in indexes if 0 <= bucket <= last_bucket]
+
+        for bucket in _public_buckets(indexes):
+            for campaign_id in reversed(bucket) if reverse else bucket:
+                if position is None or (campaign_id > position if reverse else campaign_id < position):
+                    ids.append(campaign_id)
+
+        index += step * per_fetch
+        per_fetch = min(per_fetch * 2, MAX_BUCKETS_PER_FETCH)
+
+    return ids[:limit]
+
+
+def own_private_campaign_ids(user):
+    """Return the ids of the user's campaigns that are not public, newest first."""
+    return get_or_build(
+        versioned_key(f'campaign_own_{user.id}', user_campaigns(user.id)),
+        lambda: _ids(Campaign.objects.filter(user=user).exclude(status__in=Campaign.PUBLIC_STATUSES)),
+    )
+
+
+def campaign_list_page(user, position, reverse, limit):
+    """Return up to `limit` serialized campaigns of the user's list next to `position`, as `public_campaign_ids`."""
+    own = own_private_campaign_ids(user)
+    if reverse:
+        own = [campaign_id for campaign_id in reversed(own) if campaign_id > position]
+    elif position is not None:
+        own = [campaign_id for campaign_id in own if campaign_id < position]
+
+    public = public_campaign_ids(position, reverse, limit)
+    merged = heapq.merge(public, own, key=lambda campaign_id: campaign_id if reverse else -campaign_id)
+    return campaign_representations(list(islice(merged, limit)))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-17 10:07
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaign', '0006_alter_campaign_created_at_alter_campaign_goal_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='campaign.campaign')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'shard'), name='unique_campaign_counter_shard')],
+            },
+        ),
+    ]
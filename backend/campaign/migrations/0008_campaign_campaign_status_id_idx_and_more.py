@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-17 10:14
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('campaign', '0007_campaigncountershard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='campaign',
+            index=models.Index(fields=['status', '-id'], name='campaign_status_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='campaign',
+            index=models.Index(fields=['user', '-id'], name='campaign_user_id_idx'),
+        ),
+    ]
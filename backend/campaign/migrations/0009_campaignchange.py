@@ -0,0 +1,55 @@
+# Generated by Django 5.1.5 on 2026-10-17 12:02
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+LOG_CAMPAIGN_CHANGES = """
+CREATE FUNCTION campaign_log_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO campaign_campaignchange (campaign_id, txid, changed_at)
+    VALUES (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END, txid_current(), now());
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER campaign_log_insert_delete
+AFTER INSERT OR DELETE ON campaign_campaign
+FOR EACH ROW EXECUTE FUNCTION campaign_log_change();
+
+CREATE TRIGGER campaign_log_update
+AFTER UPDATE ON campaign_campaign
+FOR EACH ROW
+WHEN (
+    OLD.status IS DISTINCT FROM NEW.status
+    OR OLD.goal_amount IS DISTINCT FROM NEW.goal_amount
+    OR OLD.raised_amount IS DISTINCT FROM NEW.raised_amount
+    OR OLD.deadline IS DISTINCT FROM NEW.deadline
+)
+EXECUTE FUNCTION campaign_log_change();
+"""
+
+DROP_CAMPAIGN_CHANGE_LOG = """
+DROP TRIGGER campaign_log_update ON campaign_campaign;
+DROP TRIGGER campaign_log_insert_delete ON campaign_campaign;
+DROP FUNCTION campaign_log_change();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaign', '0008_campaign_campaign_status_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campaign_id', models.BigIntegerField()),
+                ('txid', models.BigIntegerField(db_index=True)),
+                ('changed_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True)),
+            ],
+        ),
+        migrations.RunSQL(LOG_CAMPAIGN_CHANGES, DROP_CAMPAIGN_CHANGE_LOG),
+    ]
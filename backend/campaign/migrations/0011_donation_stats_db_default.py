@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-17 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaign', '0010_campaign_donation_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='campaign',
+            name='donation_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AlterField(
+            model_name='campaign',
+            name='donor_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AlterField(
+            model_name='campaigncountershard',
+            name='donation_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AlterField(
+            model_name='campaigncountershard',
+            name='donor_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.5 on 2026-10-17 12:05
+
+from django.db import migrations, transaction
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Each batch runs in its own transaction (the migration is not atomic) with its
+# campaigns locked, which holds off donations to them only while the batch runs.
+LOCK_BATCH = """
+SELECT id FROM campaign_campaign WHERE id >= %(low)s AND id < %(high)s ORDER BY id FOR UPDATE
+"""
+
+BACKFILL_DONORS = """
+INSERT INTO campaign_campaigndonor (campaign_id, user_id)
+SELECT DISTINCT campaign_id, user_id
+FROM donation_donation
+WHERE campaign_id >= %(low)s AND campaign_id < %(high)s
+ON CONFLICT (campaign_id, user_id) DO NOTHING
+"""
+
+# Donations already counted in counter shards by the new code are left out, as the
+# next rollup adds them to the campaign.
+BACKFILL_STATS = """
+WITH actual AS (
+    SELECT campaign_id, COUNT(DISTINCT user_id) AS donor_count, COUNT(*) AS donation_count,
+        MAX(created_at) AS last_donation_at
+    FROM donation_donation
+    WHERE campaign_id >= %(low)s AND campaign_id < %(high)s
+    GROUP BY campaign_id
+), pending AS (
+    SELECT campaign_id, SUM(donor_count) AS donor_count, SUM(donation_count) AS donation_count
+    FROM campaign_campaigncountershard
+    WHERE campaign_id >= %(low)s AND campaign_id < %(high)s
+    GROUP BY campaign_id
+)
+UPDATE campaign_campaign AS campaign
+SET donor_count = actual.donor_count - COALESCE(pending.donor_count, 0),
+    donation_count = actual.donation_count - COALESCE(pending.donation_count, 0),
+    last_donation_at = actual.last_donation_at
+FROM actual LEFT JOIN pending ON pending.campaign_id = actual.campaign_id
+WHERE campaign.id = actual.campaign_id
+"""
+
+
+def backfill_donation_stats(apps, schema_editor):
+    """
+    Fill the donors and donation statistics of campaigns donated to before 0010.
+
+    Donations taken by workers still running the previous release after their batch
+    are not counted; run `reconcile_campaign_stats` once every worker runs this release.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT min(campaign_id), max(campaign_id) FROM donation_donation')
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+            bounds = {'low': start, 'high': start + BACKFILL_BATCH_SIZE}
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(LOCK_BATCH, bounds)
+                cursor.execute(BACKFILL_DONORS, bounds)
+                cursor.execute(BACKFILL_STATS, bounds)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('campaign', '0011_donation_stats_db_default'),
+        ('donation', '0008_donation_campaign_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_donation_stats, migrations.RunPython.noop),
+    ]
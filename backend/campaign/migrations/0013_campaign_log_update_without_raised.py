@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-17 12:55
+
+from django.db import migrations
+
+# Raised amounts change with every donation; logging them put a write to the change
+# log on the donation path. Catalog snapshots read them again on full rebuilds and
+# whenever another listing field of the campaign changes.
+LOG_LISTING_UPDATES = """
+DROP TRIGGER campaign_log_update ON campaign_campaign;
+CREATE TRIGGER campaign_log_update
+AFTER UPDATE ON campaign_campaign
+FOR EACH ROW
+WHEN (
+    OLD.status IS DISTINCT FROM NEW.status
+    OR OLD.goal_amount IS DISTINCT FROM NEW.goal_amount
+    OR OLD.deadline IS DISTINCT FROM NEW.deadline
+)
+EXECUTE FUNCTION campaign_log_change();
+"""
+
+LOG_RAISED_UPDATES = """
+DROP TRIGGER campaign_log_update ON campaign_campaign;
+CREATE TRIGGER campaign_log_update
+AFTER UPDATE ON campaign_campaign
+FOR EACH ROW
+WHEN (
+    OLD.status IS DISTINCT FROM NEW.status
+    OR OLD.goal_amount IS DISTINCT FROM NEW.goal_amount
+    OR OLD.raised_amount IS DISTINCT FROM NEW.raised_amount
+    OR OLD.deadline IS DISTINCT FROM NEW.deadline
+)
+EXECUTE FUNCTION campaign_log_change();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaign', '0012_backfill_donation_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LOG_LISTING_UPDATES, LOG_RAISED_UPDATES),
+    ]
@@ -3,6 +3,8 @@ Database model for Campaign API.
 """
 from django.conf import settings
 from django.db import models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
@@ -26,6 +28,28 @@ def default_deadline():
     return (now() + timedelta(days=90)).date()
 
 
+class CampaignQuerySet(models.QuerySet):
+    """Queryset for campaigns."""
+
+    def public(self):
+        """Filter campaigns every user can see."""
+        return self.filter(status__in=Campaign.PUBLIC_STATUSES)
+
+    def with_pending_raised(self):
+        """Annotate the amount still sitting in counter shards and not yet rolled up."""
+        pending = CampaignCounterShard.objects.filter(
+            campaign=OuterRef('pk'),
+        ).values('campaign').annotate(total=Sum('amount')).values('total')
+
+        return self.annotate(
+            pending_raised=Coalesce(
+                Subquery(pending),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+
 class Campaign(models.Model):
     """Campaign object."""
 
@@ -37,6 +61,13 @@ class Campaign(models.Model):
         REJECTED = 'RE', _('Rejected')
         EXPIRED = 'EX', _('Expired')
 
+    # Statuses in which a campaign is listed for every user, not only its owner.
+    PUBLIC_STATUSES = (
+        CampaignStatusChoice.ACTIVE,
+        CampaignStatusChoice.COMPLETED,
+        CampaignStatusChoice.EXPIRED,
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -61,10 +92,35 @@ class Campaign(models.Model):
     deadline = models.DateField(default=default_deadline)
     created_at = models.DateField(auto_now_add=True, db_index=True)
     image = models.ImageField(null=True, upload_to=campaign_image_file_path)
+    # Donation statistics, maintained by the donation write paths in the donation's
+    # transaction (or folded from counter shards) and checked by `reconcile_campaign_stats`.
+    donor_count = models.PositiveIntegerField(default=0, db_default=0)
+    donation_count = models.PositiveIntegerField(default=0, db_default=0)
+    last_donation_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CampaignQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-id'], name='campaign_status_id_idx'),
+            models.Index(fields=['user', '-id'], name='campaign_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def total_raised(self):
+        """Raised amount including shard increments, when annotated with `with_pending_raised()`."""
+        return self.raised_amount + getattr(self, 'pending_raised', Decimal('0.00'))
+
+    @property
+    def average_donation(self):
+        """Mean donation amount, or None before the first donation; shard increments count once folded."""
+        if not self.donation_count:
+            return None
+        return (self.raised_amount / self.donation_count).quantize(Decimal('0.01'))
+
     def save(self, *args, **kwargs):
         """Override the save method to handle custom validation."""
         if self.goal_amount <= self.raised_amount:
@@ -73,6 +129,72 @@ class Campaign(models.Model):
         super().save(*args, **kwargs)
 
 
+class CampaignChange(models.Model):
+    """
+    A write to the listing fields of a campaign, appended by a database trigger.
+
+    The trigger (see migrations 0009 and 0013) logs inserts, deletes and updates of
+    `status`, `goal_amount` and `deadline`, including bulk `update()` calls, so
+    in-process catalog snapshots can refresh only the campaigns that changed.
+    `raised_amount` changes with every donation and is not logged.
+    `txid` is the writing transaction, so readers can tell which changes may still
+    be uncommitted.
+    """
+    campaign_id = models.BigIntegerField()
+    txid = models.BigIntegerField(db_index=True)
+    changed_at = models.DateTimeField(db_default=Now(), db_index=True)
+
+
+class CampaignCounterShard(models.Model):
+    """
+    One stripe of a campaign's raised amount and donation statistics.
+
+    With `DONATION_COUNTER_SHARDS` enabled, donations increment a random shard instead
+    of the campaign's counters, and `rollup_campaign_counters` folds them back.
+    """
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        related_name='counter_shards',
+    )
+    shard = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    donor_count = models.PositiveIntegerField(default=0, db_default=0)
+    donation_count = models.PositiveIntegerField(default=0, db_default=0)
+    last_donation_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'shard'], name='unique_campaign_counter_shard'),
+        ]
+
+    def __str__(self):
+        return f'{self.campaign_id}#{self.shard} – {self.amount}'
+
+
+class CampaignDonor(models.Model):
+    """
+    A user who has donated to a campaign.
+
+    Donation write paths insert a row per donation with ON CONFLICT DO NOTHING; only an
+    inserted row counts as a new donor, so donor counts need no scan of past donations.
+    """
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'user'], name='unique_campaign_donor'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} → {self.campaign_id}'
+
+
 class CampaignDocument(models.Model):
     campaign = models.ForeignKey(
         Campaign,
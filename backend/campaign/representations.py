@@ -0,0 +1,75 @@
+"""
+Per-object cache of serialized campaign representations.
+
+Each campaign's representation is cached under its own key per serializer, so a
+list page is assembled from an id list with one `get_many`, and only the misses are
+serialized, from one batched query. A change to one campaign invalidates just its
+own entries instead of every cached list that shows it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from main_app.caching import get_many_or_build
+
+from .models import Campaign
+from .serializers import CampaignDetailSerializer, CampaignSerializer
+
+# Bump when a serializer's output changes, so cached representations are rebuilt.
+REPRESENTATION_VERSION = 2
+
+CACHED_SERIALIZERS = (CampaignSerializer, CampaignDetailSerializer)
+
+
+def representation_key(serializer_class, campaign_id):
+    """Return the cache key of a campaign's representation by a serializer."""
+    return f'campaign:{serializer_class.__name__}:v{REPRESENTATION_VERSION}:{campaign_id}'
+
+
+def _queryset(serializer_class):
+    queryset = Campaign.objects.all()
+    if serializer_class is CampaignDetailSerializer:
+        queryset = queryset.prefetch_related('documents')
+    if settings.DONATION_COUNTER_SHARDS:
+        queryset = queryset.with_pending_raised()
+    return queryset
+
+
+def campaign_representations(campaign_ids, serializer_class=CampaignSerializer):
+    """
+    Return the representations of the campaigns, in the order of `campaign_ids`.
+
+    Only the misses are serialized, from one batched query, with the single-flight
+    rebuild of `get_many_or_build`. Campaigns that no longer exist are left out.
+    Representations are built without a request, so file fields hold relative URLs.
+    """
+    keys = {campaign_id: representation_key(serializer_class, campaign_id) for campaign_id in campaign_ids}
+    ids_by_key = {key: campaign_id for campaign_id, key in keys.items()}
+
+    def build(missing_keys):
+        campaigns = _queryset(serializer_class).filter(id__in=[ids_by_key[key] for key in missing_keys])
+        built = {keys[item['id']]: dict(item) for item in serializer_class(campaigns, many=True).data}
+        return {key: built.get(key) for key in missing_keys}
+
+    cached = get_many_or_build(list(keys.values()), build)
+    return [cached[keys[campaign_id]] for campaign_id in campaign_ids if cached.get(keys[campaign_id]) is not None]
+
+
+def invalidate_campaign_representations(*campaign_ids):
+    """Drop every cached representation of the campaigns."""
+    cache.delete_many([
+        representation_key(serializer_class, campaign_id)
+        for campaign_id in dict.fromkeys(campaign_ids)
+        for serializer_class in CACHED_SERIALIZERS
+    ])
+
+
+def with_absolute_urls(representation, request):
+    """Return a copy of a detail representation with its file URLs made absolute for the request."""
+    representation = dict(representation)
+    if representation.get('image'):
+        representation['image'] = request.build_absolute_uri(representation['image'])
+    representation['documents'] = [
+        {**document, 'document': request.build_absolute_uri(document['document'])}
+        for document in representation['documents']
+    ]
+    return representation
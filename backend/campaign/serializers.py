@@ -9,6 +9,9 @@ from main_app.serializer_utils import RestrictedFieldValidatorMixin
 
 from .models import Campaign, CampaignDocument
 
+# Fields the public campaign catalog can be sorted by.
+CATALOG_ORDERINGS = ('id', 'goal_amount', 'raised_amount', 'deadline')
+
 
 class CampaignDocumentSerializer(serializers.ModelSerializer):
     """Read-only nested representation of a campaign’s documents."""
@@ -21,11 +24,23 @@ class CampaignDocumentSerializer(serializers.ModelSerializer):
 
 class CampaignSerializer(serializers.ModelSerializer):
     """Serializer for campaigns."""
+    raised_amount = serializers.DecimalField(
+        source='total_raised',
+        max_digits=12,
+        decimal_places=2,
+        read_only=True,
+    )
+    average_donation = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Campaign
-        fields = ['id', 'title', 'goal_amount', 'raised_amount', 'status', 'deadline']
-        read_only_fields = ['id', 'raised_amount', 'status']
+        fields = [
+            'id', 'title', 'goal_amount', 'raised_amount', 'status', 'deadline',
+            'donor_count', 'donation_count', 'average_donation', 'last_donation_at',
+        ]
+        read_only_fields = [
+            'id', 'raised_amount', 'status', 'donor_count', 'donation_count', 'average_donation', 'last_donation_at',
+        ]
 
     def validate_deadline(self, value):
         """Ensure the deadline is in the future."""
@@ -47,6 +62,15 @@ class CampaignDetailSerializer(RestrictedFieldValidatorMixin, CampaignSerializer
         return super().validate_deadline(value)
 
 
+class CatalogQuerySerializer(serializers.Serializer):
+    """Query parameters of the public campaign catalog."""
+    status = serializers.MultipleChoiceField(choices=Campaign.PUBLIC_STATUSES, required=False)
+    ordering = serializers.ChoiceField(
+        choices=[prefix + field for field in CATALOG_ORDERINGS for prefix in ('', '-')],
+        default='-id',
+    )
+
+
 class CampaignImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to campaigns."""
 
@@ -0,0 +1,135 @@
+"""
+Maintenance operations for campaigns.
+"""
+from django.db import connection, transaction
+
+from donation.models import Donation
+
+from .models import Campaign, CampaignCounterShard, CampaignDonor
+from .representations import invalidate_campaign_representations
+
+# Draining the shards with DELETE ... RETURNING makes the fold safe against donations
+# arriving meanwhile: they either land before the delete and are folded, or wait for it
+# and insert a fresh shard row for the next rollup.
+ROLLUP_SHARDS_SQL = """
+    WITH drained AS (
+        DELETE FROM {shard_table}
+        {where}
+        RETURNING campaign_id, amount, donor_count, donation_count, last_donation_at
+    ), totals AS (
+        SELECT campaign_id, SUM(amount) AS amount, SUM(donor_count) AS donor_count,
+            SUM(donation_count) AS donation_count, MAX(last_donation_at) AS last_donation_at
+        FROM drained
+        GROUP BY campaign_id
+    )
+    UPDATE {campaign_table} AS campaign
+    SET raised_amount = campaign.raised_amount + totals.amount,
+        status = CASE
+            WHEN campaign.goal_amount <= campaign.raised_amount + totals.amount THEN %(completed)s
+            ELSE campaign.status
+        END,
+        donor_count = campaign.donor_count + totals.donor_count,
+        donation_count = campaign.donation_count + totals.donation_count,
+        last_donation_at = GREATEST(campaign.last_donation_at, totals.last_donation_at)
+    FROM totals
+    WHERE campaign.id = totals.campaign_id
+"""
+
+# Run after the campaigns are locked and their shards folded, so the counters and the
+# donations they are compared with hold still.
+SYNC_DONORS_SQL = """
+    WITH removed AS (
+        DELETE FROM {donor_table} AS donor
+        WHERE donor.campaign_id BETWEEN %(first_id)s AND %(last_id)s
+            AND NOT EXISTS (
+                SELECT 1 FROM {donation_table} AS donation
+                WHERE donation.campaign_id = donor.campaign_id AND donation.user_id = donor.user_id
+            )
+    )
+    INSERT INTO {donor_table} (campaign_id, user_id)
+    SELECT DISTINCT campaign_id, user_id
+    FROM {donation_table}
+    WHERE campaign_id BETWEEN %(first_id)s AND %(last_id)s
+    ON CONFLICT (campaign_id, user_id) DO NOTHING
+"""
+
+RECONCILE_STATS_SQL = """
+    WITH actual AS (
+        SELECT campaign.id,
+            COUNT(DISTINCT donation.user_id) AS donor_count,
+            COUNT(donation.id) AS donation_count,
+            MAX(donation.created_at) AS last_donation_at
+        FROM {campaign_table} AS campaign
+        LEFT JOIN {donation_table} AS donation ON donation.campaign_id = campaign.id
+        WHERE campaign.id BETWEEN %(first_id)s AND %(last_id)s
+        GROUP BY campaign.id
+    )
+    UPDATE {campaign_table} AS campaign
+    SET donor_count = actual.donor_count,
+        donation_count = actual.donation_count,
+        last_donation_at = actual.last_donation_at
+    FROM actual, {campaign_table} AS previous
+    WHERE campaign.id = actual.id
+        AND previous.id = actual.id
+        AND (campaign.donor_count, campaign.donation_count, campaign.last_donation_at)
+            IS DISTINCT FROM (actual.donor_count, actual.donation_count, actual.last_donation_at)
+    RETURNING campaign.id,
+        previous.donor_count, previous.donation_count, previous.last_donation_at,
+        campaign.donor_count, campaign.donation_count, campaign.last_donation_at
+"""
+
+STATS_FIELDS = ('donor_count', 'donation_count', 'last_donation_at')
+
+
+def rollup_counter_shards(first_id=None, last_id=None):
+    """
+    Fold counter shards into their campaigns' raised amount and donation statistics.
+
+    Only the shards of campaigns with ids from `first_id` to `last_id` are folded when
+    given. Returns the number of campaigns updated.
+    """
+    sql = ROLLUP_SHARDS_SQL.format(
+        shard_table=CampaignCounterShard._meta.db_table,
+        campaign_table=Campaign._meta.db_table,
+        where='' if first_id is None else 'WHERE campaign_id BETWEEN %(first_id)s AND %(last_id)s',
+    )
+    params = {'completed': Campaign.CampaignStatusChoice.COMPLETED, 'first_id': first_id, 'last_id': last_id}
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def reconcile_campaign_stats(first_id, last_id):
+    """
+    Recompute the donation statistics of campaigns with ids from `first_id` to `last_id`.
+
+    Must run inside a transaction. The campaigns are locked first, which waits for and
+    then holds off donations to them, and their counter shards are folded. Returns
+    (campaign id, previous stats, actual stats) for the campaigns whose counters drifted,
+    each stats being a dict of `STATS_FIELDS`.
+    """
+    list(
+        Campaign.objects.select_for_update().filter(id__range=(first_id, last_id)).order_by('id')
+        .values_list('id', flat=True)
+    )
+    rollup_counter_shards(first_id, last_id)
+
+    tables = {
+        'campaign_table': Campaign._meta.db_table,
+        'donation_table': Donation._meta.db_table,
+        'donor_table': CampaignDonor._meta.db_table,
+    }
+    params = {'first_id': first_id, 'last_id': last_id}
+    with connection.cursor() as cursor:
+        cursor.execute(SYNC_DONORS_SQL.format(**tables), params)
+        cursor.execute(RECONCILE_STATS_SQL.format(**tables), params)
+        rows = cursor.fetchall()
+
+    drifted = [row[0] for row in rows]
+    if drifted:
+        transaction.on_commit(lambda: invalidate_campaign_representations(*drifted))
+    return [
+        (row[0], dict(zip(STATS_FIELDS, row[1:4])), dict(zip(STATS_FIELDS, row[4:7])))
+        for row in rows
+    ]
@@ -6,20 +6,28 @@ from decimal import Decimal
 from datetime import timedelta
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from campaign.admin import approve_reject_campaigns
+from campaign.fragments import campaign_list_page
+from campaign.representations import campaign_representations
+from campaign.warming import _warm_in_background, warm_campaign_caches
 from campaign.serializers import CampaignDetailSerializer, CampaignSerializer
 from campaign.models import Campaign
 
+from main_app.pagination import IdCursorPagination
+
 CAMPAIGN_URLS = reverse('campaign:campaign-list')
 USER_CAMPAIGN_URLS = reverse('campaign:campaign-my-campaigns')
 
@@ -70,6 +78,7 @@ class PrivateCampaignAPITests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = create_user(
             email='testuser123@example.com',
@@ -88,7 +97,71 @@ class PrivateCampaignAPITests(TestCase):
         serializer = CampaignSerializer(campaigns, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.json()['results'], serializer.data)
+
+    @patch.object(IdCursorPagination, 'page_size', 2)
+    def test_retrieve_campaigns_paginated(self):
+        """Test campaigns are paginated with a cursor on the latest id."""
+        campaigns = [create_campaign(user=self.user) for _ in range(3)]
+
+        res = self.client.get(CAMPAIGN_URLS)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.json()['results']], [campaigns[2].id, campaigns[1].id])
+        self.assertIsNone(res.json()['previous'])
+
+        res = self.client.get(res.json()['next'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.json()['results']], [campaigns[0].id])
+        self.assertIsNone(res.json()['next'])
+
+    @patch.object(IdCursorPagination, 'page_size', 2)
+    def test_retrieve_campaigns_merges_public_and_own(self):
+        """Test the list merges shared public fragments with own campaigns across pages in both directions."""
+        other_user = create_user(email='otheruser123@example.com', password='testpassword1423')
+        public = Campaign.CampaignStatusChoice.ACTIVE
+        campaigns = [
+            create_campaign(user=other_user, status=public),
+            create_campaign(user=self.user),
+            create_campaign(user=other_user),
+            create_campaign(user=self.user, status=public),
+            create_campaign(user=other_user, status=Campaign.CampaignStatusChoice.EXPIRED),
+        ]
+        expected = [campaigns[4].id, campaigns[3].id, campaigns[1].id, campaigns[0].id]
+
+        first = self.client.get(CAMPAIGN_URLS)
+        second = self.client.get(first.json()['next'])
+        previous = self.client.get(second.json()['previous'])
+
+        self.assertEqual([item['id'] for item in first.json()['results'] + second.json()['results']], expected)
+        self.assertIsNone(second.json()['next'])
+        self.assertEqual(previous.json()['results'], first.json()['results'])
+        self.assertIsNone(previous.json()['previous'])
+
+    @override_settings(CAMPAIGN_FRAGMENT_BUCKET_SIZE=1)
+    def test_public_fragments_shared_between_users(self):
+        """Test public campaigns cached for one user are served to another from the same fragments."""
+        other_user = create_user(email='otheruser123@example.com', password='testpassword1423')
+        campaign = create_campaign(user=other_user, status=Campaign.CampaignStatusChoice.ACTIVE)
+        self.client.get(CAMPAIGN_URLS)
+
+        other_client = APIClient()
+        other_client.force_authenticate(create_user(email='third@example.com', password='testpass123'))
+        with self.assertNumQueries(1):
+            res = other_client.get(CAMPAIGN_URLS)
+
+        self.assertEqual([item['id'] for item in res.json()['results']], [campaign.id])
+
+    def test_retrieve_campaigns_not_modified(self):
+        """Test the campaign list carries an ETag of its bytes and answers a matching If-None-Match with 304."""
+        create_campaign(user=self.user)
+        etag = self.client.get(CAMPAIGN_URLS)['ETag']
+
+        res = self.client.get(CAMPAIGN_URLS, headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
 
     def test_retrieve_campaigns_created_by_user(self):
         """Test retrieving a list of campaigns created by authenticated user."""
@@ -101,11 +174,32 @@ class PrivateCampaignAPITests(TestCase):
 
         res = self.client.get(USER_CAMPAIGN_URLS)
 
-        campaigns = Campaign.objects.filter(user=self.user)
+        campaigns = Campaign.objects.filter(user=self.user).order_by('-id')
         serializer = CampaignSerializer(campaigns, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data[:-1], serializer.data[:-1])
+        self.assertEqual(res.json()['results'], serializer.data)
+
+    def test_list_assembled_from_cached_representations(self):
+        """Test list pages reuse cached campaign representations and only serialize the misses."""
+        campaigns = [create_campaign(user=self.user) for _ in range(3)]
+        self.client.get(USER_CAMPAIGN_URLS)
+        campaigns.append(create_campaign(user=self.user))
+
+        with self.assertNumQueries(2):
+            res = self.client.get(USER_CAMPAIGN_URLS)
+
+        self.assertEqual([item['id'] for item in res.json()['results']], [c.id for c in reversed(campaigns)])
+
+    def test_get_campaign_detail_cached(self):
+        """Test the campaign detail is served from its cached representation after the first request."""
+        campaign = create_campaign(user=self.user)
+        self.client.get(detail_url(campaign.id))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(campaign.id))
+
+        self.assertEqual(res.data, CampaignDetailSerializer(campaign).data)
 
     def test_get_campaign_detail(self):
         """Test get campaign detail."""
@@ -217,6 +311,55 @@ class PrivateCampaignAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Campaign.objects.filter(id=campaign.id).exists())
 
+    def test_update_invalidates_other_users_cached_lists(self):
+        """Test updating a public campaign refreshes the cached list of every user."""
+        owner = create_user(email='owner@example.com', password='testpass123')
+        campaign = create_campaign(user=owner, title='Old title', status=Campaign.CampaignStatusChoice.ACTIVE)
+        self.assertEqual(self.client.get(CAMPAIGN_URLS).json()['results'][0]['title'], 'Old title')
+
+        owner_client = APIClient()
+        owner_client.force_authenticate(owner)
+        owner_client.patch(detail_url(campaign.id), {'title': 'New title'})
+
+        res = self.client.get(CAMPAIGN_URLS)
+        self.assertEqual(res.json()['results'][0]['title'], 'New title')
+
+    def test_approval_invalidates_other_users_cached_lists(self):
+        """Test approving a campaign makes it appear in other users' cached lists."""
+        owner = create_user(email='owner@example.com', password='testpass123')
+        campaign = create_campaign(user=owner)
+        self.assertEqual(self.client.get(CAMPAIGN_URLS).json()['results'], [])
+
+        approve_reject_campaigns(Campaign.objects.filter(id=campaign.id), 'approve')
+
+        res = self.client.get(CAMPAIGN_URLS)
+        self.assertEqual([item['id'] for item in res.json()['results']], [campaign.id])
+
+    def test_approval_schedules_cache_warm(self):
+        """Test moderation warms the campaign caches in the background after commit."""
+        campaign = create_campaign(user=self.user)
+
+        with patch('campaign.warming._warm_executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                approve_reject_campaigns(Campaign.objects.filter(id=campaign.id), 'approve')
+
+        executor.submit.assert_called_once_with(_warm_in_background, (campaign.id,))
+
+    def test_warm_campaign_caches(self):
+        """Test warming caches the public list and the details of hot campaigns."""
+        owner = create_user(email='owner@example.com', password='testpass123')
+        campaigns = [create_campaign(user=owner, status=Campaign.CampaignStatusChoice.ACTIVE) for _ in range(3)]
+        hidden = create_campaign(user=owner)
+
+        warmed = warm_campaign_caches([hidden.id], pages=1, concurrency=1)
+
+        self.assertEqual(warmed, 7)
+        with self.assertNumQueries(1):
+            page = campaign_list_page(self.user, None, False, 10)
+        self.assertEqual([item['id'] for item in page], [campaign.id for campaign in reversed(campaigns)])
+        with self.assertNumQueries(0):
+            campaign_representations([hidden.id], CampaignDetailSerializer)
+
     def test_campaign_permissions(self):
         """Test CRUD access to a campaign for owner/superuser and default user."""
         owner = create_user(email='owner@example.com', password='testpass123')
@@ -0,0 +1,201 @@
+"""
+Tests for the in-process public campaign catalog.
+"""
+from datetime import timedelta
+from decimal import Decimal
+import random
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from campaign.catalog import CampaignCatalog, CatalogSnapshot, STATUS_CODES
+from campaign.models import Campaign, CampaignChange, CampaignCounterShard
+from campaign.serializers import CATALOG_ORDERINGS
+
+CATALOG_URL = reverse('campaign:campaign-public')
+ACTIVE = Campaign.CampaignStatusChoice.ACTIVE
+COMPLETED = Campaign.CampaignStatusChoice.COMPLETED
+
+
+class CampaignCatalogTests(TestCase):
+    """Test catalog snapshots and their refresh from the change log."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('owner@example.com', 'testpass123')
+
+    def create_campaign(self, **params):
+        defaults = {
+            'title': 'Campaign', 'description': 'Description', 'goal_amount': Decimal('1000'), 'status': ACTIVE,
+        }
+        defaults.update(params)
+        return Campaign.objects.create(user=self.user, **defaults)
+
+    def test_changes_logged_by_trigger(self):
+        """Test inserts and bulk updates of listing fields are logged, other updates and raised amounts are not."""
+        campaign = self.create_campaign()
+        Campaign.objects.filter(id=campaign.id).update(title='Renamed')
+        Campaign.objects.filter(id=campaign.id).update(raised_amount=Decimal('5'))
+        Campaign.objects.filter(id=campaign.id).update(goal_amount=Decimal('500'))
+
+        self.assertEqual(CampaignChange.objects.filter(campaign_id=campaign.id).count(), 2)
+
+    def test_incremental_refresh(self):
+        """Test a refresh reads only the changed campaigns into a new snapshot."""
+        first = self.create_campaign(raised_amount=Decimal('10'))
+        second = self.create_campaign(raised_amount=Decimal('20'))
+        catalog = CampaignCatalog()
+        catalog.refresh(full=True)
+        built_at = catalog._built_at
+
+        Campaign.objects.filter(id=first.id).update(goal_amount=Decimal('2000'), raised_amount=Decimal('30'))
+        Campaign.objects.filter(id=second.id).update(status=Campaign.CampaignStatusChoice.REJECTED)
+        third = self.create_campaign(raised_amount=Decimal('5'))
+        with self.assertNumQueries(2):
+            catalog.refresh()
+
+        self.assertEqual(catalog._built_at, built_at)
+        snapshot = catalog.snapshot
+        self.assertEqual(snapshot.select(ordering='-raised_amount')[0:10], [first.id, third.id])
+        self.assertEqual([record[3] for record in snapshot.records()], [3000, 500])
+
+        with self.assertNumQueries(1):
+            catalog.refresh()
+        self.assertIs(catalog.snapshot, snapshot)
+
+    @patch('campaign.catalog.PATCH_MAX_SHARE', 10)
+    def test_changes_patched_into_orders(self):
+        """Test a refresh moves only the changed campaigns within the existing sort orders."""
+        first = self.create_campaign(raised_amount=Decimal('10'))
+        second = self.create_campaign(raised_amount=Decimal('20'))
+        catalog = CampaignCatalog()
+        catalog.refresh(full=True)
+
+        Campaign.objects.filter(id=first.id).update(goal_amount=Decimal('2000'), raised_amount=Decimal('30'))
+        Campaign.objects.filter(id=second.id).update(status=Campaign.CampaignStatusChoice.REJECTED)
+        third = self.create_campaign(raised_amount=Decimal('5'))
+        with patch('campaign.catalog.sorted', create=True, side_effect=AssertionError('re-sorted')):
+            catalog.refresh()
+
+        snapshot = catalog.snapshot
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(snapshot.select(ordering='-raised_amount')[0:10], [first.id, third.id])
+        self.assertEqual(snapshot.select(ordering='raised_amount')[0:10], [third.id, first.id])
+        self.assertEqual([record[0] for record in snapshot.records()], [first.id, third.id])
+
+        Campaign.objects.filter(id=second.id).update(status=ACTIVE)
+        catalog.refresh()
+        self.assertEqual(catalog.snapshot.select(ordering='-raised_amount')[0:10], [first.id, second.id, third.id])
+
+    @override_settings(DONATION_COUNTER_SHARDS=4)
+    def test_raised_includes_pending_shards(self):
+        """Test raised amounts still in counter shards count towards the raised order."""
+        first = self.create_campaign(raised_amount=Decimal('10'))
+        second = self.create_campaign(raised_amount=Decimal('20'))
+        CampaignCounterShard.objects.create(campaign=first, shard=2, amount=Decimal('15'))
+        catalog = CampaignCatalog()
+        catalog.refresh(full=True)
+
+        self.assertEqual(catalog.snapshot.select(ordering='-raised_amount')[0:10], [first.id, second.id])
+
+    def test_select_orders_and_statuses(self):
+        """Test selections sort by a column, ties by id, and merge several statuses."""
+        today = timezone.now().date()
+        a = self.create_campaign(goal_amount=Decimal('500'), deadline=today + timedelta(days=3))
+        b = self.create_campaign(goal_amount=Decimal('100'), status=COMPLETED, deadline=today + timedelta(days=1))
+        c = self.create_campaign(goal_amount=Decimal('500'), deadline=today + timedelta(days=2))
+        self.create_campaign(goal_amount=Decimal('50'), status=Campaign.CampaignStatusChoice.ON_MODERATION)
+        catalog = CampaignCatalog()
+        catalog.refresh(full=True)
+        snapshot = catalog.snapshot
+
+        self.assertEqual(snapshot.select()[0:10], [c.id, b.id, a.id])
+        self.assertEqual(snapshot.select(ordering='goal_amount')[0:10], [b.id, a.id, c.id])
+        self.assertEqual(snapshot.select(ordering='-goal_amount')[0:10], [c.id, a.id, b.id])
+        self.assertEqual(snapshot.select([ACTIVE, COMPLETED], 'deadline')[0:10], [b.id, c.id, a.id])
+        self.assertEqual(snapshot.select([ACTIVE], '-deadline')[1:2], [c.id])
+        self.assertEqual(len(snapshot.select([COMPLETED])), 1)
+
+
+class CatalogSnapshotPatchTests(SimpleTestCase):
+    """Test patched snapshots against snapshots built from scratch."""
+
+    def random_record(self, rng, campaign_id):
+        return (
+            campaign_id, rng.choice(list(STATUS_CODES.values())),
+            rng.randrange(5) * 100, rng.randrange(5) * 100, 739000 + rng.randrange(5),
+        )
+
+    def test_patch_matches_full_build(self):
+        """Test inserted, updated and removed rows sort as in a snapshot built from the same records."""
+        rng = random.Random(20)
+        records = {campaign_id: self.random_record(rng, campaign_id) for campaign_id in range(1, 60)}
+        snapshot = CatalogSnapshot(records.values())
+
+        for _ in range(20):
+            changed = set(rng.sample(range(1, 80), 4))
+            for campaign_id in changed:
+                if rng.random() < 0.3:
+                    records.pop(campaign_id, None)
+                else:
+                    records[campaign_id] = self.random_record(rng, campaign_id)
+            snapshot = snapshot.patched(changed, [records[campaign_id] for campaign_id in changed & records.keys()])
+
+            expected = CatalogSnapshot(records.values())
+            self.assertEqual(len(snapshot), len(expected))
+            self.assertEqual(sorted(snapshot.records()), list(expected.records()))
+            for field in CATALOG_ORDERINGS:
+                for ordering in (field, f'-{field}'):
+                    for statuses in (None, [ACTIVE], [ACTIVE, COMPLETED]):
+                        self.assertEqual(
+                            snapshot.select(statuses, ordering)[0:100], expected.select(statuses, ordering)[0:100],
+                        )
+
+
+@override_settings(CATALOG_REFRESH_INTERVAL=60)
+class CampaignCatalogApiTests(TestCase):
+    """Test the public campaign catalog endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        # A fresh catalog builds its first snapshot in the request thread, inside the test transaction.
+        patcher = patch('campaign.catalog._catalog', CampaignCatalog())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_filter_sort_and_paginate(self):
+        """Test the catalog lists public campaigns filtered by status, sorted and paginated."""
+        campaigns = [
+            Campaign.objects.create(
+                user=self.user, title=f'Campaign {index}', description='Description',
+                goal_amount=Decimal('1000'), raised_amount=Decimal(amount), status=ACTIVE,
+            )
+            for index, amount in enumerate(['30', '10', '20'])
+        ]
+        Campaign.objects.create(user=self.user, title='Hidden', description='Description', goal_amount=Decimal('10'))
+
+        res = self.client.get(CATALOG_URL, {'status': ACTIVE, 'ordering': '-raised_amount', 'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = res.json()
+        self.assertEqual(body['count'], 3)
+        self.assertEqual([item['id'] for item in body['results']], [campaigns[0].id, campaigns[2].id])
+        self.assertEqual(body['results'][0]['raised_amount'], '30.00')
+
+        res = self.client.get(body['next'])
+        self.assertEqual([item['id'] for item in res.json()['results']], [campaigns[1].id])
+
+    def test_invalid_ordering(self):
+        """Test ordering by an unsupported field is rejected."""
+        res = self.client.get(CATALOG_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
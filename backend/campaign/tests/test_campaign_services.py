@@ -0,0 +1,99 @@
+"""
+Tests for campaign maintenance operations.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from campaign.models import Campaign, CampaignCounterShard, CampaignDonor
+from campaign.services import rollup_counter_shards
+
+from donation.models import Donation
+
+
+class RollupCounterShardsTests(TestCase):
+    """Test folding counter shards into campaigns."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'testuser123@example.com',
+            'testpassword123',
+        )
+
+    def test_rollup_counter_shards(self):
+        """Test shards are added to the raised amount and removed."""
+        campaign = Campaign.objects.create(user=self.user, title='Sharded', goal_amount=Decimal('1000'))
+        CampaignCounterShard.objects.create(campaign=campaign, shard=0, amount=Decimal('100'))
+        CampaignCounterShard.objects.create(campaign=campaign, shard=3, amount=Decimal('50'))
+
+        count = rollup_counter_shards()
+
+        campaign.refresh_from_db()
+        self.assertEqual(count, 1)
+        self.assertEqual(campaign.raised_amount, Decimal('150'))
+        self.assertEqual(campaign.status, Campaign.CampaignStatusChoice.ON_MODERATION)
+        self.assertFalse(CampaignCounterShard.objects.exists())
+
+    def test_rollup_completes_campaign(self):
+        """Test a campaign reaching its goal through shards is completed on rollup."""
+        campaign = Campaign.objects.create(user=self.user, title='Sharded', goal_amount=Decimal('100'))
+        CampaignCounterShard.objects.create(campaign=campaign, shard=1, amount=Decimal('100'))
+
+        rollup_counter_shards()
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, Campaign.CampaignStatusChoice.COMPLETED)
+
+    def test_pending_raised_annotation(self):
+        """Test reads include shard amounts that are not rolled up yet."""
+        campaign = Campaign.objects.create(
+            user=self.user, title='Sharded', goal_amount=Decimal('1000'), raised_amount=Decimal('10')
+        )
+        CampaignCounterShard.objects.create(campaign=campaign, shard=0, amount=Decimal('5'))
+
+        annotated = Campaign.objects.with_pending_raised().get(pk=campaign.pk)
+
+        self.assertEqual(annotated.total_raised, Decimal('15'))
+        self.assertEqual(campaign.total_raised, Decimal('10'))
+
+
+class ReconcileCampaignStatsTests(TestCase):
+    """Test recomputing campaign donation statistics from the donations."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('testuser123@example.com', 'testpassword123')
+        self.campaign = Campaign.objects.create(user=self.user, title='Drifted', goal_amount=Decimal('1000'))
+        self.donations = [
+            Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('10')),
+            Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('20')),
+        ]
+        Campaign.objects.filter(pk=self.campaign.pk).update(donor_count=5, donation_count=1)
+
+    def test_reconcile_fixes_drift(self):
+        """Test drifted counters and donor rows are rebuilt from the donations."""
+        out = StringIO()
+
+        call_command('reconcile_campaign_stats', batch_size=1, stdout=out)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.donor_count, self.campaign.donation_count), (1, 2))
+        self.assertEqual(self.campaign.last_donation_at, self.donations[1].created_at)
+        self.assertTrue(CampaignDonor.objects.filter(campaign=self.campaign, user=self.user).exists())
+        self.assertIn('Fixed drifted statistics on 1 campaigns.', out.getvalue())
+
+        out = StringIO()
+        call_command('reconcile_campaign_stats', stdout=out)
+        self.assertIn('Fixed drifted statistics on 0 campaigns.', out.getvalue())
+
+    def test_reconcile_dry_run(self):
+        """Test a dry run reports drift without fixing it."""
+        out = StringIO()
+
+        call_command('reconcile_campaign_stats', dry_run=True, stdout=out)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.donor_count, self.campaign.donation_count), (5, 1))
+        self.assertIn('donor_count: 1 campaigns drifted.', out.getvalue())
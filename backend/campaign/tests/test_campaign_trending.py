@@ -0,0 +1,102 @@
+"""
+Tests for the trending campaign rankings.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from campaign.models import Campaign
+from campaign.trending import prune_trending, rebuild_trending, record_donations, trending_campaigns
+
+from donation.models import Donation
+
+TRENDING_URL = reverse('campaign:campaign-trending')
+DONATIONS_URL = reverse('donation:donation-list')
+ACTIVE = Campaign.CampaignStatusChoice.ACTIVE
+
+
+class TrendingCampaignTests(TestCase):
+    """Test ranking campaigns from Redis sorted sets."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('donor@example.com', 'testpass123', balance=Decimal('1000'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_campaign(self, **params):
+        defaults = {
+            'title': 'Campaign', 'description': 'Description', 'goal_amount': Decimal('1000'), 'status': ACTIVE,
+        }
+        defaults.update(params)
+        return Campaign.objects.create(user=self.user, **defaults)
+
+    def test_donations_ranked_once_committed(self):
+        """Test committed donations rank active campaigns by raised amount and by recent donations."""
+        big = self.create_campaign(title='Big')
+        busy = self.create_campaign(title='Busy')
+        moderated = self.create_campaign(title='Moderated', status=Campaign.CampaignStatusChoice.ON_MODERATION)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(DONATIONS_URL, {'campaign': big.id, 'amount': '300.00'})
+            self.client.post(DONATIONS_URL, {'campaign': moderated.id, 'amount': '500.00'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('donation:donation-bulk'), [
+                {'campaign': busy.id, 'amount': '10.00'}, {'campaign': busy.id, 'amount': '10.00'},
+            ], format='json')
+
+        res = self.client.get(TRENDING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([campaign['id'] for campaign in res.json()['raised']], [big.id, busy.id])
+        self.assertEqual(
+            [(campaign['id'], campaign['recent_donations']) for campaign in res.json()['recent']],
+            [(busy.id, 2), (big.id, 1)],
+        )
+
+    def test_old_donations_leave_recent_ranking(self):
+        """Test donations before the window count towards the raised ranking only."""
+        campaign = self.create_campaign()
+
+        record_donations([(campaign.id, Decimal('5'), timezone.now() - timedelta(days=2))])
+
+        rankings = trending_campaigns()
+        self.assertEqual([row['id'] for row in rankings['raised']], [campaign.id])
+        self.assertEqual(rankings['recent'], [])
+
+    def test_prune_removes_ended_campaigns(self):
+        """Test ended campaigns are removed from the rankings by `expire_campaigns`."""
+        active = self.create_campaign()
+        ended = self.create_campaign(deadline=timezone.now().date() - timedelta(days=1))
+        record_donations([(campaign.id, Decimal('5'), timezone.now()) for campaign in (active, ended)])
+
+        call_command('expire_campaigns', stdout=StringIO())
+
+        self.assertEqual(prune_trending(), 0)
+        self.assertEqual([row['id'] for row in trending_campaigns()['raised']], [active.id])
+
+    def test_rebuild_from_database(self):
+        """Test the rankings are rebuilt from campaigns and recent donations."""
+        first = self.create_campaign(raised_amount=Decimal('40'))
+        second = self.create_campaign(raised_amount=Decimal('60'))
+        self.create_campaign(raised_amount=Decimal('90'), status=Campaign.CampaignStatusChoice.REJECTED)
+        for _ in range(2):
+            Donation.objects.create(user=self.user, campaign=first, amount=Decimal('20'))
+        old = Donation.objects.create(user=self.user, campaign=second, amount=Decimal('60'))
+        Donation.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(rebuild_trending(), 2)
+
+        rankings = trending_campaigns()
+        self.assertEqual([row['id'] for row in rankings['raised']], [second.id, first.id])
+        self.assertEqual([(row['id'], row['recent_donations']) for row in rankings['recent']], [(first.id, 2)])
@@ -0,0 +1,209 @@
+"""
+Trending campaign rankings kept in Redis sorted sets.
+
+One sorted set ranks campaigns by raised amount (in minor units) and one per hour
+counts the donations each campaign received in it. Donation write paths add to both
+once their transaction commits, so a ranking is a `ZREVRANGE` instead of a sort over
+the campaign table or an aggregate over donations. Hour sets expire on their own once
+out of the window; the window ranking is their union, stored for
+`TRENDING_RECENT_TIMEOUT`.
+
+Campaigns that ended (completed, expired or rejected) are removed by
+`prune_trending`, run by `expire_campaigns`; rankings only show active campaigns.
+`rebuild_trending` fills the sets from the database after a cold start.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from donation.models import Donation
+
+from .models import Campaign
+from .representations import campaign_representations
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+RAISED = 'trending:raised'
+HOUR = 60 * 60
+
+# Campaigns in these statuses can no longer take part in a ranking.
+ENDED_STATUSES = (
+    Campaign.CampaignStatusChoice.COMPLETED,
+    Campaign.CampaignStatusChoice.EXPIRED,
+    Campaign.CampaignStatusChoice.REJECTED,
+)
+
+
+def _redis():
+    return cache.client.get_client(write=True)
+
+
+def _key(name):
+    return str(cache.make_key(name))
+
+
+def _hour(moment):
+    return int(moment.timestamp()) // HOUR
+
+
+def _hour_key(hour):
+    return _key(f'trending:donations:{hour}')
+
+
+def _window():
+    """Return the hours of the recent window, the current one last."""
+    current = int(time.time()) // HOUR
+    return range(current - settings.TRENDING_WINDOW_HOURS + 1, current + 1)
+
+
+def _cents(amount):
+    return int(amount * 100)
+
+
+def record_donations(donations):
+    """Add `donations`, as (campaign id, amount, created at) tuples, to the rankings."""
+    raised, counts = defaultdict(int), Counter()
+    for campaign_id, amount, created_at in donations:
+        raised[campaign_id] += _cents(amount)
+        counts[_hour(created_at), campaign_id] += 1
+
+    pipeline = _redis().pipeline(transaction=False)
+    for campaign_id, cents in raised.items():
+        pipeline.zincrby(_key(RAISED), cents, campaign_id)
+    for (hour, campaign_id), count in counts.items():
+        pipeline.zincrby(_hour_key(hour), count, campaign_id)
+    for hour in {bucket for bucket, _ in counts}:
+        pipeline.expireat(_hour_key(hour), (hour + settings.TRENDING_WINDOW_HOURS) * HOUR)
+    pipeline.execute()
+
+
+def _record_committed(donations):
+    try:
+        record_donations(donations)
+    except Exception:
+        # The donations are committed; the rankings catch up on the next rebuild.
+        logger.exception('Failed to add donations to the trending rankings')
+
+
+def schedule_trending_update(donations):
+    """Add `donations`, as (campaign id, amount, created at) tuples, to the rankings once the transaction commits."""
+    donations = list(donations)
+    if donations:
+        transaction.on_commit(lambda: _record_committed(donations))
+
+
+def _recent_key():
+    """Return the key of the stored union of the window's hour sets, building it when missing."""
+    window = _window()
+    key = _key(f'trending:recent:{window[-1]}')
+    client = _redis()
+    if not client.exists(key):
+        pipeline = client.pipeline(transaction=True)
+        pipeline.zunionstore(key, [_hour_key(hour) for hour in window])
+        pipeline.expire(key, settings.TRENDING_RECENT_TIMEOUT)
+        pipeline.execute()
+    return key
+
+
+def _ranked(key, limit, score_field=None):
+    """Return the representations of the top `limit` active campaigns of a ranking."""
+    client = _redis()
+    ranked, start = [], 0
+    while len(ranked) < limit:
+        # Read past the limit, as some ranked campaigns may not be active any more.
+        entries = client.zrevrange(key, start, start + 2 * limit - 1, withscores=True)
+        if not entries:
+            break
+        start += len(entries)
+        scores = {int(member): score for member, score in entries}
+        for representation in campaign_representations(list(scores)):
+            if representation['status'] != Campaign.CampaignStatusChoice.ACTIVE:
+                continue
+            if score_field:
+                representation = {**representation, score_field: int(scores[representation['id']])}
+            ranked.append(representation)
+    return ranked[:limit]
+
+
+def trending_campaigns(limit=None):
+    """Return the top active campaigns by raised amount and by donations in the recent window."""
+    limit = settings.TRENDING_SIZE if limit is None else limit
+    return {
+        'raised': _ranked(_key(RAISED), limit),
+        'recent': _ranked(_recent_key(), limit, 'recent_donations'),
+    }
+
+
+def prune_trending():
+    """Remove ended and deleted campaigns from the rankings; returns how many were removed."""
+    client = _redis()
+    keys = [_key(RAISED), *(_hour_key(hour) for hour in _window())]
+    members = {int(member) for key in keys for member in client.zrange(key, 0, -1)}
+    if not members:
+        return 0
+
+    live = Campaign.objects.filter(id__in=members).exclude(status__in=ENDED_STATUSES).values_list('id', flat=True)
+    ended = members - set(live)
+    if ended:
+        pipeline = client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.zrem(key, *ended)
+        pipeline.execute()
+    return len(ended)
+
+
+def rebuild_trending():
+    """
+    Rebuild the rankings from the database and return the number of ranked campaigns.
+
+    The new sets are written under temporary keys and renamed over the old ones in one
+    transaction, so readers never see them half built. Donations committed while the
+    database is read may be counted twice or not at all; run it while the rankings are
+    cold, before traffic reaches them.
+    """
+    raised = {
+        campaign_id: _cents(amount + pending)
+        for campaign_id, amount, pending in Campaign.objects.exclude(status__in=ENDED_STATUSES)
+        .with_pending_raised().values_list('id', 'raised_amount', 'pending_raised')
+        if amount + pending
+    }
+
+    window = _window()
+    since = datetime.fromtimestamp(window[0] * HOUR, tz=dt_timezone.utc)
+    counts = defaultdict(dict)
+    rows = Donation.objects.filter(created_at__gte=since).exclude(campaign__status__in=ENDED_STATUSES).annotate(
+        hour=TruncHour('created_at', tzinfo=dt_timezone.utc),
+    ).values_list('campaign', 'hour').annotate(count=Count('id'))
+    for campaign_id, hour, count in rows:
+        counts[_hour(hour)][campaign_id] = count
+
+    client = _redis()
+    staged = {_key(RAISED): raised, **{_hour_key(hour): counts[hour] for hour in window}}
+    pipeline = client.pipeline(transaction=False)
+    for key, scores in staged.items():
+        pipeline.delete(f'{key}:rebuild')
+        if scores:
+            pipeline.zadd(f'{key}:rebuild', scores)
+    pipeline.execute()
+
+    pipeline = client.pipeline(transaction=True)
+    for key, scores in staged.items():
+        if scores:
+            pipeline.rename(f'{key}:rebuild', key)
+        else:
+            pipeline.delete(key)
+    for hour in window:
+        if counts[hour]:
+            pipeline.expireat(_hour_key(hour), (hour + settings.TRENDING_WINDOW_HOURS) * HOUR)
+    pipeline.delete(_key(f'trending:recent:{window[-1]}'))
+    pipeline.execute()
+
+    return len(raised.keys() | {campaign_id for scores in counts.values() for campaign_id in scores})
@@ -1,7 +1,9 @@
 """
 Views for the campaign API.
 """
-from django.core.cache import cache
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
 
 from rest_framework import status, viewsets
 from rest_framework.response import Response
@@ -10,16 +12,22 @@ from rest_framework.exceptions import ValidationError
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from main_app.caching import PUBLIC_CAMPAIGNS, invalidate_namespaces, json_bytes_response, user_campaigns
+from main_app.pagination import CatalogPagination
 from main_app.permissions import IsCampaignManager
-from main_app.utils import invalidate_cache
 
+from .catalog import get_catalog
+from .fragments import campaign_list_page
+from .representations import campaign_representations, invalidate_campaign_representations, with_absolute_urls
 from .serializers import (
     CampaignDetailSerializer,
     CampaignDocumentSerializer,
     CampaignDocumentUploadSerializer,
     CampaignImageSerializer,
     CampaignSerializer,
+    CatalogQuerySerializer,
 )
+from .trending import trending_campaigns
 from .models import Campaign
 
 import logging
@@ -39,24 +47,40 @@ class CampaignViewSet(viewsets.ModelViewSet):
         Retrieve campaigns with proper filtering:
         - “own” campaigns: everything where user == request.user
         - “public” campaigns: other users’ campaigns, but only if status is in [AC, CO, EX]
+
+        Only object lookups read this queryset, so visibility is a check on the row
+        found by primary key; lists are assembled from the fragments in `fragments`.
         """
         user = self.request.user
-        allowed_statuses = [
-            Campaign.CampaignStatusChoice.ACTIVE,
-            Campaign.CampaignStatusChoice.COMPLETED,
-            Campaign.CampaignStatusChoice.EXPIRED,
-        ]
 
-        own_qs = self.queryset.filter(user=user)
+        queryset = self.queryset.filter(Q(user=user) | Q(status__in=Campaign.PUBLIC_STATUSES))
 
-        public_qs = self.queryset.filter(status__in=allowed_statuses).exclude(user=user)
+        if settings.DONATION_COUNTER_SHARDS:
+            queryset = queryset.with_pending_raised()
 
-        return (own_qs | public_qs).order_by('-id')
+        return queryset
 
     def perform_create(self, serializer):
         """Create a new campaign."""
         serializer.save(user=self.request.user)
-        invalidate_cache('campaign_list', f'my_campaigns_{self.request.user.id}')
+        self._invalidate_campaign_caches(serializer.instance.id, serializer.instance.user_id)
+
+    def perform_update(self, serializer):
+        """Update a campaign."""
+        serializer.save()
+        self._invalidate_campaign_caches(serializer.instance.id, serializer.instance.user_id)
+
+    def perform_destroy(self, instance):
+        """Delete a campaign."""
+        campaign_id, owner_id = instance.id, instance.user_id
+        instance.delete()
+        self._invalidate_campaign_caches(campaign_id, owner_id)
+
+    @staticmethod
+    def _invalidate_campaign_caches(campaign_id, owner_id):
+        """Invalidate the campaign's cached representations and every cached list that may show it."""
+        invalidate_campaign_representations(campaign_id)
+        invalidate_namespaces(PUBLIC_CAMPAIGNS, user_campaigns(owner_id))
 
     def get_serializer_class(self):
         """Return a serializer class for request."""
@@ -71,59 +95,53 @@ class CampaignViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
     def list(self, request, *args, **kwargs):  # noqa
-        """Retrieve ordered campaigns with caching."""
-        cache_key = f'campaign_list_{request.user.id}'
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        response = super().list(request, *args, **kwargs)
-        cache.set(cache_key, response.data, 60 * 5)
-        return response
+        """Retrieve ordered campaigns, assembled from the cached public and own campaign fragments."""
+        response = self.paginator.get_keyset_response(
+            request,
+            lambda position, reverse, limit: campaign_list_page(request.user, position, reverse, limit),
+        )
+        return json_bytes_response(request, response)
 
     def create(self, request, *args, **kwargs):
         """Handle campaign creation."""
         try:
             response = super().create(request, *args, **kwargs)
-            invalidate_cache(f'campaign_list_{request.user.id}', f'my_campaigns_{self.request.user.id}')
             logger.info(f'New campaign created successfully by {request.user.email}')
             return response
         except ValidationError as e:
             logger.warning(f'Campaign creation validation error for {request.user.email}: {e.detail}')
             return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
 
-    def update(self, request, *args, **kwargs):
-        """Handle campaign update."""
-        response = super().update(request, *args, **kwargs)
-        invalidate_cache('campaign_list', f'my_campaigns_{self.request.user.id}')
-        return response
-
-    def partial_update(self, request, *args, **kwargs):
-        """Handle campaign partial update."""
-        response = super().partial_update(request, *args, **kwargs)
-        invalidate_cache('campaign_list', f'my_campaigns_{self.request.user.id}')
-        return response
-
-    def destroy(self, request, *args, **kwargs):
-        """Handle campaign deletion."""
-        response = super().destroy(request, *args, **kwargs)
-        invalidate_cache('campaign_list', f'my_campaigns_{self.request.user.id}')
-        return response
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a campaign, taking its representation from the per-object cache."""
+        campaign = self.get_object()
+        representations = campaign_representations([campaign.id], CampaignDetailSerializer)
+        if not representations:
+            raise Http404
+        return Response(with_absolute_urls(representations[0], request))
 
     @action(methods=['GET'], detail=False, url_path='my-campaigns')
     def my_campaigns(self, request):
-        """Retrieve campaigns created by the requesting user with caching."""
-        cache_key = f'my_campaigns_{request.user.id}'
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        campaigns = self.get_queryset().filter(user=request.user)
-        serializer = CampaignSerializer(campaigns, many=True)
-        cache.set(cache_key, serializer.data, 60 * 5)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """Retrieve campaigns created by the requesting user, assembled from cached representations."""
+        page = self.paginate_queryset(self.queryset.filter(user=request.user).values('id'))
+        campaigns = campaign_representations([row['id'] for row in page])
+        return json_bytes_response(request, self.get_paginated_response(campaigns))
+
+    @action(methods=['GET'], detail=False, url_path='public', pagination_class=CatalogPagination)
+    def public(self, request):
+        """Retrieve public campaigns, filtered and sorted from this worker's in-memory catalog snapshot."""
+        query = CatalogQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        selection = get_catalog().select(query.validated_data.get('status') or None, query.validated_data['ordering'])
+        page = self.paginate_queryset(selection)
+        return json_bytes_response(request, self.get_paginated_response(campaign_representations(page)))
+
+    @action(methods=['GET'], detail=False, url_path='trending')
+    def trending(self, request):
+        """Retrieve the top active campaigns by raised amount and by donations in the last day, ranked in Redis."""
+        return json_bytes_response(request, Response(trending_campaigns()))
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -133,7 +151,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
-            invalidate_cache('campaign_list', f'my_campaigns_{self.request.user.id}')
+            self._invalidate_campaign_caches(campaign.id, campaign.user_id)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -145,6 +163,6 @@ class CampaignViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             serializer.save(campaign=campaign)
-            invalidate_cache('campaign_list', f'my_campaigns_{request.user.id}')
+            self._invalidate_campaign_caches(campaign.id, campaign.user_id)
             return Response(CampaignDocumentSerializer(serializer.instance).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,82 @@
+"""
+Cache warmer for the shared campaign caches.
+
+Bulk status changes (the expiry sweep, moderation in the admin) invalidate the
+public list and many campaign representations at once. Rebuilding the first public
+pages and the touched campaigns' details right away means the next requests find
+them cached instead of all paying for a cold cache together.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from main_app.pagination import IdCursorPagination
+
+from .fragments import public_campaign_ids
+from .representations import campaign_representations
+from .serializers import CampaignDetailSerializer, CampaignSerializer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One warm runs at a time; a warm scheduled while another runs waits its turn.
+_warm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-warm')
+
+
+def _warm_representations(campaign_ids, serializer_class):
+    return len(campaign_representations(campaign_ids, serializer_class))
+
+
+def _warm_representations_in_thread(batch):
+    try:
+        return _warm_representations(*batch)
+    finally:
+        # Pool threads do not outlive the warm; neither should their connections.
+        connection.close()
+
+
+def warm_campaign_caches(campaign_ids=(), pages=None, concurrency=None):
+    """
+    Rebuild the first public list pages and the details of hot campaigns.
+
+    Hot campaigns are those on the warmed pages plus `campaign_ids`. Representations
+    are rebuilt in batches of a page by up to `concurrency` threads, each on its own
+    database connection; a `concurrency` of 1 warms in the calling thread. Entries
+    still cached are left as they are. Returns the number of warmed representations.
+    """
+    pages = settings.CACHE_WARM_PAGES if pages is None else pages
+    concurrency = settings.CACHE_WARM_CONCURRENCY if concurrency is None else concurrency
+    page_size = IdCursorPagination().page_size
+
+    listed = public_campaign_ids(None, False, pages * page_size)
+    detailed = list(dict.fromkeys([*campaign_ids, *listed]))
+    batches = [
+        (ids[start:start + page_size], serializer_class)
+        for ids, serializer_class in ((listed, CampaignSerializer), (detailed, CampaignDetailSerializer))
+        for start in range(0, len(ids), page_size)
+    ]
+
+    if concurrency <= 1:
+        return sum(_warm_representations(*batch) for batch in batches)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='cache-warm-batch') as executor:
+        return sum(executor.map(_warm_representations_in_thread, batches))
+
+
+def _warm_in_background(campaign_ids):
+    close_old_connections()
+    try:
+        warm_campaign_caches(campaign_ids)
+    except Exception:
+        logger.exception(f'Failed to warm campaign caches after changes to {list(campaign_ids)}')
+    finally:
+        close_old_connections()
+
+
+def schedule_cache_warm(*campaign_ids):
+    """Warm the campaign caches in the background once the current transaction commits."""
+    if not settings.CACHE_WARM_ENABLED:
+        return
+
+    transaction.on_commit(lambda: _warm_executor.submit(_warm_in_background, campaign_ids))
@@ -136,17 +136,106 @@ SPECTACULAR_SETTINGS = {
 
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'main_app.cache_backend.TieredRedisCache',
         'LOCATION': f"redis://{os.getenv('REDIS_HOST', 'redis')}:{os.getenv('REDIS_PORT', '6379')}/1",
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SERIALIZER': 'main_app.cache_codec.CompactSerializer',
         },
     }
 }
 
 CRONJOBS = [
     ('0 * * * *', 'django.core.management.call_command', ['expire_campaigns']),
+    ('* * * * *', 'django.core.management.call_command', ['rollup_campaign_counters']),
 ]
 
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
+
+# Donation write path
+
+# Number of counter shards per campaign; 0 updates `Campaign.raised_amount` in place.
+DONATION_COUNTER_SHARDS = int(os.environ.get('DONATION_COUNTER_SHARDS', 0))
+
+# Accept donations into a queue table (202 + token) and apply them with `apply_queued_donations`.
+DONATION_QUEUE_ENABLED = os.environ.get('DONATION_QUEUE_ENABLED', 'False') == 'True'
+
+# Render and store receipts in the background right after a donation commits.
+RECEIPT_PRERENDER = os.environ.get('RECEIPT_PRERENDER', 'True') == 'True'
+# Donations waiting to be pre-rendered per worker; further ones render on first download.
+RECEIPT_PRERENDER_MAX_PENDING = int(os.environ.get('RECEIPT_PRERENDER_MAX_PENDING', 500))
+
+# Receipt rendering process pool; 0 workers renders receipts inline in the calling process.
+RECEIPT_RENDER_WORKERS = int(os.environ.get('RECEIPT_RENDER_WORKERS', 2))
+# Render tasks queued or running at once before receipt downloads get 503.
+RECEIPT_RENDER_MAX_PENDING = int(os.environ.get('RECEIPT_RENDER_MAX_PENDING', 16))
+# Seconds to wait for a render before giving up.
+RECEIPT_RENDER_TIMEOUT = 10
+# Receipts per task sent to a worker by batch renders.
+RECEIPT_RENDER_BATCH_SIZE = 25
+
+# Caching
+
+# Range of campaign ids covered by one cached fragment of the public campaign list.
+CAMPAIGN_FRAGMENT_BUCKET_SIZE = int(os.environ.get('CAMPAIGN_FRAGMENT_BUCKET_SIZE', 256))
+
+# Cached JSON responses at least this large are stored and sent gzipped.
+CACHE_GZIP_MIN_BYTES = 1024
+
+# Stampede protection: one request rebuilds an expired entry under a short lock (seconds)
+# while the others serve the stale value for up to CACHE_STALE_TIMEOUT past expiry, or,
+# with no value at all, wait up to CACHE_LOCK_WAIT for the rebuild. CACHE_XFETCH_BETA > 1
+# favours earlier probabilistic refreshes, < 1 later ones.
+CACHE_STALE_TIMEOUT = 60
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 1
+CACHE_XFETCH_BETA = 1.0
+
+# In-process tier in front of Redis for keys starting with these prefixes, kept coherent
+# across workers over pub/sub. Entries live locally for at most CACHE_LOCAL_TIMEOUT
+# seconds. Each worker adds its per-key-family cache counters to the totals in Redis
+# every CACHE_STATS_FLUSH_INTERVAL seconds.
+CACHE_LOCAL_PREFIXES = ('generation:', 'campaign:', 'campaign_')
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 10000))
+CACHE_LOCAL_TIMEOUT = 5
+CACHE_STATS_FLUSH_INTERVAL = 10
+
+# Cached representations of these serializers are stored packed, without field names;
+# cache entries at least CACHE_COMPRESS_MIN_BYTES long are compressed.
+CACHE_CODEC_SCHEMAS = [
+    'campaign.serializers.CampaignSerializer',
+    'campaign.serializers.CampaignDetailSerializer',
+    'campaign.serializers.CampaignDocumentSerializer',
+]
+CACHE_COMPRESS_MIN_BYTES = 512
+
+# Rebuild the first public campaign list pages and hot campaign details right after bulk
+# status changes, with up to CACHE_WARM_CONCURRENCY threads.
+CACHE_WARM_ENABLED = os.environ.get('CACHE_WARM_ENABLED', 'True') == 'True'
+CACHE_WARM_PAGES = 3
+CACHE_WARM_CONCURRENCY = 4
+
+# Public campaign catalog snapshots held by each worker (seconds)
+
+# How often a worker applies the campaign change log to its snapshot.
+CATALOG_REFRESH_INTERVAL = 1
+# Snapshots are rebuilt from the campaign table this often regardless.
+CATALOG_FULL_REFRESH_INTERVAL = 60 * 10
+# Change log rows are deleted by `expire_campaigns` after this long.
+CATALOG_CHANGE_RETENTION = 60 * 60 * 24
+
+# Trending campaign rankings in Redis
+
+# Campaigns listed per ranking.
+TRENDING_SIZE = 10
+# Hours of donations counted by the recent ranking.
+TRENDING_WINDOW_HOURS = 24
+# Seconds the union of the window's hourly counts is reused before it is built again.
+TRENDING_RECENT_TIMEOUT = 60
+
+# Idempotency-Key handling for donation and top-up writes (seconds)
+
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+IDEMPOTENCY_WAIT_TIMEOUT = 10
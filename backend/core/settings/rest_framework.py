@@ -8,4 +8,6 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'main_app.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
 }
@@ -22,6 +22,7 @@ urlpatterns = [
     path('api/user/', include('user.urls')),
     path('api/campaign/', include('campaign.urls')),
     path('api/donation/', include('donation.urls')),
+    path('api/metrics/', include('main_app.urls')),
 ]
 
 if settings.DEBUG:
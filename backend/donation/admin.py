@@ -3,6 +3,18 @@ Django admin customizations for Donation model.
 """
 from django.contrib import admin
 
-from .models import Donation
+from .models import Donation, QueuedDonation
 
-admin.site.register(Donation)
+
+@admin.register(Donation)
+class DonationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'created_at')
+    list_select_related = ('user', 'campaign')
+    raw_id_fields = ('user', 'campaign')
+
+
+@admin.register(QueuedDonation)
+class QueuedDonationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'campaign', 'amount', 'created_at')
+    list_select_related = ('user', 'campaign')
+    raw_id_fields = ('user', 'campaign', 'donation')
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-17 10:14
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('campaign', '0008_campaign_campaign_status_id_idx_and_more'),
+        ('donation', '0003_queueddonation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='donation',
+            index=models.Index(fields=['user', '-id'], name='donation_user_id_idx'),
+        ),
+    ]
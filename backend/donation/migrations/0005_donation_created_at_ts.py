@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-17 13:20
+
+from django.db import migrations
+
+# First step of switching `created_at` from a date to a timestamp without rewriting
+# the table: a nullable column and a default are catalog-only changes, so rows
+# inserted from now on get their timestamp while existing ones are backfilled by
+# 0006 in batches. 0007 swaps the columns. The model state keeps the date column
+# until then.
+ADD_TIMESTAMP_COLUMN = """
+SET LOCAL lock_timeout = '5s';
+ALTER TABLE donation_donation ADD COLUMN created_at_ts timestamp with time zone;
+ALTER TABLE donation_donation ALTER COLUMN created_at_ts SET DEFAULT now();
+"""
+
+DROP_TIMESTAMP_COLUMN = """
+ALTER TABLE donation_donation DROP COLUMN created_at_ts;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0004_donation_donation_user_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(ADD_TIMESTAMP_COLUMN, DROP_TIMESTAMP_COLUMN),
+    ]
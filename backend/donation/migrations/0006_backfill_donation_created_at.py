@@ -0,0 +1,48 @@
+# Generated by Django 5.1.5 on 2026-10-17 13:20
+
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 10000
+
+# Every statement commits on its own (the migration is not atomic), so each batch
+# holds its row locks only briefly and the table stays writable throughout.
+BACKFILL_BATCH = """
+UPDATE donation_donation SET created_at_ts = created_at::timestamp with time zone
+WHERE id >= %s AND id < %s AND created_at_ts IS NULL
+"""
+
+# A validated CHECK lets SET NOT NULL skip its full scan under an exclusive lock;
+# validating it only blocks schema changes while it scans.
+SET_NOT_NULL = [
+    """
+    ALTER TABLE donation_donation
+    ADD CONSTRAINT donation_created_at_ts_not_null CHECK (created_at_ts IS NOT NULL) NOT VALID
+    """,
+    'ALTER TABLE donation_donation VALIDATE CONSTRAINT donation_created_at_ts_not_null',
+    'ALTER TABLE donation_donation ALTER COLUMN created_at_ts SET NOT NULL',
+    'ALTER TABLE donation_donation DROP CONSTRAINT donation_created_at_ts_not_null',
+]
+
+
+def backfill_created_at(apps, schema_editor):
+    """Copy the dates of donations made before 0005 into the timestamp column, as midnight UTC."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM donation_donation WHERE created_at_ts IS NULL')
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(BACKFILL_BATCH, [start, start + BACKFILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('donation', '0005_donation_created_at_ts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.RunSQL(SET_NOT_NULL, 'ALTER TABLE donation_donation ALTER COLUMN created_at_ts DROP NOT NULL'),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+# Dropping a column and renaming one only change the catalog; both run in one
+# transaction, so queries see either the date column or the timestamp one.
+SWAP_CREATED_AT = """
+SET LOCAL lock_timeout = '5s';
+ALTER TABLE donation_donation ALTER COLUMN created_at_ts DROP DEFAULT;
+ALTER TABLE donation_donation DROP COLUMN created_at;
+ALTER TABLE donation_donation RENAME COLUMN created_at_ts TO created_at;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0006_backfill_donation_created_at'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(SWAP_CREATED_AT)],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='donation',
+                    name='created_at',
+                    field=models.DateTimeField(auto_now_add=True),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-17 13:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('donation', '0007_alter_donation_created_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='donation',
+            index=models.Index(fields=['campaign', 'created_at'], name='donation_campaign_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='donation',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='donation_created_brin'),
+        ),
+    ]
@@ -2,10 +2,14 @@
 Database model for Donation API.
 """
 from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
 from campaign.models import Campaign
 
+import uuid
+
 
 class Donation(models.Model):
     """Donation object."""
@@ -15,7 +19,55 @@ class Donation(models.Model):
     )
     campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='donations')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
-    created_at = models.DateField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='donation_user_id_idx'),
+            models.Index(fields=['campaign', 'created_at'], name='donation_campaign_created_idx'),
+            # Donations are only appended, so creation time follows the physical row order
+            # and a block range summary indexes it in a fraction of a B-tree's size.
+            BrinIndex(fields=['created_at'], name='donation_created_brin'),
+        ]
 
     def __str__(self):
         return f'{self.user} - ${self.amount} - {self.campaign}'
+
+
+class QueuedDonation(models.Model):
+    """Donation accepted by the API and waiting to be applied by `apply_queued_donations`."""
+
+    class QueueStatusChoice(models.TextChoices):
+        """Status choices for a queued donation."""
+        PENDING = 'PE', _('Pending')
+        APPLIED = 'AP', _('Applied')
+        REJECTED = 'RE', _('Rejected')
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(
+        max_length=2,
+        choices=QueueStatusChoice,
+        default=QueueStatusChoice.PENDING,
+    )
+    donation = models.OneToOneField(Donation, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='PE'),
+                name='queued_donation_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.token} - {self.get_status_display()}'
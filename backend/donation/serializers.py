@@ -3,7 +3,7 @@ Serializers for the donation API view.
 """
 from rest_framework import serializers
 
-from .models import Donation
+from .models import Donation, QueuedDonation
 
 from decimal import Decimal
 import logging
@@ -19,7 +19,12 @@ class DonationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
     def validate(self, attrs):
-        """Validate donation amount against user balance."""
+        """
+        Validate donation amount against user balance.
+
+        The balance here is the one loaded with the request, so this is only an early
+        rejection; `commit_donation` re-checks it atomically while debiting.
+        """
         user = self.context['request'].user
         amount = attrs.get('amount', Decimal('0.00'))
 
@@ -35,3 +40,53 @@ class DonationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({'amount': 'Insufficient balance for donation.'})
 
         return attrs
+
+
+class QueuedDonationSerializer(serializers.ModelSerializer):
+    """Serializer for polling a queued donation."""
+    status = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = QueuedDonation
+        fields = ['token', 'campaign', 'amount', 'status', 'donation', 'error', 'created_at', 'processed_at']
+        read_only_fields = fields
+
+
+class StatementQuerySerializer(serializers.Serializer):
+    """Query parameters of a donation statement export."""
+    start = serializers.DateField()
+    end = serializers.DateField()
+    output = serializers.ChoiceField(choices=['pdf', 'zip'], default='pdf')
+
+    def validate(self, attrs):
+        """Ensure the period is not reversed."""
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'end': 'End date must not be before start date.'})
+        return attrs
+
+
+class BulkDonationListSerializer(serializers.ListSerializer):
+    """Validate a basket of donations as a whole."""
+
+    def validate(self, attrs):
+        """Validate the basket total against user balance."""
+        user = self.context['request'].user
+        total = sum((item['amount'] for item in attrs), Decimal('0.00'))
+
+        if total > user.balance:
+            logger.warning(
+                f'Insufficient balance for bulk donation by {user.email}. '
+                f'Required: {total}, Available: {user.balance}'
+            )
+            raise serializers.ValidationError({'amount': 'Insufficient balance for donation.'})
+
+        return attrs
+
+
+class BulkDonationSerializer(serializers.Serializer):
+    """Serializer for one item of a bulk donation."""
+    campaign = serializers.IntegerField(min_value=1)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+
+    class Meta:
+        list_serializer_class = BulkDonationListSerializer
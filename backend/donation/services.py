@@ -0,0 +1,410 @@
+"""
+Write paths for the donation API.
+"""
+from collections import defaultdict
+from decimal import Decimal
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from rest_framework.exceptions import ValidationError
+
+from campaign.models import Campaign, CampaignCounterShard, CampaignDonor
+from campaign.representations import invalidate_campaign_representations
+from campaign.trending import schedule_trending_update
+
+from main_app.receipts import schedule_receipt_prerender
+
+from .models import Donation, QueuedDonation
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The debit only happens while the campaign row is pinned with KEY SHARE, so the
+# credit and the insert below cannot miss it and the statement never half-applies.
+DEBIT_SQL = """
+    debit AS (
+        UPDATE {user_table}
+        SET balance = balance - %(amount)s
+        WHERE id = %(user_id)s
+            AND balance >= %(amount)s
+            AND EXISTS (SELECT 1 FROM {campaign_table} WHERE id = %(campaign_id)s FOR KEY SHARE)
+        RETURNING id, balance
+    )
+"""
+
+INSERT_DONATION_SQL = """
+    donation AS (
+        INSERT INTO {donation_table} (user_id, campaign_id, amount, created_at)
+        SELECT debit.id, %(campaign_id)s, %(amount)s, %(created_at)s
+        FROM debit
+        RETURNING id, created_at
+    )
+"""
+
+# Returns a row only for the donor's first donation to the campaign.
+INSERT_DONOR_SQL = """
+    donor AS (
+        INSERT INTO {donor_table} (campaign_id, user_id)
+        SELECT %(campaign_id)s, debit.id
+        FROM debit
+        ON CONFLICT (campaign_id, user_id) DO NOTHING
+        RETURNING campaign_id
+    )
+"""
+
+COMMIT_DONATION_SQL = """
+    WITH {debit}, {insert_donor}, credit AS (
+        UPDATE {campaign_table}
+        SET raised_amount = raised_amount + %(amount)s,
+            status = CASE
+                WHEN goal_amount <= raised_amount + %(amount)s THEN %(completed)s
+                ELSE status
+            END,
+            donation_count = donation_count + 1,
+            donor_count = donor_count + (SELECT COUNT(*) FROM donor),
+            last_donation_at = GREATEST(last_donation_at, %(created_at)s)
+        WHERE id = %(campaign_id)s AND EXISTS (SELECT 1 FROM debit)
+        RETURNING id, raised_amount, status
+    ), {insert_donation}
+    SELECT donation.id, donation.created_at, debit.balance, credit.raised_amount, 0, credit.status
+    FROM donation, debit, credit
+"""
+
+# The campaign row is only read here. The pending amount is the sum of its shards as of
+# the statement snapshot plus this donation.
+COMMIT_SHARDED_DONATION_SQL = """
+    WITH {debit}, {insert_donor}, credit AS (
+        INSERT INTO {shard_table} AS shard (campaign_id, shard, amount, donor_count, donation_count, last_donation_at)
+        SELECT %(campaign_id)s, %(shard)s, %(amount)s, (SELECT COUNT(*) FROM donor), 1, %(created_at)s
+        FROM debit
+        ON CONFLICT (campaign_id, shard) DO UPDATE SET
+            amount = shard.amount + EXCLUDED.amount,
+            donor_count = shard.donor_count + EXCLUDED.donor_count,
+            donation_count = shard.donation_count + EXCLUDED.donation_count,
+            last_donation_at = GREATEST(shard.last_donation_at, EXCLUDED.last_donation_at)
+        RETURNING campaign_id AS id
+    ), {insert_donation}
+    SELECT donation.id, donation.created_at, debit.balance, campaign.raised_amount,
+        %(amount)s + COALESCE((SELECT SUM(amount) FROM {shard_table} WHERE campaign_id = campaign.id), 0),
+        campaign.status
+    FROM donation, debit, credit, {campaign_table} AS campaign
+    WHERE campaign.id = %(campaign_id)s
+"""
+
+DEBIT_TOTAL_SQL = """
+    UPDATE {user_table}
+    SET balance = balance - %(amount)s
+    WHERE id = %(user_id)s AND balance >= %(amount)s
+    RETURNING balance
+"""
+
+# Key share locks keep the campaigns from being deleted without queueing sharded credits.
+LOCK_CAMPAIGN_KEYS_SQL = """
+    SELECT id FROM {campaign_table}
+    WHERE id = ANY(%s)
+    ORDER BY id
+    FOR KEY SHARE
+"""
+
+DEBIT_USERS_SQL = """
+    UPDATE {user_table} AS account
+    SET balance = account.balance - debit.amount
+    FROM (VALUES {values}) AS debit (id, amount)
+    WHERE account.id = debit.id
+"""
+
+# Only donors new to a campaign come back from the insert and are counted.
+INSERT_DONORS_SQL = """
+    donor AS (
+        INSERT INTO {donor_table} (campaign_id, user_id)
+        VALUES {donor_values}
+        ON CONFLICT (campaign_id, user_id) DO NOTHING
+        RETURNING campaign_id
+    ), credit AS (
+        SELECT credit.*, (SELECT COUNT(*) FROM donor WHERE donor.campaign_id = credit.id) AS donors
+        FROM (VALUES {values}) AS credit (id, shard, amount, donations, last_donation_at)
+    )
+"""
+
+CREDIT_CAMPAIGNS_SQL = """
+    WITH {insert_donors}
+    UPDATE {campaign_table} AS campaign
+    SET raised_amount = campaign.raised_amount + credit.amount,
+        status = CASE
+            WHEN campaign.goal_amount <= campaign.raised_amount + credit.amount THEN %s
+            ELSE campaign.status
+        END,
+        donor_count = campaign.donor_count + credit.donors,
+        donation_count = campaign.donation_count + credit.donations,
+        last_donation_at = GREATEST(campaign.last_donation_at, credit.last_donation_at)
+    FROM credit
+    WHERE campaign.id = credit.id
+"""
+
+CREDIT_SHARDS_SQL = """
+    WITH {insert_donors}
+    INSERT INTO {shard_table} AS shard (campaign_id, shard, amount, donor_count, donation_count, last_donation_at)
+    SELECT id, shard, amount, donors, donations, last_donation_at
+    FROM credit
+    ON CONFLICT (campaign_id, shard) DO UPDATE SET
+        amount = shard.amount + EXCLUDED.amount,
+        donor_count = shard.donor_count + EXCLUDED.donor_count,
+        donation_count = shard.donation_count + EXCLUDED.donation_count,
+        last_donation_at = GREATEST(shard.last_donation_at, EXCLUDED.last_donation_at)
+"""
+
+
+def credit_campaigns(donations, shards=None):
+    """
+    Credit the campaigns of `donations` with one set-based statement.
+
+    Adds each campaign's total to its raised amount and updates its donation
+    statistics; donors are counted once per campaign through `CampaignDonor`. Must run
+    inside the transaction that debited the donors. With counter shards each campaign's
+    credit goes to a random shard row instead.
+    """
+    if shards is None:
+        shards = settings.DONATION_COUNTER_SHARDS
+
+    totals, counts, latest = defaultdict(Decimal), defaultdict(int), {}
+    for donation in donations:
+        totals[donation.campaign_id] += donation.amount
+        counts[donation.campaign_id] += 1
+        latest[donation.campaign_id] = max(latest.get(donation.campaign_id, donation.created_at), donation.created_at)
+    campaign_ids = sorted(totals)
+
+    donor_pairs = sorted({(donation.campaign_id, donation.user_id) for donation in donations})
+
+    params = [value for pair in donor_pairs for value in pair]
+    for campaign_id in campaign_ids:
+        params += [
+            campaign_id, random.randrange(shards) if shards else None,
+            totals[campaign_id], counts[campaign_id], latest[campaign_id],
+        ]
+    insert_donors = INSERT_DONORS_SQL.format(
+        donor_table=CampaignDonor._meta.db_table,
+        donor_values=', '.join(['(%s, %s)'] * len(donor_pairs)),
+        values=', '.join(
+            ['(%s::bigint, %s::integer, %s::numeric, %s::integer, %s::timestamptz)'] * len(campaign_ids)
+        ),
+    )
+
+    if shards:
+        sql = CREDIT_SHARDS_SQL.format(insert_donors=insert_donors, shard_table=CampaignCounterShard._meta.db_table)
+    else:
+        sql = CREDIT_CAMPAIGNS_SQL.format(insert_donors=insert_donors, campaign_table=Campaign._meta.db_table)
+        params.append(Campaign.CampaignStatusChoice.COMPLETED)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+    transaction.on_commit(lambda: invalidate_campaign_representations(*campaign_ids))
+    schedule_trending_update((donation.campaign_id, donation.amount, donation.created_at) for donation in donations)
+
+
+def commit_donation(user, campaign, amount, shards=None):
+    """
+    Debit the donor, credit the campaign and record the donation in a single statement.
+
+    The balance check is part of the debit itself, so a concurrent donation or a stale
+    `user.balance` can never push the balance below zero. The campaign is moved to
+    COMPLETED in the same statement once its goal is reached, like `Campaign.save()` does.
+
+    With counter shards (`DONATION_COUNTER_SHARDS`, or `shards` when given) the amount goes
+    to a random shard row instead, so donations to one campaign do not queue on its row;
+    the COMPLETED transition then happens in `rollup_counter_shards`.
+    """
+    if shards is None:
+        shards = settings.DONATION_COUNTER_SHARDS
+
+    template = COMMIT_SHARDED_DONATION_SQL if shards else COMMIT_DONATION_SQL
+    tables = {
+        'user_table': get_user_model()._meta.db_table,
+        'campaign_table': Campaign._meta.db_table,
+        'donation_table': Donation._meta.db_table,
+        'shard_table': CampaignCounterShard._meta.db_table,
+        'donor_table': CampaignDonor._meta.db_table,
+    }
+    sql = template.format(
+        debit=DEBIT_SQL.format(**tables),
+        insert_donor=INSERT_DONOR_SQL.format(**tables),
+        insert_donation=INSERT_DONATION_SQL.format(**tables),
+        **tables,
+    )
+    params = {
+        'user_id': user.pk,
+        'campaign_id': campaign.pk,
+        'amount': amount,
+        'completed': Campaign.CampaignStatusChoice.COMPLETED,
+        'created_at': now(),
+        'shard': random.randrange(shards) if shards else None,
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+
+    if row is None:
+        if not Campaign.objects.filter(pk=campaign.pk).exists():
+            logger.warning(f'Donation by {user.email} targets a missing campaign {campaign.pk}')
+            raise ValidationError({'campaign': 'Campaign does not exist.'})
+
+        logger.warning(f'Insufficient balance for donation by {user.email}. Required: {amount}')
+        raise ValidationError({'amount': 'Insufficient balance for donation.'})
+
+    donation_id, created_at, balance, raised_amount, pending_raised, campaign_status = row
+
+    schedule_receipt_prerender(donation_id)
+    transaction.on_commit(lambda: invalidate_campaign_representations(campaign.pk))
+    schedule_trending_update([(campaign.pk, amount, created_at)])
+
+    user.balance = balance
+    campaign.raised_amount = raised_amount
+    campaign.pending_raised = pending_raised
+    campaign.status = campaign_status
+
+    return Donation(id=donation_id, user=user, campaign=campaign, amount=amount, created_at=created_at)
+
+
+def commit_bulk_donation(user, items, shards=None):
+    """
+    Donate to several campaigns at once.
+
+    The basket total is debited with one conditional UPDATE, the donations are written
+    with `bulk_create` and the campaigns are credited with one set-based statement, all
+    in one transaction. Campaign rows are locked in id order to keep concurrent baskets
+    from deadlocking.
+    """
+    if shards is None:
+        shards = settings.DONATION_COUNTER_SHARDS
+
+    totals = defaultdict(Decimal)
+    for item in items:
+        totals[item['campaign']] += item['amount']
+    total = sum(totals.values(), Decimal('0.00'))
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                DEBIT_TOTAL_SQL.format(user_table=get_user_model()._meta.db_table),
+                {'user_id': user.pk, 'amount': total},
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            logger.warning(f'Insufficient balance for bulk donation by {user.email}. Required: {total}')
+            raise ValidationError({'amount': 'Insufficient balance for donation.'})
+
+        campaigns = Campaign.objects.filter(pk__in=totals).order_by('pk')
+        if not shards:
+            campaigns = campaigns.select_for_update(no_key=True)
+        missing = set(totals) - set(campaigns.values_list('pk', flat=True))
+
+        if missing:
+            logger.warning(f'Bulk donation by {user.email} targets missing campaigns {sorted(missing)}')
+            raise ValidationError({'campaign': f'Campaigns {sorted(missing)} do not exist.'})
+
+        donations = Donation.objects.bulk_create([
+            Donation(user=user, campaign_id=item['campaign'], amount=item['amount']) for item in items
+        ])
+        credit_campaigns(donations, shards)
+        schedule_receipt_prerender(*[donation.pk for donation in donations])
+
+    user.balance = row[0]
+    return donations
+
+
+def apply_queued_donations(batch_size=500, shards=None):
+    """
+    Apply up to `batch_size` pending queued donations in one transaction.
+
+    Queue rows are claimed with SKIP LOCKED, so several workers can drain the queue
+    side by side. Donors are locked once per batch and each donation is checked against
+    the running balance in queue order; donations to campaigns deleted since they were
+    queued are rejected; the accepted ones are written with one
+    `bulk_create`, one grouped donor UPDATE and one grouped campaign credit.
+    Returns the processed queue rows.
+    """
+    if shards is None:
+        shards = settings.DONATION_COUNTER_SHARDS
+
+    with transaction.atomic():
+        batch = list(
+            QueuedDonation.objects.select_for_update(skip_locked=True).filter(
+                status=QueuedDonation.QueueStatusChoice.PENDING,
+            ).order_by('id')[:batch_size]
+        )
+        if not batch:
+            return batch
+
+        balances = dict(
+            get_user_model().objects.select_for_update().filter(
+                pk__in={queued.user_id for queued in batch},
+            ).order_by('pk').values_list('pk', 'balance')
+        )
+        # Campaigns are locked for the rest of the batch, so the ones found cannot be deleted
+        # under it; rows whose campaign is already gone are rejected instead of failing the batch.
+        campaign_ids = sorted({queued.campaign_id for queued in batch})
+        if shards:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    LOCK_CAMPAIGN_KEYS_SQL.format(campaign_table=Campaign._meta.db_table), [campaign_ids],
+                )
+                existing = {row[0] for row in cursor.fetchall()}
+        else:
+            existing = set(
+                Campaign.objects.select_for_update(no_key=True).filter(
+                    pk__in=campaign_ids,
+                ).order_by('pk').values_list('pk', flat=True)
+            )
+
+        accepted = []
+        debits = defaultdict(Decimal)
+        for queued in batch:
+            queued.processed_at = now()
+            if queued.campaign_id not in existing:
+                queued.status = QueuedDonation.QueueStatusChoice.REJECTED
+                queued.error = 'Campaign does not exist.'
+                continue
+            if balances[queued.user_id] < queued.amount:
+                queued.status = QueuedDonation.QueueStatusChoice.REJECTED
+                queued.error = 'Insufficient balance for donation.'
+                continue
+
+            balances[queued.user_id] -= queued.amount
+            debits[queued.user_id] += queued.amount
+            accepted.append(queued)
+
+        if accepted:
+            donations = Donation.objects.bulk_create([
+                Donation(user_id=queued.user_id, campaign_id=queued.campaign_id, amount=queued.amount)
+                for queued in accepted
+            ])
+            for queued, donation in zip(accepted, donations):
+                queued.status = QueuedDonation.QueueStatusChoice.APPLIED
+                queued.donation = donation
+
+            user_ids = sorted(debits)
+            params = []
+            for user_id in user_ids:
+                params += [user_id, debits[user_id]]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    DEBIT_USERS_SQL.format(
+                        user_table=get_user_model()._meta.db_table,
+                        values=', '.join(['(%s::bigint, %s::numeric)'] * len(user_ids)),
+                    ),
+                    params,
+                )
+
+            credit_campaigns(donations, shards)
+            schedule_receipt_prerender(*[donation.pk for donation in donations])
+
+        QueuedDonation.objects.bulk_update(batch, ['status', 'donation', 'error', 'processed_at'])
+
+    return batch
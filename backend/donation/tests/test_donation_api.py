@@ -2,26 +2,53 @@
 Tests for Donation API..
 """
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
 
 from decimal import Decimal
+from unittest.mock import patch
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+import zlib
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from campaign.models import Campaign
+from campaign.models import Campaign, CampaignCounterShard
+from campaign.representations import campaign_representations, representation_key
+from campaign.serializers import CampaignSerializer
+from campaign.services import rollup_counter_shards
 
-from donation.models import Donation
+from donation.models import Donation, QueuedDonation
 from donation.serializers import DonationSerializer
+from donation.services import apply_queued_donations
+
+from main_app.receipt_renderer import ReceiptRenderer
+from main_app.receipts import PrerenderQueue, load_or_render_receipts, receipt_fingerprint, receipt_path
 
 DONATIONS_URL = reverse('donation:donation-list')
+BULK_DONATIONS_URL = reverse('donation:donation-bulk')
+STATEMENT_URL = reverse('donation:donation-statement')
 
 
 def receipt_url(donation_id):
     return reverse('donation:donation-receipt', args=[donation_id])
 
 
+def queued_url(token):
+    return reverse('donation:donation-queued', args=[token])
+
+
 def create_user(**params):
     """Create and return a new user."""
     return get_user_model().objects.create_user(**params)
@@ -65,6 +92,11 @@ class PrivateDonationAPITests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
         self.client = APIClient()
         self.user = create_user(email='testuser@example.com', password='testpass123', balance=Decimal('1000.00'))
         self.client.force_authenticate(self.user)
@@ -81,7 +113,23 @@ class PrivateDonationAPITests(TestCase):
         serializer = DonationSerializer(donations, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data[:-1], serializer.data[:-1])
+        self.assertEqual(res.json()['results'], serializer.data)
+
+    def test_retrieve_donations_cached_bytes(self):
+        """Test the cached donation list is served as JSON bytes with an ETag and answers If-None-Match with 304."""
+        for _ in range(20):
+            Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('10.00'))
+
+        res = self.client.get(DONATIONS_URL)
+        compressed = self.client.get(DONATIONS_URL, headers={'Accept-Encoding': 'gzip'})
+        not_modified = self.client.get(DONATIONS_URL, headers={'If-None-Match': res['ETag']})
+
+        self.assertEqual(len(res.json()['results']), 20)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), res.content)
+        self.assertEqual(compressed['ETag'], res['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b'')
 
     def test_donations_limited_to_user(self):
         """Test donations returned are limited to the authenticated user."""
@@ -94,9 +142,9 @@ class PrivateDonationAPITests(TestCase):
 
         res = self.client.get(DONATIONS_URL)
 
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['id'], donation.id)
-        self.assertEqual(res.data[0]['amount'], '300.00')
+        self.assertEqual(len(res.json()['results']), 1)
+        self.assertEqual(res.json()['results'][0]['id'], donation.id)
+        self.assertEqual(res.json()['results'][0]['amount'], '300.00')
 
     def test_create_donation_success(self):
         """Test creating a donation successfully updates user balance and campaign."""
@@ -113,6 +161,35 @@ class PrivateDonationAPITests(TestCase):
         self.assertIn('new_balance', res.data)
         self.assertIn('campaign_raised', res.data)
 
+    def test_create_donation_updates_stats(self):
+        """Test donations update the campaign's donation statistics, counting each donor once."""
+        other_user = create_user(email='other@example.com', password='testpass123', balance=Decimal('100.00'))
+        self.client.post(DONATIONS_URL, {'campaign': self.campaign.id, 'amount': '100.00'})
+        self.client.post(DONATIONS_URL, {'campaign': self.campaign.id, 'amount': '200.00'})
+        self.client.force_authenticate(other_user)
+        self.client.post(DONATIONS_URL, {'campaign': self.campaign.id, 'amount': '60.00'})
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(reverse('campaign:campaign-detail', args=[self.campaign.id]))
+
+        last = Donation.objects.latest('id')
+        self.assertEqual(res.data['donor_count'], 2)
+        self.assertEqual(res.data['donation_count'], 3)
+        self.assertEqual(res.data['average_donation'], '120.00')
+        self.assertEqual(Campaign.objects.get(pk=self.campaign.pk).last_donation_at, last.created_at)
+
+    def test_create_donation_invalidates_only_its_campaign_representation(self):
+        """Test a donation drops the cached representation of its campaign and keeps the others."""
+        other_campaign = Campaign.objects.create(user=self.user, title='Other', goal_amount=Decimal('5000.00'))
+        campaign_representations([self.campaign.id, other_campaign.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(DONATIONS_URL, {'campaign': self.campaign.id, 'amount': '500.00'})
+
+        self.assertIsNone(cache.get(representation_key(CampaignSerializer, self.campaign.id)))
+        self.assertIsNotNone(cache.get(representation_key(CampaignSerializer, other_campaign.id)))
+        self.assertEqual(campaign_representations([self.campaign.id])[0]['raised_amount'], '500.00')
+
     def test_create_donation_insufficient_balance(self):
         """Test creating a donation with insufficient balance returns error."""
         payload = {'campaign': self.campaign.id, 'amount': '1500.00'}
@@ -124,6 +201,105 @@ class PrivateDonationAPITests(TestCase):
         self.assertEqual(self.user.balance, Decimal('1000.00'))
         self.assertEqual(self.campaign.raised_amount, Decimal('0.00'))
 
+    def test_create_donation_completes_campaign(self):
+        """Test a donation reaching the goal marks the campaign as completed."""
+        campaign = Campaign.objects.create(user=self.user, title='Small Campaign', goal_amount=Decimal('100.00'))
+        payload = {'campaign': campaign.id, 'amount': '100.00'}
+
+        res = self.client.post(DONATIONS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, Campaign.CampaignStatusChoice.COMPLETED)
+        self.assertEqual(campaign.raised_amount, Decimal('100.00'))
+
+    def test_create_donation_stale_balance(self):
+        """Test the balance is re-checked in the database, not on the authenticated user object."""
+        get_user_model().objects.filter(pk=self.user.pk).update(balance=Decimal('100.00'))
+        payload = {'campaign': self.campaign.id, 'amount': '500.00'}
+
+        res = self.client.post(DONATIONS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('100.00'))
+        self.assertEqual(self.campaign.raised_amount, Decimal('0.00'))
+        self.assertFalse(Donation.objects.filter(user=self.user).exists())
+
+    def test_create_donation_single_statement(self):
+        """Test a donation is committed with one statement after the campaign lookup."""
+        payload = {'campaign': self.campaign.id, 'amount': '10.00'}
+
+        with self.assertNumQueries(2):
+            res = self.client.post(DONATIONS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['new_balance'], Decimal('990.00'))
+        self.assertEqual(res.data['campaign_raised'], Decimal('10.00'))
+
+    def test_create_donation_idempotent(self):
+        """Test retrying a donation with the same Idempotency-Key replays the first response."""
+        payload = {'campaign': self.campaign.id, 'amount': '100.00'}
+        headers = {'Idempotency-Key': 'donation-1'}
+
+        first = self.client.post(DONATIONS_URL, payload, headers=headers)
+        retry = self.client.post(DONATIONS_URL, payload, headers=headers)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Donation.objects.filter(user=self.user).count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('900.00'))
+
+    def test_create_donation_idempotency_key_reused(self):
+        """Test reusing an Idempotency-Key with a different payload returns error."""
+        headers = {'Idempotency-Key': 'donation-2'}
+        self.client.post(DONATIONS_URL, {'campaign': self.campaign.id, 'amount': '100.00'}, headers=headers)
+
+        res = self.client.post(DONATIONS_URL, {'campaign': self.campaign.id, 'amount': '200.00'}, headers=headers)
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Donation.objects.filter(user=self.user).count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0.1)
+    def test_create_donation_idempotency_key_in_flight(self):
+        """Test a duplicate of an in-flight request does not run the donation again."""
+        key_digest = hashlib.sha256(b'donation-3').hexdigest()
+        cache.set(f'idempotency_donation_{self.user.id}_{key_digest}_lock', 'in-flight', 30)
+        payload = {'campaign': self.campaign.id, 'amount': '100.00'}
+
+        res = self.client.post(DONATIONS_URL, payload, headers={'Idempotency-Key': 'donation-3'})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Donation.objects.filter(user=self.user).exists())
+
+    @override_settings(DONATION_COUNTER_SHARDS=4)
+    def test_create_donation_sharded_counter(self):
+        """Test a sharded donation goes to a counter shard and is still reported in totals."""
+        payload = {'campaign': self.campaign.id, 'amount': '300.00'}
+
+        res = self.client.post(DONATIONS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['campaign_raised'], Decimal('300.00'))
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.raised_amount, Decimal('0.00'))
+        shards = CampaignCounterShard.objects.filter(campaign=self.campaign)
+        self.assertEqual(sum(shard.amount for shard in shards), Decimal('300.00'))
+
+        res = self.client.get(reverse('campaign:campaign-detail', args=[self.campaign.id]))
+
+        self.assertEqual(res.data['raised_amount'], '300.00')
+
+        rollup_counter_shards()
+
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.donor_count, self.campaign.donation_count), (1, 1))
+        self.assertEqual(self.campaign.last_donation_at, Donation.objects.get(user=self.user).created_at)
+
     def test_create_donation_invalid_amount(self):
         """Test creating a donation with invalid amount returns error."""
         payload = {'campaign': self.campaign.id, 'amount': '-100.00'}
@@ -131,6 +307,144 @@ class PrivateDonationAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_bulk_donation_success(self):
+        """Test donating to several campaigns in one request."""
+        other_campaign = Campaign.objects.create(user=self.user, title='Other Campaign', goal_amount=Decimal('100.00'))
+        payload = [
+            {'campaign': self.campaign.id, 'amount': '200.00'},
+            {'campaign': other_campaign.id, 'amount': '100.00'},
+            {'campaign': self.campaign.id, 'amount': '50.00'},
+        ]
+
+        res = self.client.post(BULK_DONATIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['donations']), 3)
+        self.assertEqual(res.data['new_balance'], Decimal('650.00'))
+        self.user.refresh_from_db()
+        self.campaign.refresh_from_db()
+        other_campaign.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('650.00'))
+        self.assertEqual(self.campaign.raised_amount, Decimal('250.00'))
+        self.assertEqual(other_campaign.raised_amount, Decimal('100.00'))
+        self.assertEqual(other_campaign.status, Campaign.CampaignStatusChoice.COMPLETED)
+        self.assertEqual(Donation.objects.filter(user=self.user).count(), 3)
+        self.assertEqual((self.campaign.donor_count, self.campaign.donation_count), (1, 2))
+        self.assertEqual((other_campaign.donor_count, other_campaign.donation_count), (1, 1))
+        self.assertEqual(self.campaign.last_donation_at, Donation.objects.latest('id').created_at)
+
+    def test_bulk_donation_insufficient_balance(self):
+        """Test a basket over the balance is rejected as a whole."""
+        payload = [
+            {'campaign': self.campaign.id, 'amount': '600.00'},
+            {'campaign': self.campaign.id, 'amount': '600.00'},
+        ]
+
+        res = self.client.post(BULK_DONATIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('1000.00'))
+        self.assertFalse(Donation.objects.filter(user=self.user).exists())
+
+    def test_bulk_donation_missing_campaign(self):
+        """Test a basket with an unknown campaign is rolled back."""
+        payload = [
+            {'campaign': self.campaign.id, 'amount': '100.00'},
+            {'campaign': self.campaign.id + 1000, 'amount': '100.00'},
+        ]
+
+        res = self.client.post(BULK_DONATIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('1000.00'))
+        self.assertEqual(self.campaign.raised_amount, Decimal('0.00'))
+        self.assertFalse(Donation.objects.filter(user=self.user).exists())
+
+    def test_bulk_donation_empty(self):
+        """Test an empty basket returns error."""
+        res = self.client.post(BULK_DONATIONS_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(DONATION_QUEUE_ENABLED=True)
+    def test_queued_donation_applied(self):
+        """Test a queued donation is accepted with a token and applied by the worker."""
+        payload = {'campaign': self.campaign.id, 'amount': '400.00'}
+
+        res = self.client.post(DONATIONS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        token = res.data['token']
+        self.assertFalse(Donation.objects.filter(user=self.user).exists())
+        self.assertEqual(self.client.get(queued_url(token)).data['status'], 'Pending')
+
+        apply_queued_donations()
+
+        res = self.client.get(queued_url(token))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'Applied')
+        self.assertEqual(res.data['donation'], Donation.objects.get(user=self.user).id)
+        self.user.refresh_from_db()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('600.00'))
+        self.assertEqual(self.campaign.raised_amount, Decimal('400.00'))
+
+    def test_queued_donations_checked_in_order(self):
+        """Test queued donations over the running balance are rejected."""
+        other_user = create_user(email='other@example.com', password='testpass123', balance=Decimal('50.00'))
+        first = QueuedDonation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('700.00'))
+        second = QueuedDonation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('700.00'))
+        third = QueuedDonation.objects.create(user=other_user, campaign=self.campaign, amount=Decimal('50.00'))
+
+        batch = apply_queued_donations()
+
+        self.assertEqual(len(batch), 3)
+        for queued in (first, second, third):
+            queued.refresh_from_db()
+        self.assertEqual(first.status, QueuedDonation.QueueStatusChoice.APPLIED)
+        self.assertEqual(second.status, QueuedDonation.QueueStatusChoice.REJECTED)
+        self.assertEqual(third.status, QueuedDonation.QueueStatusChoice.APPLIED)
+        self.user.refresh_from_db()
+        other_user.refresh_from_db()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('300.00'))
+        self.assertEqual(other_user.balance, Decimal('0.00'))
+        self.assertEqual(self.campaign.raised_amount, Decimal('750.00'))
+        self.assertEqual((self.campaign.donor_count, self.campaign.donation_count), (2, 2))
+        self.assertEqual(apply_queued_donations(), [])
+
+    def test_queued_donation_to_deleted_campaign_rejected(self):
+        """Test a queued donation whose campaign is gone is rejected without holding up the batch."""
+        gone = Campaign.objects.create(user=self.user, title='Gone', goal_amount=Decimal('100.00'))
+        orphan = QueuedDonation.objects.create(user=self.user, campaign=gone, amount=Decimal('100.00'))
+        queued = QueuedDonation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('100.00'))
+        with connection.cursor() as cursor:
+            # Foreign keys are checked at commit, so the queue row outlives its campaign here.
+            cursor.execute(f'DELETE FROM {Campaign._meta.db_table} WHERE id = %s', [gone.id])
+        self.addCleanup(QueuedDonation.objects.filter(pk=orphan.pk).delete)
+
+        apply_queued_donations(shards=4)
+
+        orphan.refresh_from_db()
+        queued.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(orphan.status, QueuedDonation.QueueStatusChoice.REJECTED)
+        self.assertEqual(orphan.error, 'Campaign does not exist.')
+        self.assertEqual(queued.status, QueuedDonation.QueueStatusChoice.APPLIED)
+        self.assertEqual(self.user.balance, Decimal('900.00'))
+
+    def test_queued_donation_limited_to_user(self):
+        """Test a queued donation token is not visible to other users."""
+        other_user = create_user(email='other@example.com', password='testpass123')
+        queued = QueuedDonation.objects.create(user=other_user, campaign=self.campaign, amount=Decimal('1.00'))
+
+        res = self.client.get(queued_url(queued.token))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_receipt_generation(self):
         """Test generating a receipt for a user's donation."""
         donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('250.00'))
@@ -140,3 +454,180 @@ class PrivateDonationAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res['Content-Type'], 'application/pdf')
         self.assertIn('attachment; filename="receipt_', res['Content-Disposition'])
+
+    def test_receipt_stored_and_reused(self):
+        """Test a receipt is stored on first download and served with an ETag."""
+        donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('250.00'))
+        url = receipt_url(donation.id)
+
+        res = self.client.get(url)
+
+        fingerprint = receipt_fingerprint(donation)
+        self.assertEqual(res['ETag'], f'"{fingerprint}"')
+        self.assertTrue(default_storage.exists(receipt_path(fingerprint)))
+
+        with default_storage.open(receipt_path(fingerprint), 'rb') as receipt_file:
+            self.assertEqual(receipt_file.read(), res.content)
+        self.assertEqual(self.client.get(url).content, res.content)
+
+    def test_receipt_stored_once_by_concurrent_renders(self):
+        """Test a receipt stored by another render between the check and the write leaves no duplicate."""
+        donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('250.00'))
+        path = receipt_path(receipt_fingerprint(donation))
+        load_or_render_receipts([donation])
+
+        # The second render checked for the receipt, to load and to store it, before the first one stored it.
+        exists = default_storage.exists
+        checks = []
+
+        def missing_until_stored(name):
+            checks.append(name)
+            return checks.count(path) > 2 and exists(name)
+
+        with patch.object(default_storage, 'exists', side_effect=missing_until_stored):
+            load_or_render_receipts([donation])
+
+        self.assertEqual(os.listdir(os.path.dirname(default_storage.path(path))), [os.path.basename(path)])
+
+    def test_receipt_stamps_fields_on_static_form(self):
+        """Test a receipt parses, draws the shared static layer as a form and stamps the donation fields."""
+        donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('250.00'))
+
+        content = self.client.get(receipt_url(donation.id)).content
+
+        self.assertTrue(content.startswith(b'%PDF'))
+        startxref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', content).group(1))
+        offsets = re.findall(rb'(\d{10}) 00000 n ', content[startxref:])
+        objects = {}
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(content[int(offset):].startswith(f'{number} 0 obj\n'.encode()))
+            objects[number] = content[int(offset):content.index(b'endobj', int(offset))]
+
+        def stream(obj):
+            data = re.search(rb'stream\r?\n(.*?)endstream', obj, re.S).group(1)
+            return zlib.decompress(data)
+
+        form_number, form = next(
+            (number, obj) for number, obj in objects.items() if b'/Subtype /Form /Type /XObject' in obj
+        )
+        page = next(obj for obj in objects.values() if b'/Type /Page\n' in obj)
+        self.assertIn(f'/FormXob.ReceiptStatic {form_number} 0 R'.encode(), page)
+        contents = stream(objects[int(re.search(rb'/Contents (\d+) 0 R', page).group(1))])
+        self.assertIn(b'/FormXob.ReceiptStatic Do', contents)
+        self.assertIn(b'(Donation Receipt)', stream(form))
+        self.assertIn(b'(Amount: $250.00)', contents)
+
+    def test_receipt_renderer_busy(self):
+        """Test a receipt download returns 503 when the renderer queue is full."""
+        donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('250.00'))
+        renderer = ReceiptRenderer(max_workers=1, max_pending=1, timeout=10)
+        renderer._slots.acquire()
+
+        with patch('main_app.receipts.get_renderer', return_value=renderer):
+            res = self.client.get(receipt_url(donation.id))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertFalse(default_storage.exists(receipt_path(receipt_fingerprint(donation))))
+
+    @override_settings(RECEIPT_PRERENDER_MAX_PENDING=2, RECEIPT_RENDER_BATCH_SIZE=2)
+    def test_receipt_prerender_queue_full(self):
+        """Test donations arriving while the pre-render queue is full are dropped rather than queued."""
+        queue, rendering, release, batches = PrerenderQueue(), threading.Event(), threading.Event(), []
+
+        def prerender(donation_ids):
+            batches.append(donation_ids)
+            rendering.set()
+            release.wait(5)
+
+        with patch('main_app.receipts.prerender_receipts', side_effect=prerender):
+            self.assertEqual(queue.add((1,)), 0)
+            self.assertTrue(rendering.wait(5))
+            self.assertEqual(queue.add((2, 3, 4)), 1)
+            self.assertEqual(queue.add((5,)), 1)
+            self.assertEqual(len(queue), 2)
+            release.set()
+            queue._executor.shutdown(wait=True)
+
+        self.assertEqual(batches, [[1], [2, 3]])
+
+    def test_receipts_rendered_in_process_pool_batches(self):
+        """Test the batch API renders missing receipts in worker processes and stores them."""
+        donations = [
+            Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal(amount))
+            for amount in ('10.00', '20.00', '30.00')
+        ]
+        renderer = ReceiptRenderer(max_workers=1, max_pending=2, timeout=30)
+        self.addCleanup(renderer.shutdown)
+
+        with patch('main_app.receipts.get_renderer', return_value=renderer):
+            with patch.object(renderer, 'render_many', wraps=renderer.render_many) as render_many:
+                contents = load_or_render_receipts(donations)
+                self.assertEqual(load_or_render_receipts(donations), contents)
+
+        render_many.assert_called_once()
+        for donation, content in zip(donations, contents):
+            self.assertTrue(content.startswith(b'%PDF'))
+            with default_storage.open(receipt_path(receipt_fingerprint(donation)), 'rb') as receipt_file:
+                self.assertEqual(receipt_file.read(), content)
+
+    def test_receipt_not_modified(self):
+        """Test a receipt download with a matching If-None-Match returns 304."""
+        donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('250.00'))
+        url = receipt_url(donation.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_statement_zip(self):
+        """Test streaming a ZIP of receipts for a date range."""
+        donations = [
+            Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('10.00')) for _ in range(3)
+        ]
+        other_user = create_user(email='other@example.com', password='testpass123')
+        Donation.objects.create(user=other_user, campaign=self.campaign, amount=Decimal('10.00'))
+        today = donations[0].created_at.date()
+
+        res = self.client.get(STATEMENT_URL, {'start': today, 'end': today, 'output': 'zip'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), sorted(f'receipt_{donation.id}.pdf' for donation in donations))
+
+    def test_statement_pdf(self):
+        """Test streaming a PDF statement for a date range."""
+        donation = Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('10.00'))
+
+        day = donation.created_at.date()
+
+        res = self.client.get(STATEMENT_URL, {'start': day, 'end': day})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(res.streaming_content).startswith(b'%PDF'))
+
+    def test_statement_covers_whole_days(self):
+        """Test a statement period includes donations made at any time of its days and none outside them."""
+        times = ['2025-03-09T23:59:59Z', '2025-03-10T00:00:00Z', '2025-03-11T23:59:59Z', '2025-03-12T00:00:00Z']
+        donations = [
+            Donation.objects.create(user=self.user, campaign=self.campaign, amount=Decimal('10.00')) for _ in times
+        ]
+        for donation, created_at in zip(donations, times):
+            Donation.objects.filter(id=donation.id).update(created_at=created_at)
+
+        res = self.client.get(STATEMENT_URL, {'start': '2025-03-10', 'end': '2025-03-11', 'output': 'zip'})
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(res.streaming_content)))
+        expected = sorted(f'receipt_{donation.id}.pdf' for donation in donations[1:3])
+        self.assertEqual(sorted(archive.namelist()), expected)
+
+    def test_statement_invalid_period(self):
+        """Test a reversed statement period returns error."""
+        res = self.client.get(STATEMENT_URL, {'start': '2025-12-31', 'end': '2025-01-01'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,10 +1,14 @@
 """
 Views for the Donation API.
 """
-from django.db import transaction
-from django.db.models import F
-from django.http import HttpResponse
-from django.core.cache import cache
+from datetime import datetime, time, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.http import parse_etags
 
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
@@ -12,17 +16,29 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from campaign.models import Campaign
-
-from main_app.utils import generate_receipt, invalidate_cache
-
-from .models import Donation
-from .serializers import DonationSerializer
+from main_app.caching import cached_json_response, invalidate_namespaces, user_donations, versioned_key
+from main_app.idempotency import idempotent
+from main_app.pagination import page_cache_key
+from main_app.receipt_renderer import RendererBusy
+from main_app.receipts import load_or_render_receipt, receipt_fingerprint
+from main_app.statements import stream_receipts_zip, stream_statement_pdf
+
+from .models import Donation, QueuedDonation
+from .serializers import (
+    BulkDonationSerializer,
+    DonationSerializer,
+    QueuedDonationSerializer,
+    StatementQuerySerializer,
+)
+from .services import commit_bulk_donation, commit_donation
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+BULK_DONATION_MAX_ITEMS = 100
+STATEMENT_CURSOR_CHUNK_SIZE = 500
+
 
 class DonationViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
     queryset = Donation.objects.all()
@@ -31,47 +47,49 @@ class DonationViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.G
 
     def get_queryset(self):
         """Retrieve ordered donations."""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+        if self.action == 'receipt':
+            # Receipts print the donor and the campaign.
+            queryset = queryset.select_related('user', 'campaign')
+        return queryset
 
-    def list(self, request, *args, **kwargs):  # noqa
-        """Retrieve ordered donations with caching."""
-        cache_key = f'donation_list_{request.user.id}'
-        cached_data = cache.get(cache_key)
+    def get_serializer_class(self):
+        """Return a serializer class for request."""
+        if self.action == 'bulk':
+            return BulkDonationSerializer
 
-        if cached_data:
-            return Response(cached_data)
+        return self.serializer_class
 
-        response = super().list(request, *args, **kwargs)
-        cache.set(cache_key, response.data, 60 * 5)
-        return response
+    def list(self, request, *args, **kwargs):  # noqa
+        """Retrieve ordered donations with caching."""
+        cache_key = page_cache_key(
+            versioned_key(f'donation_list_{request.user.id}', user_donations(request.user.id)),
+            request,
+        )
+        return cached_json_response(request, cache_key, partial(super().list, request, *args, **kwargs))
 
+    @idempotent('donation')
     def create(self, request, *args, **kwargs):
         """Handle donation creation with validation."""
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
 
-            with transaction.atomic():
-                donation = serializer.save(user=request.user)
-
-                campaign = donation.campaign
-                amount = donation.amount
-                user = request.user
-
-                Campaign.objects.filter(pk=campaign.pk).update(raised_amount=F('raised_amount') + amount)
-
-                campaign.refresh_from_db()
-                campaign.save()
+            if settings.DONATION_QUEUE_ENABLED:
+                return self._enqueue(serializer)
 
-                user.deduct_balance(amount)
-                user.refresh_from_db()
+            donation = commit_donation(
+                request.user,
+                serializer.validated_data['campaign'],
+                serializer.validated_data['amount'],
+            )
 
-            invalidate_cache(f'donation_list_{request.user.id}')
+            invalidate_namespaces(user_donations(request.user.id))
             logger.info(f'Donation was made successfully by {request.user.email}')
             return Response({ # noqa
                 'status': 'Donation successful',
-                'new_balance': user.balance,
-                'campaign_raised': campaign.raised_amount
+                'new_balance': request.user.balance,
+                'campaign_raised': donation.campaign.total_raised
             }, status=status.HTTP_201_CREATED)
 
         except ValidationError as e:
@@ -82,16 +100,100 @@ class DonationViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.G
         """Create a new donation."""
         serializer.save(user=self.request.user)
 
+    def _enqueue(self, serializer):
+        """Queue a validated donation for `apply_queued_donations` and return its token."""
+        queued = QueuedDonation.objects.create(
+            user=self.request.user,
+            campaign=serializer.validated_data['campaign'],
+            amount=serializer.validated_data['amount'],
+        )
+        logger.info(f'Donation {queued.token} was queued by {self.request.user.email}')
+        return Response({'status': 'Donation queued', 'token': queued.token}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'queued/(?P<token>[0-9a-f]{8}-([0-9a-f]{4}-){3}[0-9a-f]{12})')
+    def queued(self, request, token=None):
+        """Retrieve the processing status of a queued donation."""
+        queued = get_object_or_404(QueuedDonation, token=token, user=request.user)
+        return Response(QueuedDonationSerializer(queued).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Donate to several campaigns in one request and one transaction."""
+        try:
+            serializer = self.get_serializer(
+                data=request.data,
+                many=True,
+                allow_empty=False,
+                max_length=BULK_DONATION_MAX_ITEMS,
+            )
+            serializer.is_valid(raise_exception=True)
+
+            donations = commit_bulk_donation(request.user, serializer.validated_data)
+
+            invalidate_namespaces(user_donations(request.user.id))
+            logger.info(f'Bulk donation of {len(donations)} items was made successfully by {request.user.email}')
+            return Response({
+                'status': 'Donation successful',
+                'new_balance': request.user.balance,
+                'donations': DonationSerializer(donations, many=True).data,
+            }, status=status.HTTP_201_CREATED)
+
+        except ValidationError as e:
+            logger.warning(f'Bulk donation validation failed for {request.user.email}: {e.detail}')
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['get'])
     def receipt(self, request, pk=None):
-        """Generate a receipt for a specific donation."""
+        """Serve the stored receipt for a specific donation, rendering it on first use."""
         donation = self.get_object()
 
-        if donation.user != request.user:
+        if donation.user_id != request.user.id:
             return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
 
-        receipt_buffer = generate_receipt(donation)
-        response = HttpResponse(receipt_buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="receipt_{donation.id}.pdf"'
+        fingerprint = receipt_fingerprint(donation)
+        etag = f'"{fingerprint}"'
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            try:
+                content = load_or_render_receipt(donation, fingerprint)
+            except RendererBusy as e:
+                logger.warning(f'Receipt for donation {donation.id} not rendered: {e}')
+                response = Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                response['Retry-After'] = '1'
+                return response
+            response = HttpResponse(content, content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="receipt_{donation.id}.pdf"'
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
+    @action(detail=False, methods=['get'])
+    def statement(self, request):
+        """Stream a PDF statement or a ZIP of receipts for the donations in a date range."""
+        query = StatementQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        start, end, output = query.validated_data['start'], query.validated_data['end'], query.validated_data['output']
+        # Whole days as a half-open timestamp range, so the creation time indexes apply.
+        donations = self.get_queryset().filter(
+            created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+            created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        ).select_related('user', 'campaign').order_by('created_at', 'id')
+        donations = donations.iterator(chunk_size=STATEMENT_CURSOR_CHUNK_SIZE)
+
+        if output == 'zip':
+            response = StreamingHttpResponse(stream_receipts_zip(donations), content_type='application/zip')
+        else:
+            response = StreamingHttpResponse(
+                stream_statement_pdf(request.user, donations, start, end),
+                content_type='application/pdf',
+            )
+        response['Content-Disposition'] = f'attachment; filename="statement_{start}_{end}.{output}"'
+
+        logger.info(f'Donation statement ({output}) for {start} - {end} requested by {request.user.email}')
         return response
@@ -0,0 +1,400 @@
+"""
+Two-tier cache backend: a bounded in-process LRU/TTL tier in front of django_redis.
+
+Reads of keys under `CACHE_LOCAL_PREFIXES` are answered from the worker's own memory
+when possible, without a Redis round trip or unpickling. Every write to such a key is
+broadcast over Redis pub/sub, so the other workers drop their copy; entries also
+expire locally after `CACHE_LOCAL_TIMEOUT`, which bounds staleness should a message
+be lost. Values in the local tier are shared by every reader in the process and must
+not be mutated.
+
+Every read and write is also counted per key family (see `key_family`): reads by the
+tier that answered them, latency, and the size of written payloads. Each worker adds
+its counts to totals in Redis periodically, which `cache_stats()` reports.
+"""
+from collections import OrderedDict, defaultdict
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from django_redis.cache import RedisCache
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+TIERS = ('local', 'redis', 'miss')
+
+_FAMILY = re.compile(r'[a-z]+(?:_[a-z]+)*')
+
+# Sent instead of a key list to drop every locally cached entry.
+_FLUSH = '*'
+
+
+def key_family(key):
+    """
+    Return the family of a cache key: its leading lowercase words, before any id or separator.
+
+    `campaign_own_7:…` is in `campaign_own`, `campaign:CampaignSerializer:v1:7` in
+    `campaign` and `etag:donation_list_7:…` in `etag`.
+    """
+    match = _FAMILY.match(key) if isinstance(key, str) else None
+    return match.group() if match else 'other'
+
+
+class LocalTier:
+    """A process-wide LRU of cached values with per-entry expiry, kept coherent by a pub/sub listener."""
+
+    def __init__(self, channel, stats_key, get_connection, max_entries):
+        self.channel = channel
+        self.stats_key = stats_key
+        self.origin = uuid.uuid4().hex
+        self.max_entries = max_entries
+        self._get_connection = get_connection
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._listener = None
+        self.connected = False
+        # Bumped by every invalidation, so a value read from Redis before an
+        # invalidation arrived is not kept locally after it.
+        self.epoch = 0
+        # Counters by "family|metric" since the process started; updated without
+        # locking, so approximate.
+        self.stats = defaultdict(float)
+        self._flushed_stats = {}
+        self._flush_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid != os.getpid():
+            # Forked: the parent's entries and listener thread are not ours.
+            self.__init__(self.channel, self.stats_key, self._get_connection, self.max_entries)
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(
+                        target=self._listen, name='cache-invalidation', daemon=True,
+                    )
+                    self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                connection = self._get_connection()
+                pubsub = connection.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.connected = True
+                flushed_at = time.monotonic()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        origin, keys = json.loads(message['data'])
+                        if origin != self.origin:
+                            self.evict(keys)
+                    if time.monotonic() - flushed_at >= settings.CACHE_STATS_FLUSH_INTERVAL:
+                        self.flush_stats(connection)
+                        flushed_at = time.monotonic()
+            except Exception:
+                logger.exception('Cache invalidation listener disconnected')
+            # Messages may have been missed while disconnected.
+            self.connected = False
+            self.evict(_FLUSH)
+            time.sleep(1)
+
+    def record(self, family, metric, amount=1):
+        """Add to a counter of a key family."""
+        self.stats[f'{family}|{metric}'] += amount
+
+    def flush_stats(self, connection):
+        """Add the counts recorded since the last flush to the totals of all workers in Redis."""
+        # Flushes from the listener and from callers would otherwise add the same counts twice.
+        with self._flush_lock:
+            stats = dict(self.stats)
+            pipeline = connection.pipeline(transaction=False)
+            for field, amount in stats.items():
+                if amount != self._flushed_stats.get(field, 0):
+                    pipeline.hincrbyfloat(self.stats_key, field, amount - self._flushed_stats.get(field, 0))
+            pipeline.execute()
+            self._flushed_stats = stats
+
+    def fetch(self, key):
+        """Return the local value of `key`, or `_MISSING`."""
+        self._ensure_listener()
+        if not self.connected:
+            return _MISSING
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def store(self, key, value, timeout, epoch):
+        """Keep a value locally, unless an invalidation arrived since `epoch` was read."""
+        if not self.connected or (timeout is not None and timeout <= 0):
+            return
+        timeout = settings.CACHE_LOCAL_TIMEOUT if timeout is None else min(timeout, settings.CACHE_LOCAL_TIMEOUT)
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, keys):
+        """Drop local values, all of them for `_FLUSH`."""
+        with self._lock:
+            self.epoch += 1
+            if keys == _FLUSH:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TieredRedisCache(RedisCache):
+    """
+    django_redis cache with an in-process tier for keys under `CACHE_LOCAL_PREFIXES`.
+
+    Django creates a cache instance per thread; they all share one `LocalTier` per
+    Redis location, so a process holds a single bounded copy of hot values.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        tier_name = f'{server}|{self.key_prefix}'
+        with _tiers_lock:
+            if tier_name not in _tiers:
+                _tiers[tier_name] = LocalTier(
+                    channel=f'{self.key_prefix}cache:invalidate',
+                    stats_key=f'{self.key_prefix}cache:stats',
+                    get_connection=lambda: self.client.get_client(write=True),
+                    max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+                )
+        self.tier = _tiers[tier_name]
+        # Sizes of the payloads encoded by the current write, in order.
+        self._encoded_sizes = []
+
+    @property
+    def client(self):
+        """The django_redis client, with `encode` recording the size of every payload it produces."""
+        client = super().client
+        if 'encode' not in vars(client):
+            encode = client.encode
+
+            def sized_encode(value):
+                encoded = encode(value)
+                # Integers are stored as they are, so counters can be incremented in Redis.
+                self._encoded_sizes.append(len(encoded) if isinstance(encoded, bytes) else len(str(encoded)))
+                return encoded
+            client.encode = sized_encode
+        return client
+
+    def _tiered(self, key):
+        return isinstance(key, str) and key.startswith(settings.CACHE_LOCAL_PREFIXES)
+
+    def _local_key(self, key, version):
+        return str(self.make_key(key, version=version))
+
+    def _local_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _start_write(self):
+        self._encoded_sizes.clear()
+        return time.perf_counter()
+
+    def _record_writes(self, keys, started):
+        """Count writes of `keys` with a share of the elapsed time and the size of the payloads encoded for them."""
+        elapsed = (time.perf_counter() - started) / len(keys) if keys else 0
+        # The client encodes the values in the order of the keys, once each.
+        for key, size in zip(keys, self._encoded_sizes):
+            family = key_family(key)
+            self.tier.record(family, 'sets')
+            self.tier.record(family, 'set_seconds', elapsed)
+            self.tier.record(family, 'set_bytes', size)
+
+    def _broadcast(self, keys):
+        """Drop keys from this process's tier and tell the other workers to drop theirs."""
+        if not keys:
+            return
+        self.tier.evict(keys)
+        try:
+            self.client.get_client(write=True).publish(self.tier.channel, json.dumps([self.tier.origin, keys]))
+        except Exception:
+            # Other workers still drop the entry once it expires locally.
+            logger.exception('Failed to broadcast cache invalidation')
+
+    def get(self, key, default=None, version=None, client=None):
+        started = time.perf_counter()
+        tiered = self._tiered(key)
+        local_key = self._local_key(key, version) if tiered else None
+        value = self.tier.fetch(local_key) if tiered else _MISSING
+        if value is not _MISSING:
+            tier = 'local'
+        else:
+            epoch = self.tier.epoch
+            value = super().get(key, _MISSING, version, client)
+            tier = 'miss' if value is _MISSING else 'redis'
+            if tiered and tier == 'redis':
+                self.tier.store(local_key, value, None, epoch)
+
+        family = key_family(key)
+        self.tier.record(family, tier)
+        self.tier.record(family, 'get_seconds', time.perf_counter() - started)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None, client=None):
+        started = time.perf_counter()
+        found, tiers, remote = {}, {}, []
+        for key in keys:
+            value = self.tier.fetch(self._local_key(key, version)) if self._tiered(key) else _MISSING
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key], tiers[key] = value, 'local'
+
+        if remote:
+            epoch = self.tier.epoch
+            fetched = super().get_many(remote, version=version, client=client)
+            for key in remote:
+                tiers[key] = 'redis' if key in fetched else 'miss'
+                if key in fetched and self._tiered(key):
+                    self.tier.store(self._local_key(key, version), fetched[key], None, epoch)
+            found.update(fetched)
+
+        elapsed = (time.perf_counter() - started) / len(tiers) if tiers else 0
+        for key, tier in tiers.items():
+            family = key_family(key)
+            self.tier.record(family, tier)
+            self.tier.record(family, 'get_seconds', elapsed)
+        return {key: found[key] for key in keys if key in found}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None, nx=False, xx=False):  # noqa
+        started = self._start_write()
+        result = super().set(key, value, timeout, version, client, nx, xx)
+        self._record_writes([key], started)
+        if self._tiered(key):
+            local_key = self._local_key(key, version)
+            self._broadcast([local_key])
+            if result:
+                self.tier.store(local_key, value, self._local_timeout(timeout), self.tier.epoch)
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        started = self._start_write()
+        result = super().set_many(data, timeout, version, client)
+        self._record_writes(list(data), started)
+        tiered = {self._local_key(key, version): value for key, value in data.items() if self._tiered(key)}
+        self._broadcast(list(tiered))
+        epoch = self.tier.epoch
+        for local_key, value in tiered.items():
+            self.tier.store(local_key, value, self._local_timeout(timeout), epoch)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        started = self._start_write()
+        result = super().add(key, value, timeout, version, client)
+        self._record_writes([key], started)
+        if result and self._tiered(key):
+            self._broadcast([self._local_key(key, version)])
+        return result
+
+    def delete(self, key, version=None, prefix=None, client=None):
+        result = super().delete(key, version, prefix, client)
+        if self._tiered(key):
+            self._broadcast([self._local_key(key, version)])
+        return result
+
+    def delete_many(self, keys, version=None, client=None):
+        result = super().delete_many(keys, version, client)
+        self._broadcast([self._local_key(key, version) for key in keys if self._tiered(key)])
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        result = super().delete_pattern(*args, **kwargs)
+        self._broadcast(_FLUSH)
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None, ignore_key_check=False):
+        result = super().incr(key, delta, version, client, ignore_key_check)
+        if self._tiered(key):
+            self._broadcast([self._local_key(key, version)])
+        return result
+
+    def decr(self, key, delta=1, version=None, client=None):
+        result = super().decr(key, delta, version, client)
+        if self._tiered(key):
+            self._broadcast([self._local_key(key, version)])
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self._broadcast(_FLUSH)
+        return result
+
+    def cache_stats(self):
+        """
+        Return the totals of all workers per key family and per tier.
+
+        Families report their reads by the tier that answered them, hit ratios, mean
+        get and set latency in milliseconds and the mean size of written payloads.
+        """
+        totals = self.client.get_client(write=False).hgetall(self.tier.stats_key)
+        counters = defaultdict(lambda: defaultdict(float))
+        for field, amount in totals.items():
+            family, metric = field.decode().split('|')
+            counters[family][metric] = float(amount)
+
+        families = {family: _summary(counts) for family, counts in sorted(counters.items())}
+        tiers = defaultdict(float)
+        for counts in counters.values():
+            for tier in TIERS:
+                tiers[tier] += counts[tier]
+        return {
+            'families': families,
+            'tiers': {
+                **_summary(tiers),
+                'local_entries': len(self.tier),
+                'local_max_entries': self.tier.max_entries,
+            },
+        }
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _summary(counts):
+    """Summarize the counters of a key family, or of every family together."""
+    reads = sum(counts[tier] for tier in TIERS)
+    redis_reads = counts['redis'] + counts['miss']
+    return {
+        **{tier: int(counts[tier]) for tier in TIERS},
+        'hit_ratio': _ratio(counts['local'] + counts['redis'], reads),
+        'local_hit_ratio': _ratio(counts['local'], reads),
+        'redis_hit_ratio': _ratio(counts['redis'], redis_reads),
+        'get_ms': _ratio(counts['get_seconds'] * 1000, reads),
+        'sets': int(counts['sets']),
+        'set_ms': _ratio(counts['set_seconds'] * 1000, counts['sets']),
+        'set_bytes': _ratio(counts['set_bytes'], counts['sets']),
+    }
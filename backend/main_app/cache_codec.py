@@ -0,0 +1,228 @@
+"""
+Compact cache serializer for API representations.
+
+Cached representations are dicts shaped by a handful of DRF serializers, so their
+field names are the same in every entry. Dicts whose keys match a serializer listed
+in `CACHE_CODEC_SCHEMAS` are stored as a tuple of their values, tagged with a short
+hash of the schema instead of the field names. Decimal amounts are stored as integer
+minor units and dates as day ordinals; nested lists of rows are packed the same way.
+The packed tuples are written with `marshal`, a C codec for plain Python values.
+Anything else is pickled as before, and entries over `CACHE_COMPRESS_MIN_BYTES` are
+compressed with zlib.
+
+An entry is told apart by its first byte: pickles start with 0x80, packed and
+compressed entries with one of the tags below. Entries written by the plain pickle
+serializer therefore stay readable.
+"""
+from datetime import date
+from functools import partial
+import hashlib
+import marshal
+import pickle
+import zlib
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from django_redis.serializers.base import BaseSerializer
+
+from rest_framework import serializers
+
+MARSHAL_VERSION = 4
+
+# First byte of a stored entry, ORed with COMPRESSED when the rest is zlib data.
+PICKLED = 0x01
+PACKED_ROW = 0x02
+PACKED_ENVELOPE = 0x03
+PACKED_ROWS = 0x04
+COMPRESSED = 0x10
+
+_PICKLE_PROTOCOL = 0x80
+
+
+class Unpackable(Exception):
+    """A value does not fit its schema and is pickled instead."""
+
+
+class Schema:
+    """The field names and per-field codecs of one serializer's representations."""
+
+    def __init__(self, serializer_class):
+        self.fields = tuple(serializer_class.Meta.fields)
+        self.id = hashlib.sha256(f'{serializer_class.__name__}:{self.fields}'.encode()).digest()[:4]
+        declared = serializer_class().fields
+        # (position, name, pack, unpack) of the fields not stored as they are.
+        self.converters = [
+            (position, name, *converter)
+            for position, name in enumerate(self.fields)
+            if (converter := self._converter(declared[name])) is not None
+        ]
+
+    def _converter(self, field):
+        if isinstance(field, serializers.DecimalField):
+            places = field.decimal_places
+            return partial(_pack_scaled, places=places), partial(_unpack_scaled, places=places)
+        if isinstance(field, serializers.DateField):
+            return _pack_date, _unpack_date
+        if isinstance(field, serializers.ListSerializer):
+            return partial(_pack_nested, serializer_class=type(field.child)), _unpack_rows
+        return None
+
+    def pack(self, row):
+        values = list(row.values())
+        for position, _, pack, _ in self.converters:
+            if values[position] is not None:
+                values[position] = pack(values[position])
+        return tuple(values)
+
+    def unpack(self, values):
+        row = dict(zip(self.fields, values))
+        for _, name, _, unpack in self.converters:
+            if row[name] is not None:
+                row[name] = unpack(row[name])
+        return row
+
+
+def _pack_scaled(value, places):
+    """Return a DRF decimal string with exactly `places` decimals as an integer of minor units."""
+    if not isinstance(value, str):
+        raise Unpackable(value)
+    whole, _, fraction = value.partition('.')
+    if len(fraction) != places:
+        raise Unpackable(value)
+    return int(whole + fraction)
+
+
+def _unpack_scaled(value, places):
+    if not places:
+        return str(value)
+    whole, fraction = divmod(abs(value), 10 ** places)
+    return f"{'-' if value < 0 else ''}{whole}.{fraction:0{places}d}"
+
+
+def _pack_date(value):
+    try:
+        day = date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise Unpackable(value)
+    if day.isoformat() != value:
+        raise Unpackable(value)
+    return day.toordinal()
+
+
+def _unpack_date(value):
+    return date.fromordinal(value).isoformat()
+
+
+def _pack_nested(rows, serializer_class):
+    return _pack_rows(rows, get_schema(serializer_class))
+
+
+def _pack_rows(rows, schema):
+    if not isinstance(rows, list) or schema is None:
+        raise Unpackable(rows)
+    return (schema.id, [schema.pack(row) for row in rows])
+
+
+def _unpack_rows(packed):
+    schema_id, rows = packed
+    schema = _schemas_by_id()[schema_id]
+    return [schema.unpack(row) for row in rows]
+
+
+_schemas = None
+
+
+def _load_schemas():
+    global _schemas
+    if _schemas is None:
+        schemas = [Schema(import_string(path)) for path in settings.CACHE_CODEC_SCHEMAS]
+        _schemas = (
+            {schema.fields: schema for schema in schemas},
+            {schema.id: schema for schema in schemas},
+        )
+    return _schemas
+
+
+def _schemas_by_id():
+    return _load_schemas()[1]
+
+
+def get_schema(serializer_class):
+    """Return the schema registered for a serializer class, or None."""
+    return _load_schemas()[0].get(tuple(serializer_class.Meta.fields))
+
+
+def _row_schema(value):
+    if type(value) is dict:
+        return _load_schemas()[0].get(tuple(value))
+    return None
+
+
+def _pack(value):
+    """Return the tag and marshalled body of a value that fits a schema, or None."""
+    schema = _row_schema(value)
+    if schema is not None:
+        return PACKED_ROW, (schema.id, schema.pack(value))
+
+    if type(value) is tuple and len(value) == 3 and (schema := _row_schema(value[0])) is not None:
+        # A stampede-protection envelope: (representation, expires_at, build time).
+        return PACKED_ENVELOPE, (schema.id, schema.pack(value[0]), value[1], value[2])
+
+    if type(value) is list and value and (schema := _row_schema(value[0])) is not None:
+        if all(tuple(row) == schema.fields for row in value):
+            return PACKED_ROWS, _pack_rows(value, schema)
+
+    return None
+
+
+class CompactSerializer(BaseSerializer):
+    """django_redis serializer packing registered representations and pickling everything else."""
+
+    def dumps(self, value):
+        try:
+            packed = _pack(value)
+        except Unpackable:
+            packed = None
+
+        if packed is None:
+            tag, body = PICKLED, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        else:
+            tag, body = packed[0], marshal.dumps(packed[1], MARSHAL_VERSION)
+
+        if len(body) >= settings.CACHE_COMPRESS_MIN_BYTES:
+            compressed = zlib.compress(body)
+            if len(compressed) < len(body):
+                return bytes([tag | COMPRESSED]) + compressed
+        if tag == PICKLED:
+            return body
+        return bytes([tag]) + body
+
+    def loads(self, value):
+        tag = value[0]
+        if tag == _PICKLE_PROTOCOL:
+            return pickle.loads(value)
+
+        body = value[1:]
+        if tag & COMPRESSED:
+            tag, body = tag & ~COMPRESSED, zlib.decompress(body)
+        if tag == PICKLED:
+            return pickle.loads(body)
+
+        try:
+            return self._unpack(tag, marshal.loads(body))
+        except KeyError:
+            # Packed with a schema this process does not know: read as a miss.
+            return None
+
+    def _unpack(self, tag, packed):
+        schemas = _schemas_by_id()
+        if tag == PACKED_ROW:
+            schema_id, row = packed
+            return schemas[schema_id].unpack(row)
+        if tag == PACKED_ENVELOPE:
+            schema_id, row, expires_at, delta = packed
+            return schemas[schema_id].unpack(row), expires_at, delta
+        if tag == PACKED_ROWS:
+            return _unpack_rows(packed)
+        raise ValueError(f'Unknown cache entry tag {tag:#x}')
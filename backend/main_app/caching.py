@@ -0,0 +1,253 @@
+"""
+Generation-based cache namespaces, stampede-safe cache reads and cached JSON responses.
+
+A cached entry embeds the current generation of every namespace it depends on in
+its key. Invalidating a namespace increments its generation with a single INCR, so
+entries built on an older generation are never read again and age out on their
+own TTL, however many of them there are.
+"""
+import gzip
+import hashlib
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+CACHE_TIMEOUT = 60 * 5
+
+# Campaigns every user can see (active, completed and expired ones of other users).
+PUBLIC_CAMPAIGNS = 'campaigns:public'
+
+
+def user_campaigns(user_id):
+    """Return the namespace of the campaigns owned by a user."""
+    return f'campaigns:user:{user_id}'
+
+
+def user_donations(user_id):
+    """Return the namespace of the donations made by a user."""
+    return f'donations:user:{user_id}'
+
+
+def _generation_key(namespace):
+    return f'generation:{namespace}'
+
+
+def _initial_generation():
+    # A lost counter restarts from the clock rather than from zero, so it can never
+    # fall back to a generation that older, still cached entries were built on.
+    return time.time_ns()
+
+
+def get_generations(*namespaces):
+    """Return the current generation of each namespace, creating missing counters."""
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _initial_generation(), timeout=None)
+            generations[key] = cache.get(key)
+
+    return [generations[key] for key in keys]
+
+
+def versioned_key(name, *namespaces):
+    """Return a cache key for `name` that changes whenever one of the namespaces is invalidated."""
+    return ':'.join([name, *(str(generation) for generation in get_generations(*namespaces))])
+
+
+def invalidate_namespaces(*namespaces):
+    """Invalidate everything cached under the namespaces, with one INCR each."""
+    for namespace in dict.fromkeys(namespaces):
+        key = _generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), timeout=None)
+
+
+def _due(expires_at, delta):
+    """
+    Tell whether an entry should be rebuilt now.
+
+    Probabilistic early expiration ("XFetch"): the closer the entry is to expiring
+    and the longer it took to build, the likelier a read refreshes it ahead of time,
+    so a hot entry is rebuilt by one request before it expires for all of them.
+    """
+    return time.time() - delta * settings.CACHE_XFETCH_BETA * math.log(random.random() or 1e-12) >= expires_at
+
+
+def _envelope(entry):
+    """
+    Return the (value, expires_at, delta) envelope of a stored entry, or None for a miss.
+
+    Entries written before values were stored in envelopes share their keys, so
+    anything else found under a key is read as a miss and rebuilt.
+    """
+    if type(entry) is tuple and len(entry) == 3 and isinstance(entry[1], float) and isinstance(entry[2], float):
+        return entry
+    return None
+
+
+def _store(built, timeout, delta):
+    """Store built values with their logical expiry; they stay readable as stale values a while longer."""
+    expires_at = time.time() + timeout
+    cache.set_many(
+        {key: (value, expires_at, delta) for key, value in built.items() if value is not None},
+        timeout + settings.CACHE_STALE_TIMEOUT,
+    )
+
+
+def get_many_or_build(keys, build, timeout=CACHE_TIMEOUT):
+    """
+    Return {key: value} for `keys`, building missing and expiring entries with single flight.
+
+    `build(keys)` returns {key: value} for the keys it is given; None values are
+    returned but never cached. Only the request that takes a key's short lock rebuilds
+    it. Others keep serving the expired (stale) value while it is rebuilt, or, when
+    there is no value at all, for example right after an invalidation, wait briefly
+    for the rebuild and only build it themselves if it does not arrive in time.
+    """
+    entries = cache.get_many(keys)
+    values, refresh, missing = {}, [], []
+    for key in keys:
+        entry = _envelope(entries.get(key))
+        if entry is None:
+            missing.append(key)
+            continue
+        value, expires_at, delta = entry
+        values[key] = value
+        if _due(expires_at, delta):
+            refresh.append(key)
+
+    owned = [key for key in missing + refresh if cache.add(f'lock:{key}', 1, settings.CACHE_LOCK_TIMEOUT)]
+    if owned:
+        try:
+            started = time.monotonic()
+            built = build(owned)
+            _store(built, timeout, time.monotonic() - started)
+            values.update(built)
+        finally:
+            cache.delete_many([f'lock:{key}' for key in owned])
+
+    waiting = [key for key in missing if key not in values]
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while waiting and time.monotonic() < deadline:
+        time.sleep(0.05)
+        for key, entry in cache.get_many(waiting).items():
+            if (entry := _envelope(entry)) is not None:
+                values[key] = entry[0]
+        waiting = [key for key in waiting if key not in values]
+
+    if waiting:
+        started = time.monotonic()
+        built = build(waiting)
+        _store(built, timeout, time.monotonic() - started)
+        values.update(built)
+
+    return values
+
+
+def get_or_build(key, build, timeout=CACHE_TIMEOUT):
+    """Return the value cached under `key`, building it with `build()` as `get_many_or_build` does."""
+    return get_many_or_build([key], lambda keys: {key: build()}, timeout).get(key)
+
+
+def _etag_matches(request, etag):
+    """Compare `etag` with the request's If-None-Match, using the weak comparison it calls for."""
+    tags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
+
+
+def _accepts_gzip(request):
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+
+def _json_response(request, etag, body=None, gzipped=False):
+    """Respond with JSON bytes, passing gzipped bytes through as-is to clients that accept them."""
+    if body is None:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    elif gzipped and _accepts_gzip(request):
+        response = HttpResponse(body, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(body) if gzipped else body, content_type='application/json')
+
+    # Weak, since the gzipped and the plain bytes share it.
+    response['ETag'] = f'W/{etag}'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def _pack(content, compress=True):
+    """Return the ETag of JSON bytes and the bytes to keep, gzipped when they are large enough."""
+    etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    if compress and len(content) >= settings.CACHE_GZIP_MIN_BYTES:
+        return etag, gzip.compress(content, mtime=0), True
+    return etag, content, False
+
+
+def json_bytes_response(request, response):
+    """
+    Send a view response as JSON bytes with an ETag of those bytes; a matching If-None-Match gets 304.
+
+    Responses other than 200, and requests negotiating another renderer than JSON,
+    are returned unchanged.
+    """
+    if request.accepted_renderer.format != 'json' or response.status_code != status.HTTP_200_OK:
+        return response
+
+    etag, body, gzipped = _pack(JSONRenderer().render(response.data), compress=_accepts_gzip(request))
+    if _etag_matches(request, etag):
+        return _json_response(request, etag)
+    return _json_response(request, etag, body, gzipped)
+
+
+def cached_json_response(request, key, build, timeout=CACHE_TIMEOUT):
+    """
+    Serve a JSON response from rendered bytes cached under `key`.
+
+    The entry holds the final JSON bytes (gzipped past `CACHE_GZIP_MIN_BYTES`) with
+    their ETag, so a hit is sent without unpickling or rendering anything. The ETag is
+    also kept under a sibling key, so a conditional request is answered with 304 after
+    reading only the hash. `build()` produces the response on a miss; only 200
+    responses are cached, and requests negotiating another renderer than JSON (such as
+    the browsable API) bypass the cache.
+    """
+    if request.accepted_renderer.format != 'json':
+        return build()
+
+    etag_key = f'etag:{key}'
+    if 'If-None-Match' in request.headers:
+        etag = cache.get(etag_key)
+        if etag is not None and _etag_matches(request, etag):
+            return _json_response(request, etag)
+
+    uncacheable = []
+
+    def build_entry():
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            uncacheable.append(response)
+            return None
+        entry = _pack(JSONRenderer().render(response.data))
+        cache.set(etag_key, entry[0], timeout + settings.CACHE_STALE_TIMEOUT)
+        return entry
+
+    entry = get_or_build(key, build_entry, timeout)
+    if entry is None:
+        return uncacheable[0]
+
+    etag, body, gzipped = entry
+    if _etag_matches(request, etag):
+        return _json_response(request, etag)
+    return _json_response(request, etag, body, gzipped)
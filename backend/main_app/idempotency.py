@@ -0,0 +1,155 @@
+"""
+Idempotency-Key support for write endpoints.
+"""
+from functools import wraps
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework import status
+from rest_framework.response import Response
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Both only act on a lock still holding the caller's token, so a request whose lock
+# expired can neither extend nor release the lock another request took since.
+EXTEND_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class RequestLock:
+    """
+    A Redis lock owned by one request, identified by a random token.
+
+    While held it is extended every third of `IDEMPOTENCY_LOCK_TIMEOUT` from a
+    background thread, so it only expires when the worker holding it stops; the
+    timeout bounds how long a crashed request blocks its retries.
+    """
+
+    def __init__(self, name):
+        self.key = str(cache.make_key(name))
+        self.token = uuid.uuid4().hex
+        self._client = cache.client.get_client(write=True)
+        self._timeout_ms = int(settings.IDEMPOTENCY_LOCK_TIMEOUT * 1000)
+        self._released = threading.Event()
+        self._renewer = None
+
+    def acquire(self):
+        """Take the lock if it is free; returns whether it was taken."""
+        if not self._client.set(self.key, self.token, nx=True, px=self._timeout_ms):
+            return False
+        self._renewer = threading.Thread(target=self._renew, name='idempotency-lock', daemon=True)
+        self._renewer.start()
+        return True
+
+    def _renew(self):
+        while not self._released.wait(self._timeout_ms / 3000):
+            try:
+                if not self._client.eval(EXTEND_LOCK, 1, self.key, self.token, self._timeout_ms):
+                    return
+            except Exception:
+                logger.exception('Failed to extend an idempotency lock')
+
+    def release(self):
+        """Release the lock; returns False when it had expired and may have been taken by another request."""
+        self._released.set()
+        self._renewer.join()
+        return bool(self._client.eval(RELEASE_LOCK, 1, self.key, self.token))
+
+
+def idempotent(scope):
+    """
+    Make a view method replay its first response for a repeated `Idempotency-Key`.
+
+    The first request with a key runs the view while holding a `RequestLock` and
+    stores the response. Retries with the same key are answered from the cache without
+    running the view again; retries arriving while the first one is still running wait
+    for its result. Reusing a key with a different payload is rejected.
+    """
+
+    def decorator(view_method):
+
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(view, request, *args, **kwargs)
+
+            if len(key) > 255:
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            cache_key = f'idempotency_{scope}_{request.user.id}_{_digest(key)}'
+            fingerprint = _digest(json.dumps(request.data, sort_keys=True, default=str))
+
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+            while (stored := cache.get(cache_key)) is None:
+                lock = RequestLock(f'{cache_key}_lock')
+                if lock.acquire():
+                    try:
+                        # The previous holder may have stored its response since it was read above.
+                        if (stored := cache.get(cache_key)) is not None:
+                            break
+                        response = view_method(view, request, *args, **kwargs)
+                        if response.status_code < 500:
+                            stored = {
+                                'fingerprint': fingerprint,
+                                'status': response.status_code,
+                                'data': response.data,
+                            }
+                            cache.set(cache_key, stored, settings.IDEMPOTENCY_KEY_TTL)
+                        return response
+                    finally:
+                        if not lock.release():
+                            logger.warning(
+                                f'Idempotency lock of a {scope} request by {request.user.email} expired while it ran'
+                            )
+
+                if time.monotonic() >= deadline:
+                    logger.warning(f'Idempotent {scope} request by {request.user.email} is still in progress')
+                    return Response(
+                        {'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress.'},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                time.sleep(0.05)
+
+            if stored['fingerprint'] != fingerprint:
+                logger.warning(f'{IDEMPOTENCY_HEADER} reused with a different {scope} payload by {request.user.email}')
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+
+            response = Response(stored['data'], status=stored['status'])
+            response[REPLAYED_HEADER] = 'true'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,35 @@
+"""
+Django command to apply queued donations in batches.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from donation.models import QueuedDonation
+from donation.services import apply_queued_donations
+
+from main_app.caching import invalidate_namespaces, user_donations
+
+
+class Command(BaseCommand):
+    """Django command to drain the donation queue."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Queued donations applied per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when empty.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep on an empty queue.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        while True:
+            batch = apply_queued_donations(options['batch_size'])
+
+            if batch:
+                applied = [queued for queued in batch if queued.status == QueuedDonation.QueueStatusChoice.APPLIED]
+                invalidate_namespaces(*(user_donations(queued.user_id) for queued in applied))
+                self.stdout.write(f'Applied {len(applied)} of {len(batch)} queued donations.')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
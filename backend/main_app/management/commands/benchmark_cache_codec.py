@@ -0,0 +1,81 @@
+"""
+Django command to compare cached representation size and codec speed of pickle and the compact serializer.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from django_redis.serializers.pickle import PickleSerializer
+
+from campaign.models import Campaign
+from campaign.serializers import CampaignDetailSerializer, CampaignSerializer
+
+from main_app.cache_codec import CompactSerializer
+
+
+class Command(BaseCommand):
+    """Django command to benchmark bytes stored and encode/decode time per page of cached campaigns."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, action='append', help='Campaigns per page (repeatable).')
+        parser.add_argument('--iterations', type=int, default=200, help='Pages encoded and decoded per codec.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        codecs = (('pickle', PickleSerializer({})), ('compact', CompactSerializer({})))
+        for rows in options['rows'] or [1, 50, 200]:
+            for serializer_class in (CampaignSerializer, CampaignDetailSerializer):
+                # Entries as stored by the per-object cache: (representation, expires_at, build time).
+                entries = [(row, time.time() + 300, 0.004) for row in self._representations(rows, serializer_class)]
+                for label, codec in codecs:
+                    encode_ms, decode_ms, size = self._measure(codec, entries, options['iterations'])
+                    self.stdout.write(
+                        f'{serializer_class.__name__:>24} x{rows:<4} {label:>8}: {size:8} bytes/page, '
+                        f'encode {encode_ms:7.3f} ms/page, decode {decode_ms:7.3f} ms/page'
+                    )
+
+    def _measure(self, codec, entries, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            stored = [codec.dumps(entry) for entry in entries]
+        encode_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            loaded = [codec.loads(value) for value in stored]
+        decode_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        if loaded != entries:
+            raise AssertionError(f'{type(codec).__name__} does not round-trip the entries.')
+        return encode_ms, decode_ms, sum(len(value) for value in stored)
+
+    def _representations(self, count, serializer_class):
+        """Return varied representations shaped like the serializer's, without database rows."""
+        today = date.today()
+        rows = []
+        for index in range(count):
+            campaign = Campaign(
+                id=index + 1,
+                title=f'Campaign {index} for the community',
+                goal_amount=Decimal(1000 + index * 25),
+                raised_amount=Decimal(index * 7) + Decimal('0.99'),
+                status=Campaign.CampaignStatusChoice.ACTIVE,
+                deadline=today + timedelta(days=index),
+            )
+            row = dict(CampaignSerializer(campaign).data)
+            if serializer_class is CampaignDetailSerializer:
+                row.update({
+                    'user': index % 40 + 1,
+                    'description': 'Helping the community with food, shelter and education. ' * (index % 4 + 1),
+                    'created_at': (today - timedelta(days=index)).isoformat(),
+                    'image': f'/media/uploads/campaign/{index}.jpg' if index % 3 else None,
+                    'documents': [
+                        {'id': index * 2 + n, 'document': f'/media/uploads/documents/{index}-{n}.pdf',
+                         'uploaded_at': today.isoformat()}
+                        for n in range(index % 3)
+                    ],
+                })
+            rows.append(row)
+        return rows
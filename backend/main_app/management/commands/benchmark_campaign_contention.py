@@ -0,0 +1,79 @@
+"""
+Django command to measure donation throughput when many donors hit one campaign at once.
+"""
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from campaign.models import Campaign
+from campaign.services import rollup_counter_shards
+
+from donation.services import commit_donation
+
+
+class Command(BaseCommand):
+    """Django command to benchmark in-place and sharded campaign counters under contention."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--donors', type=int, default=32, help='Concurrent donors (one thread each).')
+        parser.add_argument('--donations', type=int, default=100, help='Donations per donor.')
+        parser.add_argument('--shards', type=int, default=16, help='Counter shards for the sharded run.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        donors, per_donor = options['donors'], options['donations']
+        amount = Decimal('1.00')
+        run_id = uuid.uuid4().hex
+        users = [
+            get_user_model().objects.create_user(
+                email=f'benchmark-{run_id}-{index}@example.com',
+                balance=amount * per_donor * 2,
+            ) for index in range(donors)
+        ]
+        try:
+            for label, shards in (('in-place', 0), (f'{options["shards"]} shards', options['shards'])):
+                campaign = Campaign.objects.create(
+                    user=users[0],
+                    title='Contention benchmark',
+                    description='Temporary campaign created by benchmark_campaign_contention.',
+                    goal_amount=amount * donors * per_donor * 10,
+                    status=Campaign.CampaignStatusChoice.ACTIVE,
+                )
+                elapsed = self._run(users, campaign, amount, per_donor, shards)
+                rollup_counter_shards()
+                campaign.refresh_from_db()
+
+                self.stdout.write(
+                    f'{label:>10}: {donors * per_donor / elapsed:10.1f} donations/sec '
+                    f'(raised {campaign.raised_amount} of {amount * donors * per_donor} expected)'
+                )
+        finally:
+            get_user_model().objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def _run(self, users, campaign, amount, per_donor, shards):
+        """Donate from every user concurrently and return the wall-clock time taken."""
+        barrier = threading.Barrier(len(users) + 1)
+
+        def donate(user):
+            target = Campaign(pk=campaign.pk)
+            try:
+                barrier.wait()
+                for _ in range(per_donor):
+                    commit_donation(user, target, amount, shards=shards)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=donate, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
@@ -0,0 +1,109 @@
+"""
+Django command to compare query plans of the campaign list with those of the fragments it is assembled from.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from campaign.models import Campaign
+
+PAGE_SIZE = 51
+
+GENERATE_CAMPAIGNS = """
+INSERT INTO campaign_campaign
+    (user_id, title, description, goal_amount, raised_amount, status, deadline, created_at)
+SELECT
+    (%(users)s::bigint[])[1 + n %% cardinality(%(users)s::bigint[])],
+    'Campaign ' || n,
+    'Benchmark campaign',
+    1000 + n %% 100000,
+    n %% 1000,
+    CASE
+        WHEN n::bigint * 7919 %% 1000 < %(public_share)s * 1000 THEN (ARRAY['AC', 'AC', 'AC', 'CO', 'EX'])[1 + n %% 5]
+        ELSE (ARRAY['OM', 'RE'])[1 + n %% 2]
+    END,
+    CURRENT_DATE + 1 + n %% 365,
+    CURRENT_DATE
+FROM generate_series(1, %(count)s) AS n
+"""
+
+
+class Command(BaseCommand):
+    """Django command to EXPLAIN an OR keyset page and the fragment builds replacing it; generated rows roll back."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=1000000, help='Campaigns generated.')
+        parser.add_argument('--owners', type=int, default=1000, help='Users the campaigns are spread over.')
+        parser.add_argument('--public-share', type=float, default=0.7, help='Share of campaigns with a public status.')
+        parser.add_argument(
+            '--depth', type=float, action='append',
+            help='Page positions measured, as a fraction of the id range (repeatable).',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            users = self._generate(options['campaigns'], options['owners'], options['public_share'])
+            user = users[0]
+            self.stdout.write(
+                f'{Campaign.objects.count()} campaigns, {Campaign.objects.filter(user=user).count()} owned by the user'
+            )
+
+            # The list is assembled from fragments; these are the queries building them when cold.
+            private = Campaign.objects.filter(user=user).exclude(status__in=Campaign.PUBLIC_STATUSES)
+            self._report('own private ids     ', private.order_by('-id').values_list('id').query)
+
+            bounds = Campaign.objects.aggregate(low=Min('id'), high=Max('id'))
+            bucket_size = settings.CAMPAIGN_FRAGMENT_BUCKET_SIZE
+            for depth in options['depth'] or [0, 0.5, 0.99]:
+                position = bounds['high'] + 1 - int((bounds['high'] - bounds['low']) * depth)
+                campaigns = Campaign.objects.filter(id__lt=position)
+                own = campaigns.filter(user=user)
+                public = campaigns.public().exclude(user=user)
+                self._report(f'OR page       at {depth:4.0%}', (own | public).order_by('-id')[:PAGE_SIZE].query)
+                index = (position - 1) // bucket_size
+                bucket = Campaign.objects.public().filter(
+                    id__gte=index * bucket_size, id__lt=(index + 1) * bucket_size,
+                )
+                self._report(f'public bucket at {depth:4.0%}', bucket.order_by('-id').values_list('id').query)
+
+            transaction.set_rollback(True)
+
+    def _generate(self, count, owners, public_share):
+        run_id = time.time_ns()
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'queries-benchmark-{run_id}-{index}@example.com') for index in range(owners)
+        ])
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(GENERATE_CAMPAIGNS, {
+                'users': [user.id for user in users], 'count': count, 'public_share': public_share,
+            })
+            cursor.execute('ANALYZE campaign_campaign')
+        self.stdout.write(f'Generated {count} campaigns in {time.perf_counter() - started:.1f} s')
+        return users
+
+    def _report(self, label, query):
+        sql, params = query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+            explained = cursor.fetchone()[0]
+        if isinstance(explained, str):
+            explained = json.loads(explained)
+
+        plan = explained[0]['Plan']
+        nodes = self._nodes(plan)
+        self.stdout.write(
+            f"{label}: {explained[0]['Execution Time']:8.2f} ms, "
+            f"{plan['Shared Hit Blocks'] + plan['Shared Read Blocks']:6} blocks, "
+            f"plan: {' > '.join(dict.fromkeys(node['Node Type'] for node in nodes))} "
+            f"({', '.join(sorted({node['Index Name'] for node in nodes if 'Index Name' in node}))})"
+        )
+
+    def _nodes(self, plan):
+        return [plan, *(node for child in plan.get('Plans', []) for node in self._nodes(child))]
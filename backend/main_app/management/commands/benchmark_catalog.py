@@ -0,0 +1,105 @@
+"""
+Django command to compare public campaign listing from the in-process catalog with the ORM.
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from campaign.catalog import CampaignCatalog
+from campaign.models import Campaign, CampaignChange
+
+QUERIES = (
+    (['AC'], '-id'),
+    (['AC'], '-raised_amount'),
+    (['AC', 'CO'], 'deadline'),
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark filtered, sorted catalog pages; generated rows are rolled back."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=50000, help='Public campaigns generated.')
+        parser.add_argument('--offset', type=int, action='append', help='Page offsets measured (repeatable).')
+        parser.add_argument(
+            '--changes', type=int, default=100, help='Campaigns changed before an incremental refresh.',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Times each page is read.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            campaigns = self._generate(options['campaigns'])
+            # Logged by this still open transaction, the inserts would be read again by every refresh.
+            CampaignChange.objects.all().delete()
+
+            catalog = CampaignCatalog()
+            started = time.perf_counter()
+            catalog.refresh(full=True)
+            self.stdout.write(f'Full build of {len(catalog.snapshot)} campaigns: {self._ms(started):.1f} ms')
+
+            for statuses, ordering in QUERIES:
+                for offset in options['offset'] or [0, options['campaigns'] // 4]:
+                    page = (statuses, ordering, offset)
+                    orm_ms = self._time(options['repeat'], lambda page=page: self._orm_page(*page))
+                    catalog_ms = self._time(
+                        options['repeat'], lambda page=page: self._catalog_page(catalog.snapshot, *page),
+                    )
+                    self.stdout.write(
+                        f'status={",".join(statuses):<6} ordering={ordering:<15} offset={offset:<7} '
+                        f'ORM {orm_ms:8.2f} ms/page, catalog {catalog_ms:8.3f} ms/page'
+                    )
+
+            for campaign_id in random.sample(campaigns, min(options['changes'], len(campaigns))):
+                Campaign.objects.filter(id=campaign_id).update(goal_amount=Decimal(random.randint(100, 100000)))
+            started = time.perf_counter()
+            catalog.refresh()
+            self.stdout.write(f"Incremental refresh after {options['changes']} changes: {self._ms(started):.1f} ms")
+
+            transaction.set_rollback(True)
+
+    def _generate(self, count):
+        user = get_user_model().objects.create_user(f'catalog-benchmark-{time.time_ns()}@example.com', 'benchmark')
+        today = timezone.now().date()
+        statuses = ['AC'] * 6 + ['CO', 'EX', 'OM']
+        created = Campaign.objects.bulk_create(
+            [
+                Campaign(
+                    user=user,
+                    title=f'Campaign {index}',
+                    description='Benchmark campaign',
+                    goal_amount=Decimal(random.randint(100, 100000)),
+                    raised_amount=Decimal(random.randint(0, 9999)),
+                    status=random.choice(statuses),
+                    deadline=today + timedelta(days=random.randint(1, 365)),
+                )
+                for index in range(count)
+            ],
+            batch_size=5000,
+        )
+        return [campaign.id for campaign in created]
+
+    def _orm_page(self, statuses, ordering, offset):
+        campaigns = Campaign.objects.filter(status__in=statuses)
+        count = campaigns.count()
+        tiebreak = '-id' if ordering.startswith('-') else 'id'
+        return count, list(campaigns.order_by(ordering, tiebreak).values_list('id', flat=True)[offset:offset + 50])
+
+    def _catalog_page(self, snapshot, statuses, ordering, offset):
+        selection = snapshot.select(statuses, ordering)
+        return len(selection), selection[offset:offset + 50]
+
+    def _time(self, repeat, read):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            read()
+        return self._ms(started) / repeat
+
+    def _ms(self, started):
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,68 @@
+"""
+Django command to measure donation throughput of the legacy and single-statement commit paths.
+"""
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from campaign.models import Campaign
+
+from donation.models import Donation
+from donation.services import commit_donation
+
+
+def legacy_commit_donation(user, campaign, amount):
+    """Replay the query sequence `DonationViewSet.create` used before `commit_donation`."""
+    with transaction.atomic():
+        donation = Donation.objects.create(user=user, campaign=campaign, amount=amount)
+        Campaign.objects.filter(pk=campaign.pk).update(raised_amount=F('raised_amount') + amount)
+        campaign.refresh_from_db()
+        campaign.save()
+        user.deduct_balance(amount)
+        user.refresh_from_db()
+    return donation
+
+
+class Command(BaseCommand):
+    """Django command to benchmark donation commits against the configured database."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--donations', type=int, default=1000, help='Donations to commit per path.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = options['donations']
+        amount = Decimal('1.00')
+        user = get_user_model().objects.create_user(
+            email=f'benchmark-{uuid.uuid4().hex}@example.com',
+            balance=amount * (count + 1) * 2,
+        )
+        try:
+            campaign = Campaign.objects.create(
+                user=user,
+                title='Donation benchmark',
+                description='Temporary campaign created by benchmark_donations.',
+                goal_amount=amount * count * 10,
+                status=Campaign.CampaignStatusChoice.ACTIVE,
+            )
+            for label, commit in (('legacy', legacy_commit_donation), ('single-statement', commit_donation)):
+                with CaptureQueriesContext(connection) as queries:
+                    commit(user, campaign, amount)
+
+                started = time.perf_counter()
+                for _ in range(count):
+                    commit(user, campaign, amount)
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f'{label:>16}: {count / elapsed:10.1f} donations/sec, '
+                    f'{len(queries)} queries per donation'
+                )
+        finally:
+            user.delete()
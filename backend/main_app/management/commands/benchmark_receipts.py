@@ -0,0 +1,73 @@
+"""
+Django command to compare receipt rendering speed and size of the legacy and precompiled renderers.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from campaign.models import Campaign
+
+from donation.models import Donation
+
+from main_app.receipt_engine import ReceiptTemplate
+from main_app.receipts import receipt_context
+from main_app.utils import generate_receipt
+
+
+class Command(BaseCommand):
+    """Django command to benchmark receipts/sec and bytes/receipt of both receipt renderers."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipts', type=int, default=500, help='Receipts rendered per renderer.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        donations = self._donations(options['receipts'])
+        contexts = [receipt_context(donation) for donation in donations]
+
+        started = time.perf_counter()
+        template = ReceiptTemplate()
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        runs = (
+            ('legacy', lambda: [generate_receipt(donation).getvalue() for donation in donations]),
+            ('engine', lambda: [template.render(context) for context in contexts]),
+        )
+        for label, render in runs:
+            started = time.perf_counter()
+            receipts = render()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:>6}: {len(receipts) / elapsed:8.1f} receipts/sec, '
+                f'{sum(len(receipt) for receipt in receipts) / len(receipts):8.0f} bytes/receipt'
+            )
+        self.stdout.write(f'Static layer compiled once in {compile_ms:.1f} ms.')
+
+    def _donations(self, count):
+        """Return unsaved donations with varied fields, so no database rows are needed."""
+        now = timezone.now()
+        donations = []
+        for index in range(count):
+            user = get_user_model()(
+                email=f'donor-{index}@example.com',
+                first_name='Donor' if index % 2 else '',
+                last_name=str(index),
+            )
+            campaign = Campaign(
+                user=user,
+                title=f'Campaign {index % 20}',
+                description='Helping the community with food, shelter and education. ' * (index % 4),
+                goal_amount=Decimal('10000.00'),
+            )
+            donations.append(Donation(
+                pk=index + 1,
+                user=user,
+                campaign=campaign,
+                amount=Decimal(index % 250) + Decimal('0.99'),
+                created_at=now - timedelta(days=index),
+            ))
+        return donations
@@ -0,0 +1,40 @@
+"""
+Django command to report cache hits, latency and payload sizes per key family.
+"""
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+
+def _format(value, pattern='{:.1%}'):
+    return 'n/a' if value is None else pattern.format(value)
+
+
+class Command(BaseCommand):
+    """Django command to report the cache statistics of all workers."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--family', action='append', help='Only report these key families.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        stats = cache.cache_stats()
+        tiers = stats['tiers']
+        self.stdout.write(
+            f"Reads: {tiers['local']} local, {tiers['redis']} Redis, {tiers['miss']} missed; "
+            f"local hit ratio {_format(tiers['local_hit_ratio'])}, "
+            f"Redis hit ratio {_format(tiers['redis_hit_ratio'])} "
+            f"(local max {tiers['local_max_entries']} entries per worker)."
+        )
+
+        self.stdout.write(
+            f"{'family':<24}{'reads':>10}{'hit':>8}{'local':>8}{'get ms':>9}{'sets':>8}{'set ms':>9}{'bytes':>9}"
+        )
+        for family, row in stats['families'].items():
+            if options['family'] and family not in options['family']:
+                continue
+            self.stdout.write(
+                f"{family:<24}{row['local'] + row['redis'] + row['miss']:>10}"
+                f"{_format(row['hit_ratio']):>8}{_format(row['local_hit_ratio']):>8}"
+                f"{_format(row['get_ms'], '{:.3f}'):>9}{row['sets']:>8}"
+                f"{_format(row['set_ms'], '{:.3f}'):>9}{_format(row['set_bytes'], '{:.0f}'):>9}"
+            )
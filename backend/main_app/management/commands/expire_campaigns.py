@@ -1,6 +1,7 @@
 """
 Django command to mark campaigns as expired once their deadline has passed.
 """
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils.timezone import now
 
@@ -17,9 +18,21 @@ class Command(BaseCommand):
                 Campaign.CampaignStatusChoice.ON_MODERATION,
             ]
         )
-        user_ids = list(qs.values_list('user_id', flat=True).distinct())
+        campaigns = list(qs.values_list('id', 'user_id'))
         count = qs.update(status=Campaign.CampaignStatusChoice.EXPIRED)
-        from main_app.utils import invalidate_cache
-        for uid in user_ids:
-            invalidate_cache(f'campaign_list_{uid}', f'my_campaigns_{uid}')
+        from campaign.representations import invalidate_campaign_representations
+        from main_app.caching import PUBLIC_CAMPAIGNS, invalidate_namespaces, user_campaigns
+        invalidate_campaign_representations(*(campaign_id for campaign_id, _ in campaigns))
+        invalidate_namespaces(PUBLIC_CAMPAIGNS, *(user_campaigns(uid) for _, uid in campaigns))
         self.stdout.write(f'Expired {count} campaigns.')
+
+        from campaign.catalog import prune_campaign_changes
+        self.stdout.write(f'Pruned {prune_campaign_changes()} campaign change log rows.')
+
+        from campaign.trending import prune_trending
+        self.stdout.write(f'Pruned {prune_trending()} ended campaigns from the trending rankings.')
+
+        if campaigns and settings.CACHE_WARM_ENABLED:
+            from campaign.warming import warm_campaign_caches
+            warmed = warm_campaign_caches([campaign_id for campaign_id, _ in campaigns])
+            self.stdout.write(f'Warmed {warmed} cached campaign representations.')
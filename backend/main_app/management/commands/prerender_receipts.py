@@ -0,0 +1,45 @@
+"""
+Django command to render and store the receipts of past donations with the receipt process pool.
+"""
+from datetime import date, datetime, time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from donation.models import Donation
+
+from main_app.receipt_renderer import get_renderer
+from main_app.receipts import load_or_render_receipts
+
+
+class Command(BaseCommand):
+    """Django command to backfill stored receipts."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=date.fromisoformat, help='Only donations created on or after this date (YYYY-MM-DD).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.RECEIPT_RENDER_BATCH_SIZE * settings.RECEIPT_RENDER_MAX_PENDING,
+            help='Donations loaded and sent to the renderer at once.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        donations = Donation.objects.select_related('user', 'campaign').order_by('id')
+        if options['since']:
+            donations = donations.filter(
+                created_at__gte=timezone.make_aware(datetime.combine(options['since'], time.min)),
+            )
+
+        donations = donations.iterator(chunk_size=options['batch_size'])
+        count = 0
+        try:
+            while batch := list(islice(donations, options['batch_size'])):
+                load_or_render_receipts(batch)
+                count += len(batch)
+                self.stdout.write(f'Receipts ready for {count} donations.')
+        finally:
+            get_renderer().shutdown()
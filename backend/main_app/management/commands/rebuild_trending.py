@@ -0,0 +1,15 @@
+"""
+Django command to rebuild the trending campaign rankings in Redis from the database.
+"""
+from django.core.management.base import BaseCommand
+
+from campaign.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    """Django command to fill the trending rankings after a cold start or a Redis flush."""
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = rebuild_trending()
+        self.stdout.write(f'Ranked {count} campaigns.')
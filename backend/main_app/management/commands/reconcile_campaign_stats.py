@@ -0,0 +1,47 @@
+"""
+Django command to check campaign donation statistics against the donations and fix any drift.
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from campaign.models import Campaign
+from campaign.services import STATS_FIELDS, reconcile_campaign_stats
+
+
+class Command(BaseCommand):
+    """Django command to recompute campaign donation statistics in id batches, each in its own transaction."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Campaign ids reconciled per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        bounds = Campaign.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write('No campaigns to reconcile.')
+            return
+
+        drift = Counter()
+        fixed = 0
+        for first_id in range(bounds['low'], bounds['high'] + 1, options['batch_size']):
+            last_id = first_id + options['batch_size'] - 1
+            with transaction.atomic():
+                drifted = reconcile_campaign_stats(first_id, last_id)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+
+            for campaign_id, previous, actual in drifted:
+                changes = [field for field in STATS_FIELDS if previous[field] != actual[field]]
+                drift.update(changes)
+                changed = ', '.join(f'{field} {previous[field]} -> {actual[field]}' for field in changes)
+                self.stdout.write(f'Campaign {campaign_id}: {changed}')
+            fixed += len(drifted)
+
+        for field in STATS_FIELDS:
+            self.stdout.write(f'{field}: {drift[field]} campaigns drifted.')
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(f'{verb} drifted statistics on {fixed} campaigns.')
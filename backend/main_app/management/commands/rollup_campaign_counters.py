@@ -0,0 +1,13 @@
+"""
+Django command to fold campaign counter shards back into the campaigns' raised amounts.
+"""
+from django.core.management.base import BaseCommand
+
+from campaign.services import rollup_counter_shards
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        count = rollup_counter_shards()
+        self.stdout.write(f'Rolled up counters for {count} campaigns.')
@@ -0,0 +1,24 @@
+"""
+Django command to rebuild the shared campaign caches.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from campaign.warming import warm_campaign_caches
+
+
+class Command(BaseCommand):
+    """Django command to warm the public campaign list and hot campaign details."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=settings.CACHE_WARM_PAGES, help='Public list pages to warm.')
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.CACHE_WARM_CONCURRENCY,
+            help='Threads rebuilding representations at once.',
+        )
+        parser.add_argument('--campaign', type=int, action='append', default=[], help='Also warm this campaign.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        warmed = warm_campaign_caches(options['campaign'], options['pages'], options['concurrency'])
+        self.stdout.write(f'Warmed {warmed} cached campaign representations.')
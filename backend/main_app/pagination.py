@@ -0,0 +1,62 @@
+"""
+Pagination classes for the project.
+"""
+from rest_framework.pagination import Cursor, CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on `-id`.
+
+    Every page is an index range scan starting after the last id of the previous one,
+    so page 10,000 costs the same as page 1. Pair it with an index ending in `id DESC`.
+    """
+    ordering = '-id'
+    cursor_query_param = 'cursor'
+
+    def get_keyset_response(self, request, fetch):
+        """
+        Return a paginated response for rows that are not read from a single queryset.
+
+        `fetch(position, reverse, limit)` returns up to `limit` serialized rows with ids
+        below `position`, newest first, or above it, oldest first, when `reverse` is set;
+        a `position` of None means the start of the list. Ids are unique, so cursors
+        only ever carry a position and never an offset.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        position = int(cursor.position) if cursor and cursor.position is not None else None
+        reverse = bool(cursor and cursor.reverse and position is not None)
+
+        rows = fetch(position, reverse, self.page_size + 1)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = position is not None if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+
+        return Response({
+            'next': self.encode_cursor(Cursor(0, False, rows[-1]['id'])) if rows and has_next else None,
+            'previous': self.encode_cursor(Cursor(0, True, rows[0]['id'])) if rows and has_previous else None,
+            'results': rows,
+        })
+
+
+class CatalogPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination for lists sorted by arbitrary fields in memory.
+
+    Works on any sequence supporting `len()` and slicing, such as a catalog selection.
+    """
+    max_limit = 100
+
+
+def page_cache_key(prefix, request):
+    """Build a cache key for one page of a paginated list."""
+    return f"{prefix}:{request.query_params.get(IdCursorPagination.cursor_query_param, '')}"
@@ -17,7 +17,7 @@ class IsCampaignManager(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        if obj.user == request.user:
+        if obj.user_id == request.user.id:
             return True
 
         if request.user.is_staff and request.method not in self.edit_methods:
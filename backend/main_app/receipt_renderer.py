@@ -0,0 +1,132 @@
+"""
+Bounded process pool that renders receipt PDFs off the request workers.
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import multiprocessing
+import threading
+import time
+
+from django.conf import settings
+
+from .receipt_engine import get_receipt_template, render_receipt, render_receipts
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RendererBusy(Exception):
+    """Raised when the renderer queue is full, or a render did not finish in time."""
+
+
+class ReceiptRenderer:
+    """
+    Render receipts in a pool of worker processes.
+
+    At most `max_pending` render tasks may be queued or running at once; further
+    submissions fail fast with `RendererBusy` (or wait for a free slot when
+    `block` is set), so a burst of downloads cannot pile up unbounded work.
+    Workers are started with the `spawn` method and only import the ReportLab
+    receipt engine, never Django. With `max_workers=0` receipts are rendered inline
+    in the calling process.
+    """
+
+    def __init__(self, max_workers, max_pending, timeout):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=get_receipt_template,
+                )
+            return self._executor
+
+    def _submit(self, fn, arg, block, deadline):
+        """Submit a task once a queue slot is free; the slot is released when the task is done."""
+        if block:
+            acquired = self._slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise RendererBusy('Receipt renderer queue is full.')
+
+        try:
+            future = self._get_executor().submit(fn, arg)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future, deadline):
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            future.cancel()
+            raise RendererBusy('Receipt rendering timed out.')
+
+    def render(self, context, block=False, timeout=None):
+        """Return the PDF bytes of one receipt."""
+        if not self.max_workers:
+            return render_receipt(context)
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        return self._result(self._submit(render_receipt, context, block, deadline), deadline)
+
+    def render_many(self, contexts, batch_size=None, block=True, timeout=None):
+        """
+        Return the PDF bytes of many receipts, in the order of `contexts`.
+
+        Contexts are sent to the workers in batches of `batch_size`, so each task
+        carries several receipts; `timeout` applies to each task.
+        """
+        contexts = list(contexts)
+        if not self.max_workers:
+            return render_receipts(contexts)
+
+        batch_size = batch_size or settings.RECEIPT_RENDER_BATCH_SIZE
+        timeout = timeout or self.timeout
+        futures, results = [], []
+        try:
+            for index in range(0, len(contexts), batch_size):
+                batch = contexts[index:index + batch_size]
+                futures.append(self._submit(render_receipts, batch, block, time.monotonic() + timeout))
+            for future in futures:
+                results.extend(self._result(future, time.monotonic() + timeout))
+            return results
+        except RendererBusy:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def shutdown(self):
+        """Stop the worker processes, dropping queued tasks."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    """Return the receipt renderer of this process, configured from settings."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ReceiptRenderer(
+                max_workers=settings.RECEIPT_RENDER_WORKERS,
+                max_pending=settings.RECEIPT_RENDER_MAX_PENDING,
+                timeout=settings.RECEIPT_RENDER_TIMEOUT,
+            )
+            logger.info(f'Receipt renderer configured with {settings.RECEIPT_RENDER_WORKERS} worker processes')
+        return _renderer
@@ -0,0 +1,197 @@
+"""
+Persistent store for rendered donation receipts.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from donation.models import Donation
+
+from .receipt_renderer import get_renderer
+from .utils import receipt_number
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the receipt layout changes, so stored receipts are rendered again.
+RECEIPT_TEMPLATE_VERSION = 1
+
+
+def receipt_fingerprint(donation):
+    """Return a hash of everything printed on the receipt; it names the stored file and serves as its ETag."""
+    parts = [
+        RECEIPT_TEMPLATE_VERSION,
+        donation.pk,
+        donation.amount,
+        donation.created_at.isoformat(),
+        donation.user.email,
+        donation.user.first_name,
+        donation.user.last_name,
+        donation.campaign.title,
+        donation.campaign.description,
+    ]
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def receipt_context(donation):
+    """Return the fields printed on the receipt of a donation."""
+    return {
+        'receipt_number': receipt_number(donation),
+        'created_at': timezone.localtime(donation.created_at),
+        'email': donation.user.email,
+        'name': f'{donation.user.first_name} {donation.user.last_name}'.strip(),
+        'campaign_title': donation.campaign.title,
+        'campaign_description': donation.campaign.description,
+        'amount': donation.amount,
+    }
+
+
+def receipt_path(fingerprint):
+    """Return the storage path of a rendered receipt."""
+    return f'receipts/{fingerprint[:2]}/{fingerprint}.pdf'
+
+
+def _load_receipt(path):
+    if not default_storage.exists(path):
+        return None
+    with default_storage.open(path, 'rb') as receipt_file:
+        return receipt_file.read()
+
+
+def _store_receipt(path, content):
+    """
+    Store a receipt under its content-addressed path; concurrent stores of it all end in one file.
+
+    On local storage the receipt is written to a temporary file and moved into place,
+    so readers never see it half written. Other storages pick a fresh name when the
+    path is taken by then; that copy is identical to the stored one and is deleted.
+    """
+    if default_storage.exists(path):
+        return
+    try:
+        full_path = default_storage.path(path)
+    except NotImplementedError:
+        saved = default_storage.save(path, ContentFile(content))
+        if saved != path:
+            default_storage.delete(saved)
+        return
+
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(full_path), suffix='.tmp', delete=False) as temporary:
+        try:
+            temporary.write(content)
+            temporary.close()
+            os.chmod(temporary.name, default_storage.file_permissions_mode or 0o644)
+            os.replace(temporary.name, full_path)
+        except BaseException:
+            os.unlink(temporary.name)
+            raise
+
+
+def load_or_render_receipt(donation, fingerprint=None, block=False):
+    """
+    Return the receipt PDF bytes, rendering and storing them on first use.
+
+    Rendering goes through the receipt process pool and raises `RendererBusy` when
+    its queue is full, unless `block` is set to wait for a free slot.
+    """
+    path = receipt_path(fingerprint or receipt_fingerprint(donation))
+
+    content = _load_receipt(path)
+    if content is None:
+        content = get_renderer().render(receipt_context(donation), block=block)
+        _store_receipt(path, content)
+
+    return content
+
+
+def load_or_render_receipts(donations):
+    """Return the receipt PDF bytes of several donations in order, rendering the missing ones as one batch."""
+    paths = [receipt_path(receipt_fingerprint(donation)) for donation in donations]
+    contents = [_load_receipt(path) for path in paths]
+
+    missing = [index for index, content in enumerate(contents) if content is None]
+    if missing:
+        rendered = get_renderer().render_many(receipt_context(donations[index]) for index in missing)
+        for index, content in zip(missing, rendered):
+            _store_receipt(paths[index], content)
+            contents[index] = content
+
+    return contents
+
+
+def prerender_receipts(donation_ids):
+    """Render and store the receipts of committed donations."""
+    close_old_connections()
+    try:
+        donations = list(Donation.objects.select_related('user', 'campaign').filter(pk__in=donation_ids))
+        load_or_render_receipts(donations)
+    except Exception:
+        logger.exception(f'Failed to pre-render receipts for donations {list(donation_ids)}')
+    finally:
+        close_old_connections()
+
+
+class PrerenderQueue:
+    """
+    Donations waiting for their receipts to be pre-rendered, drained by one background thread.
+
+    Holds at most `RECEIPT_PRERENDER_MAX_PENDING` donation ids and renders them in
+    batches of `RECEIPT_RENDER_BATCH_SIZE`. Ids arriving while it is full are dropped:
+    their receipts are rendered on first download instead.
+    """
+
+    def __init__(self):
+        self._ids = []
+        self._lock = threading.Lock()
+        self._draining = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='receipt-prerender')
+
+    def add(self, donation_ids):
+        """Queue donation ids for pre-rendering; returns how many were dropped because the queue is full."""
+        with self._lock:
+            room = max(settings.RECEIPT_PRERENDER_MAX_PENDING - len(self._ids), 0)
+            accepted = list(donation_ids[:room])
+            self._ids.extend(accepted)
+            start = bool(accepted) and not self._draining
+            self._draining = self._draining or start
+        if start:
+            self._executor.submit(self._drain)
+
+        dropped = len(donation_ids) - len(accepted)
+        if dropped:
+            logger.info(f'Receipt pre-render queue is full; dropped {dropped} donations')
+        return dropped
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                batch = self._ids[:settings.RECEIPT_RENDER_BATCH_SIZE]
+                del self._ids[:len(batch)]
+                if not batch:
+                    self._draining = False
+                    return
+            prerender_receipts(batch)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+_prerender_queue = PrerenderQueue()
+
+
+def schedule_receipt_prerender(*donation_ids):
+    """Pre-render receipts in the background once the current transaction commits."""
+    if not settings.RECEIPT_PRERENDER or not donation_ids:
+        return
+
+    transaction.on_commit(lambda: _prerender_queue.add(donation_ids))
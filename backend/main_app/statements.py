@@ -0,0 +1,229 @@
+"""
+Streaming exports of a donor's donations for a date range.
+"""
+from io import RawIOBase
+from itertools import islice
+import zipfile
+import zlib
+
+from django.conf import settings
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from .receipts import load_or_render_receipts
+from .utils import receipt_number
+
+
+class _ChunkBuffer(RawIOBase):
+    """Write-only, unseekable sink that hands out what was written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return b''.join(chunks)
+
+
+def stream_receipts_zip(donations):
+    """
+    Yield a ZIP archive of the donations' receipts chunk by chunk.
+
+    Receipts are loaded (or rendered by the receipt process pool) one batch at a
+    time, and only that batch is held in memory; the archive is written to an
+    unseekable buffer that is drained after every entry.
+    """
+    donations = iter(donations)
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        while batch := list(islice(donations, settings.RECEIPT_RENDER_BATCH_SIZE)):
+            for donation, content in zip(batch, load_or_render_receipts(batch)):
+                archive.writestr(f'receipt_{donation.id}.pdf', content)
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream_statement_pdf(user, donations, start, end):
+    """
+    Yield a multi-page PDF statement listing the donations, page by page.
+
+    Each page is written out as soon as it is full, so memory holds one page of rows
+    plus an offset per PDF object, however long the period.
+    """
+    yield from _draw_statement(_StreamingCanvas(letter), user, donations, start, end)
+
+
+class _StreamingCanvas:
+    """
+    The few canvas operations statements use, writing a PDF one finished page at a time.
+
+    A ReportLab canvas keeps every page until `save()`; here `showPage()` returns the
+    bytes of the finished page, and `save()` the page tree and cross-reference table,
+    which are written last. Text uses the standard Helvetica fonts, which PDF readers
+    provide, so nothing is embedded.
+    """
+
+    CATALOG, PAGES = 1, 2
+    FONTS = {'Helvetica': 3, 'Helvetica-Bold': 4}
+
+    def __init__(self, pagesize):
+        self.width, self.height = pagesize
+        self._position = 0
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = max(self.FONTS.values()) + 1
+        self._operations = []
+        self._font = None
+        self._pending = self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for name, number in self.FONTS.items():
+            self._pending += self._object(
+                number, f'<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>'.encode(),
+            )
+
+    def _write(self, data):
+        self._position += len(data)
+        return data
+
+    def _object(self, number, body):
+        self._offsets[number] = self._position
+        return self._write(f'{number} 0 obj\n'.encode() + body + b'\nendobj\n')
+
+    def _allocate(self):
+        number, self._next_id = self._next_id, self._next_id + 1
+        return number
+
+    def setFillColor(self, color):
+        self._operations.append(f'{color.red:.3f} {color.green:.3f} {color.blue:.3f} rg')
+
+    def setStrokeColor(self, color):
+        self._operations.append(f'{color.red:.3f} {color.green:.3f} {color.blue:.3f} RG')
+
+    def setFont(self, name, size):
+        self._font = (name, size)
+
+    def line(self, x1, y1, x2, y2):
+        self._operations.append(f'{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S')
+
+    def drawString(self, x, y, text):
+        name, size = self._font
+        encoded = text.encode('cp1252', errors='replace')
+        escaped = encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+        self._operations.append(
+            f'BT /F{self.FONTS[name]} {size} Tf {x:.2f} {y:.2f} Td ('.encode() + escaped + b') Tj ET'
+        )
+
+    def drawRightString(self, x, y, text):
+        self.drawString(x - stringWidth(text, *self._font), y, text)
+
+    def drawCentredString(self, x, y, text):
+        self.drawString(x - stringWidth(text, *self._font) / 2, y, text)
+
+    def showPage(self):
+        """Finish the current page and return its bytes, with anything written before it."""
+        content = zlib.compress(b'\n'.join(
+            operation if isinstance(operation, bytes) else operation.encode() for operation in self._operations
+        ))
+        self._operations = []
+        stream_id, page_id = self._allocate(), self._allocate()
+        self._page_ids.append(page_id)
+        fonts = ' '.join(f'/F{number} {number} 0 R' for number in self.FONTS.values())
+
+        chunk, self._pending = self._pending, b''
+        chunk += self._object(
+            stream_id,
+            f'<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n'.encode() + content + b'\nendstream',
+        )
+        chunk += self._object(page_id, (
+            f'<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {self.width:.2f} {self.height:.2f}] '
+            f'/Resources << /Font << {fonts} >> >> /Contents {stream_id} 0 R >>'
+        ).encode())
+        return chunk
+
+    def save(self):
+        """Return the page tree, catalog, cross-reference table and trailer closing the document."""
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        chunk = self._object(self.PAGES, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode())
+        chunk += self._object(self.CATALOG, f'<< /Type /Catalog /Pages {self.PAGES} 0 R >>'.encode())
+
+        xref_offset = self._position
+        size = self._next_id
+        entries = ''.join(
+            f'{self._offsets[number]:010d} 00000 n \n' if number in self._offsets else '0000000000 65535 f \n'
+            for number in range(1, size)
+        )
+        chunk += self._write((
+            f'xref\n0 {size}\n0000000000 65535 f \n{entries}'
+            f'trailer\n<< /Size {size} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'
+        ).encode())
+        return chunk
+
+
+def _draw_statement(p, user, donations, start, end):
+    """Draw the statement pages on `p`, yielding each finished page's bytes."""
+    width, height = letter
+    top, bottom, line_height = height - 2.3 * inch, inch, 0.25 * inch
+
+    def draw_page_header():
+        p.setFillColor(colors.darkblue)
+        p.setFont('Helvetica-Bold', 18)
+        p.drawCentredString(width / 2, height - inch, 'Donation Statement')
+        p.setStrokeColor(colors.darkblue)
+        p.line(inch / 2, height - 1.15 * inch, width - inch / 2, height - 1.15 * inch)
+
+        p.setFillColor(colors.black)
+        p.setFont('Helvetica', 11)
+        p.drawString(inch / 2, height - 1.5 * inch, f'Donor: {user.email}')
+        period = f"{start.strftime('%B %d, %Y')} - {end.strftime('%B %d, %Y')}"
+        p.drawString(inch / 2, height - 1.75 * inch, f'Period: {period}')
+
+        p.setFont('Helvetica-Bold', 10)
+        p.drawString(inch / 2, height - 2.05 * inch, 'Date')
+        p.drawString(1.7 * inch, height - 2.05 * inch, 'Receipt Number')
+        p.drawString(3.4 * inch, height - 2.05 * inch, 'Campaign')
+        p.drawRightString(width - inch / 2, height - 2.05 * inch, 'Amount')
+        p.setFont('Helvetica', 10)
+
+    total, count, y = 0, 0, top
+    draw_page_header()
+    for donation in donations:
+        if y < bottom:
+            yield p.showPage()
+            draw_page_header()
+            y = top
+
+        p.drawString(inch / 2, y, donation.created_at.strftime('%Y-%m-%d'))
+        p.drawString(1.7 * inch, y, receipt_number(donation))
+        p.drawString(3.4 * inch, y, donation.campaign.title[:45])
+        p.drawRightString(width - inch / 2, y, f'${donation.amount:.2f}')
+        total += donation.amount
+        count += 1
+        y -= line_height
+
+    if y < bottom + line_height:
+        yield p.showPage()
+        draw_page_header()
+        y = top
+
+    p.setFont('Helvetica-Bold', 11)
+    p.line(inch / 2, y + 0.1 * inch, width - inch / 2, y + 0.1 * inch)
+    p.drawString(inch / 2, y - 0.15 * inch, f'Total of {count} donation(s)')
+    p.drawRightString(width - inch / 2, y - 0.15 * inch, f'${total:.2f}')
+
+    p.setFont('Helvetica', 8)
+    p.setFillColor(colors.gray)
+    footer_text = 'This statement is automatically generated and may be used for tax purposes.'
+    p.drawCentredString(width / 2, inch / 2, footer_text)
+
+    yield p.showPage()
+    yield p.save()
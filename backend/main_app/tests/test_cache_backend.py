@@ -0,0 +1,175 @@
+"""
+Tests for the two-tier cache backend.
+"""
+import json
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from main_app.cache_backend import LocalTier, key_family
+from main_app.cache_codec import CompactSerializer
+
+CACHE_METRICS_URL = reverse('metrics:cache')
+
+
+def wait_for(condition, timeout=2):
+    """Poll until `condition()` holds or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TieredCacheTests(SimpleTestCase):
+    """Test the in-process tier in front of Redis."""
+
+    def setUp(self):
+        # Flush what earlier tests recorded first, so it is not counted after the clear.
+        cache.tier.flush_stats(cache.client.get_client())
+        cache.clear()
+        cache.get('campaign:warmup')
+        self.assertTrue(wait_for(lambda: cache.tier.connected))
+
+    def test_local_hit_skips_redis(self):
+        """Test a tiered key read twice goes to Redis once."""
+        cache.set('campaign:1', {'id': 1})
+        cache.tier.evict([cache.make_key('campaign:1')])
+        cache.get('campaign:1')
+
+        with patch('django_redis.cache.RedisCache.get') as redis_get:
+            self.assertEqual(cache.get('campaign:1'), {'id': 1})
+            self.assertEqual(cache.get_many(['campaign:1']), {'campaign:1': {'id': 1}})
+        redis_get.assert_not_called()
+
+    def test_untiered_key_reads_redis(self):
+        """Test keys outside the local prefixes are never kept in process."""
+        cache.set('lock:campaign:1', 1)
+
+        self.assertNotIn(cache.make_key('lock:campaign:1'), cache.tier._entries)
+        self.assertEqual(cache.get('lock:campaign:1'), 1)
+
+    def test_invalidation_from_other_worker(self):
+        """Test a write broadcast by another worker drops the local copy."""
+        cache.set('campaign:1', {'id': 1})
+        local_key = cache.make_key('campaign:1')
+        self.assertIn(local_key, cache.tier._entries)
+
+        cache.client.get_client().publish(cache.tier.channel, json.dumps(['other-worker', [local_key]]))
+
+        self.assertTrue(wait_for(lambda: local_key not in cache.tier._entries))
+
+    def test_stale_read_not_kept_after_invalidation(self):
+        """Test a value read from Redis before an invalidation arrived is not kept locally."""
+        cache.set('campaign:1', {'id': 1})
+        local_key = cache.make_key('campaign:1')
+        epoch = cache.tier.epoch
+        cache.tier.evict([local_key])
+
+        cache.tier.store(local_key, {'id': 1}, None, epoch)
+
+        self.assertNotIn(local_key, cache.tier._entries)
+
+    def test_incr_invalidates_local_copy(self):
+        """Test incrementing a generation counter drops its local copy."""
+        cache.set('generation:test', 1)
+        cache.incr('generation:test')
+
+        self.assertEqual(cache.get('generation:test'), 2)
+
+    @override_settings(CACHE_LOCAL_TIMEOUT=0.05)
+    def test_local_entry_expires(self):
+        """Test local entries expire after the local timeout."""
+        cache.set('campaign:1', {'id': 1})
+        local_key = cache.make_key('campaign:1')
+
+        time.sleep(0.1)
+
+        with patch('django_redis.cache.RedisCache.get', return_value={'id': 2}):
+            self.assertEqual(cache.get('campaign:1'), {'id': 2})
+        self.assertIn(local_key, cache.tier._entries)
+
+    def test_stats_per_key_family(self):
+        """Test reads and writes are counted per key family and flushed to the totals in Redis."""
+        cache.set('campaign_own_7:1', [])
+        cache.get('campaign_own_7:1')
+        cache.get_many(['campaign_own_7:1', 'donation_list_7:1'])
+        cache.tier.flush_stats(cache.client.get_client())
+
+        stats = cache.cache_stats()
+
+        own = stats['families']['campaign_own']
+        self.assertEqual((own['local'], own['miss'], own['sets']), (2, 0, 1))
+        self.assertEqual(own['hit_ratio'], 1)
+        self.assertGreater(own['set_bytes'], 0)
+        self.assertIsNotNone(own['get_ms'])
+        self.assertEqual(stats['families']['donation_list']['miss'], 1)
+        self.assertGreaterEqual(stats['tiers']['local'], 2)
+
+    def test_write_encodes_value_once(self):
+        """Test a write's payload size is measured from the bytes sent, without encoding the value again."""
+        value = {'id': 1, 'title': 'Campaign'}
+        with patch.object(
+            CompactSerializer, 'dumps', autospec=True, side_effect=CompactSerializer.dumps,
+        ) as dumps:
+            cache.set('campaign_own_7:1', value)
+        cache.tier.flush_stats(cache.client.get_client())
+
+        dumps.assert_called_once()
+        own = cache.cache_stats()['families']['campaign_own']
+        self.assertEqual(own['sets'], 1)
+        self.assertEqual(own['set_bytes'], len(cache.client.encode(value)))
+
+    def test_key_family(self):
+        """Test keys are grouped by their leading words."""
+        self.assertEqual(key_family('campaign_own_7:12'), 'campaign_own')
+        self.assertEqual(key_family('campaign:CampaignSerializer:v1:7'), 'campaign')
+        self.assertEqual(key_family('etag:donation_list_7:12:'), 'etag')
+        self.assertEqual(key_family('idempotency_donation_7_ab12'), 'idempotency_donation')
+
+
+class CacheMetricsApiTests(TestCase):
+    """Test the cache metrics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_metrics_for_staff(self):
+        """Test staff users get cache statistics."""
+        self.client.force_authenticate(get_user_model().objects.create_superuser('admin@example.com', 'pass12345'))
+
+        res = self.client.get(CACHE_METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('families', res.data)
+        self.assertIn('local_hit_ratio', res.data['tiers'])
+
+    def test_metrics_forbidden_for_users(self):
+        """Test other users cannot read cache statistics."""
+        self.client.force_authenticate(get_user_model().objects.create_user('user@example.com', 'pass12345'))
+
+        res = self.client.get(CACHE_METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LocalTierTests(SimpleTestCase):
+    """Test the bounds of the local tier."""
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is dropped past the size limit."""
+        tier = LocalTier('channel', 'stats', None, max_entries=2)
+        tier.connected, tier._listener = True, 'not started'
+
+        tier.store('a', 1, None, tier.epoch)
+        tier.store('b', 2, None, tier.epoch)
+        tier.fetch('a')
+        tier.store('c', 3, None, tier.epoch)
+
+        self.assertEqual(list(tier._entries), ['a', 'c'])
@@ -0,0 +1,115 @@
+"""
+Tests for stampede-safe cache reads.
+"""
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from main_app.caching import get_many_or_build, get_or_build
+
+
+class CacheBuildTests(SimpleTestCase):
+    """Test single-flight rebuilds of cached entries."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_miss_is_built_and_cached(self):
+        """Test a missing entry is built once and then served from the cache."""
+        build = Mock(return_value=[3, 2, 1])
+
+        self.assertEqual(get_or_build('ids', build), [3, 2, 1])
+        self.assertEqual(get_or_build('ids', build), [3, 2, 1])
+        build.assert_called_once()
+
+    def test_empty_value_is_a_hit(self):
+        """Test an empty list is cached like any other value."""
+        build = Mock(return_value=[])
+
+        self.assertEqual(get_or_build('ids', build), [])
+        self.assertEqual(get_or_build('ids', build), [])
+        build.assert_called_once()
+
+    def test_none_is_not_cached(self):
+        """Test a built None is returned but never cached."""
+        build = Mock(return_value=None)
+
+        self.assertIsNone(get_or_build('nothing', build))
+        self.assertIsNone(get_or_build('nothing', build))
+        self.assertEqual(build.call_count, 2)
+
+    def test_stale_value_served_while_rebuilt(self):
+        """Test an expired entry is served as is while another request holds its lock."""
+        cache.set('ids', ([1], time.time() - 1, 0.1))
+        cache.add('lock:ids', 1)
+        build = Mock(return_value=[2, 1])
+
+        self.assertEqual(get_or_build('ids', build), [1])
+        build.assert_not_called()
+
+    def test_expired_value_rebuilt_by_lock_owner(self):
+        """Test the request taking the lock rebuilds an expired entry and releases the lock."""
+        cache.set('ids', ([1], time.time() - 1, 0.1))
+
+        self.assertEqual(get_or_build('ids', lambda: [2, 1]), [2, 1])
+        self.assertIsNone(cache.get('lock:ids'))
+        self.assertEqual(get_or_build('ids', Mock()), [2, 1])
+
+    def test_early_refresh(self):
+        """Test a fresh entry is rebuilt ahead of its expiry when the XFetch draw says so."""
+        cache.set('ids', ([1], time.time() + 30, 1.0))
+        build = Mock(return_value=[2, 1])
+
+        with patch('main_app.caching.random.random', return_value=0.5):
+            self.assertEqual(get_or_build('ids', build), [1])
+        with patch('main_app.caching.random.random', return_value=1e-20):
+            self.assertEqual(get_or_build('ids', build), [2, 1])
+        build.assert_called_once()
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_missing_value_built_after_wait(self):
+        """Test a request waiting on another's rebuild builds the entry itself once the wait is over."""
+        cache.add('lock:ids', 1)
+        build = Mock(return_value=[1])
+
+        self.assertEqual(get_or_build('ids', build), [1])
+        build.assert_called_once()
+
+    def test_concurrent_misses_build_once(self):
+        """Test concurrent requests for a missing entry build it once and share the result."""
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return [1]
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_or_build('ids', build))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[1]] * 5)
+
+    def test_many_builds_only_missing(self):
+        """Test only the missing keys are passed to the build."""
+        get_many_or_build(['a'], lambda keys: {'a': 1})
+        build = Mock(return_value={'b': 2})
+
+        self.assertEqual(get_many_or_build(['a', 'b'], build), {'a': 1, 'b': 2})
+        build.assert_called_once_with(['b'])
+
+    def test_entries_from_before_envelopes_rebuilt(self):
+        """Test values stored without an envelope under the same keys are read as misses and rebuilt."""
+        for stored in ({'id': 1}, [3, 2, 1], ('"etag"', b'{}', False)):
+            cache.set('entry', stored)
+
+            self.assertEqual(get_or_build('entry', lambda: [4]), [4])
+            self.assertEqual(get_or_build('entry', Mock()), [4])
+            cache.delete('entry')
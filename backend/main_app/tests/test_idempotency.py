@@ -0,0 +1,89 @@
+"""
+Tests for Idempotency-Key support.
+"""
+from types import SimpleNamespace
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from main_app.idempotency import REPLAYED_HEADER, _digest, idempotent
+
+
+def make_request(key='payment-1'):
+    return SimpleNamespace(
+        headers={'Idempotency-Key': key},
+        data={'amount': '10.00'},
+        user=SimpleNamespace(id=7, email='donor@example.com'),
+    )
+
+
+class PaymentView:
+    """A view stand-in counting how often its write runs, with a hook run in the middle of it."""
+
+    def __init__(self, during=None):
+        self.runs = 0
+        self.during = during
+
+    @idempotent('payment')
+    def post(self, request):
+        self.runs += 1
+        if self.during:
+            self.during()
+        return Response({'paid': True}, status=status.HTTP_201_CREATED)
+
+
+def lock_key(request):
+    """Return the Redis key of the request's idempotency lock."""
+    digest = _digest(request.headers['Idempotency-Key'])
+    return str(cache.make_key(f'idempotency_payment_{request.user.id}_{digest}_lock'))
+
+
+@override_settings(IDEMPOTENCY_LOCK_TIMEOUT=0.3, IDEMPOTENCY_WAIT_TIMEOUT=0.2)
+class IdempotencyLockTests(SimpleTestCase):
+    """Test the lock held while the first request with a key runs."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lock_outlives_its_timeout_while_view_runs(self):
+        """Test a retry made after the lock timeout passed mid-view waits instead of running the view again."""
+        retries = []
+
+        def slow():
+            # Only the first run retries, so a retry that runs the view does not retry again.
+            if view.runs == 1:
+                time.sleep(0.6)
+                retries.append(view.post(make_request()))
+
+        view = PaymentView(during=slow)
+
+        res = view.post(make_request())
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retries[0].status_code, status.HTTP_409_CONFLICT)
+        replay = view.post(make_request())
+        self.assertEqual(replay[REPLAYED_HEADER], 'true')
+        self.assertEqual(view.runs, 1)
+
+    def test_expired_lock_taken_by_retry_not_released(self):
+        """Test a request whose lock expired mid-view leaves the lock a retry took since in place."""
+        request = make_request()
+        client = cache.client.get_client(write=True)
+        key = lock_key(request)
+
+        def lose_lock():
+            client.set(key, 'retry-token', px=30000)
+
+        view = PaymentView(during=lose_lock)
+
+        with self.assertLogs('main_app.idempotency', 'WARNING'):
+            view.post(request)
+
+        self.assertEqual(client.get(key), b'retry-token')
+        replay = view.post(make_request())
+        self.assertEqual(replay[REPLAYED_HEADER], 'true')
+        self.assertEqual(view.runs, 1)
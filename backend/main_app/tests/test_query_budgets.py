@@ -0,0 +1,128 @@
+"""
+Tests for the number of queries each endpoint and admin page makes.
+"""
+from decimal import Decimal
+from functools import partial
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from campaign.models import Campaign, CampaignDocument
+
+from donation.models import Donation, QueuedDonation
+
+# Rows of each kind shown by the pages below; every budget is smaller, so a query
+# per row cannot fit in it.
+ROWS = 8
+
+
+class QueryBudgetTests(TestCase):
+    """Test endpoints and admin pages stay within their query budgets whatever the number of rows."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.user = get_user_model().objects.create_user(
+            'donor@example.com', 'testpass123', balance=Decimal('1000.00'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        for index in range(ROWS):
+            owner = get_user_model().objects.create_user(f'owner{index}@example.com', 'testpass123')
+            campaign = Campaign.objects.create(
+                user=owner,
+                title=f'Campaign {index}',
+                description='Description',
+                goal_amount=Decimal('5000.00'),
+                status=Campaign.CampaignStatusChoice.ACTIVE,
+            )
+            CampaignDocument.objects.create(
+                campaign=campaign,
+                document=SimpleUploadedFile(f'document{index}.pdf', b'%PDF-1.4', content_type='application/pdf'),
+            )
+            Donation.objects.create(user=self.user, campaign=campaign, amount=Decimal('1.00'))
+            QueuedDonation.objects.create(user=self.user, campaign=campaign, amount=Decimal('1.00'))
+            own_campaign = Campaign.objects.create(
+                user=self.user, title=f'Own campaign {index}', description='Description', goal_amount=Decimal('100'),
+            )
+        self.campaign, self.own_campaign = campaign, own_campaign
+
+    def assertQueryBudget(self, budget, request):
+        """Assert `request()` succeeds within `budget` queries, counting those made while streaming."""
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(
+            len(queries), budget,
+            '\n'.join(f'{index}. {query["sql"]}' for index, query in enumerate(queries.captured_queries, start=1)),
+        )
+        return response
+
+    def test_campaign_endpoints(self):
+        """Test campaign endpoints stay within their query budgets."""
+        detail = reverse('campaign:campaign-detail', args=[self.campaign.id])
+        own_detail = reverse('campaign:campaign-detail', args=[self.own_campaign.id])
+        budgets = [
+            (4, partial(self.client.get, reverse('campaign:campaign-list'))),
+            (0, partial(self.client.get, reverse('campaign:campaign-list'))),
+            (1, partial(self.client.get, reverse('campaign:campaign-my-campaigns'))),
+            (2, partial(self.client.get, reverse('campaign:campaign-public'))),
+            (3, partial(self.client.get, detail)),
+            (1, partial(self.client.get, detail)),
+            (3, partial(self.client.patch, own_detail, {'title': 'Renamed'})),
+        ]
+        for budget, request in budgets:
+            self.assertQueryBudget(budget, request)
+
+    def test_donation_endpoints(self):
+        """Test donation endpoints stay within their query budgets."""
+        donation = Donation.objects.first()
+        day = donation.created_at.date()
+        budgets = [
+            (1, partial(self.client.get, reverse('donation:donation-list'))),
+            (2, partial(self.client.post, reverse('donation:donation-list'), {
+                'campaign': self.campaign.id, 'amount': '1.00',
+            })),
+            (6, partial(self.client.post, reverse('donation:donation-bulk'), [
+                {'campaign': self.campaign.id, 'amount': '1.00'} for _ in range(ROWS)
+            ], format='json')),
+            (1, partial(self.client.get, reverse('donation:donation-receipt', args=[donation.id]))),
+            (1, partial(
+                self.client.get, reverse('donation:donation-statement'), {'start': day, 'end': day, 'output': 'zip'},
+            )),
+        ]
+        for budget, request in budgets:
+            self.assertQueryBudget(budget, request)
+
+    def test_admin_pages(self):
+        """Test admin list and change pages stay within their query budgets."""
+        self.client.force_login(get_user_model().objects.create_superuser('admin@example.com', 'testpass123'))
+        budgets = [
+            (4, 'admin:campaign_campaign_changelist', []),
+            (8, 'admin:campaign_campaign_change', [self.campaign.id]),
+            (4, 'admin:campaign_campaigndocument_changelist', []),
+            (4, 'admin:donation_donation_changelist', []),
+            (4, 'admin:donation_queueddonation_changelist', []),
+            (5, 'admin:user_user_changelist', []),
+        ]
+        for budget, name, args in budgets:
+            response = self.assertQueryBudget(budget, partial(self.client.get, reverse(name, args=args)))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
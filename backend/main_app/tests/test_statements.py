@@ -0,0 +1,60 @@
+"""
+Tests for the streaming donation statements.
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+import re
+
+from django.test import SimpleTestCase
+
+from main_app.statements import stream_statement_pdf
+
+USER = SimpleNamespace(email='donor@example.com')
+DAY = date(2026, 10, 1)
+
+
+def donations(count, consumed):
+    """Yield `count` donation stand-ins, recording how many were read in `consumed`."""
+    for index in range(count):
+        consumed.append(index)
+        yield SimpleNamespace(
+            pk=index + 1,
+            created_at=datetime(2026, 10, 1, 12, tzinfo=timezone.utc),
+            campaign=SimpleNamespace(title='Clean water (wells) \\ pumps – café'),
+            amount=Decimal('12.50'),
+        )
+
+
+class StatementPdfTests(SimpleTestCase):
+    """Test PDF statements are written out page by page."""
+
+    def test_pages_streamed_as_they_fill(self):
+        """Test the first page is sent before the later rows are read."""
+        consumed = []
+        chunks = stream_statement_pdf(USER, donations(200, consumed), DAY, DAY)
+
+        first = next(chunks)
+
+        self.assertTrue(first.startswith(b'%PDF-1.4'))
+        self.assertIn(b'/Type /Page ', first)
+        self.assertLess(len(consumed), 50)
+        self.assertGreater(len(list(chunks)), 3)
+
+    def test_cross_reference_table(self):
+        """Test every object is found at the offset the cross-reference table gives for it."""
+        consumed = []
+        pdf = b''.join(stream_statement_pdf(USER, donations(120, consumed), DAY, DAY))
+
+        startxref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', pdf).group(1))
+        self.assertTrue(pdf[startxref:].startswith(b'xref\n0 '))
+        size = int(re.search(rb'/Size (\d+)', pdf).group(1))
+        entries = re.findall(rb'(\d{10}) 00000 n ', pdf[startxref:])
+        self.assertEqual(len(entries), size - 1)
+        for number, offset in enumerate(entries, start=1):
+            self.assertTrue(pdf[int(offset):].startswith(f'{number} 0 obj\n'.encode()))
+
+        pages = re.search(rb'/Type /Pages /Kids \[([^\]]*)\] /Count (\d+)', pdf)
+        self.assertEqual(len(pages.group(1).split(b' R')) - 1, int(pages.group(2)))
+        self.assertEqual(int(pages.group(2)), pdf.count(b'/Type /Page '))
+        self.assertEqual(len(consumed), 120)
@@ -0,0 +1,12 @@
+"""
+URL mappings for operational metrics.
+"""
+from django.urls import path
+
+from .views import CacheMetricsView
+
+app_name = 'metrics'
+
+urlpatterns = [
+    path('cache/', CacheMetricsView.as_view(), name='cache'),
+]
@@ -1,6 +1,4 @@
 """Utils functions for the projects."""
-from django.core.cache import cache
-
 from io import BytesIO
 import textwrap
 
@@ -11,7 +9,10 @@ from reportlab.lib.units import inch
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.platypus import Paragraph
 
-from django.utils.timezone import now
+
+def receipt_number(donation):
+    """Return the stable receipt number of a donation."""
+    return f"REC-{donation.pk}-{donation.created_at.strftime('%Y%m%d')}"
 
 
 def generate_receipt(donation):
@@ -21,8 +22,6 @@ def generate_receipt(donation):
     width, height = letter
     p = canvas.Canvas(buffer, pagesize=letter)
 
-    receipt_number = f"REC-{donation.pk}-{now().strftime('%Y%m%d%H%M%S')}"
-
     styles = getSampleStyleSheet()
     header_style = ParagraphStyle('Header', parent=styles['Heading1'], fontSize=18, alignment=1, spaceAfter=0.2 * inch)
 
@@ -37,7 +36,7 @@ def generate_receipt(donation):
 
     p.setFillColor(colors.black)
     p.setFont('Helvetica-Bold', 12)
-    p.drawString(inch / 2, height - 1.5 * inch, f'Receipt Number: {receipt_number}')
+    p.drawString(inch / 2, height - 1.5 * inch, f'Receipt Number: {receipt_number(donation)}')
     p.drawString(inch / 2, height - 1.8 * inch, f"Date: {donation.created_at.strftime('%B %d, %Y at %I:%M %p')}")
 
     p.setFont('Helvetica-Bold', 12)
@@ -84,9 +83,3 @@ def generate_receipt(donation):
     p.save()
     buffer.seek(0)
     return buffer
-
-
-def invalidate_cache(*args):
-    """Clear campaign-related cache."""
-    for key in args:
-        cache.delete(key)
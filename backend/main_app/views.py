@@ -0,0 +1,19 @@
+"""
+Views for operational metrics.
+"""
+from django.core.cache import cache
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class CacheMetricsView(APIView):
+    """Report cache hits, latency and payload sizes per key family, for staff users."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.cache_stats())
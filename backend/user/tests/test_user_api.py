@@ -185,3 +185,17 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.user.refresh_from_db()
         self.assertEqual(self.user.balance, new_balance)
+
+    def test_topping_up_idempotent(self):
+        """Test retrying a top-up with the same Idempotency-Key applies it once."""
+        payload = {'amount': '100'}
+        headers = {'Idempotency-Key': 'top-up-1'}
+
+        first = self.client.post(TOP_UP_URL, payload, headers=headers)
+        retry = self.client.post(TOP_UP_URL, payload, headers=headers)
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('100'))
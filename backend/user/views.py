@@ -9,6 +9,8 @@ from rest_framework.exceptions import ValidationError
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from main_app.idempotency import idempotent
+
 from .serializers import TopUpSerializer, UserProfileSerializer, UserSerializer
 
 import logging
@@ -48,6 +50,7 @@ class TopUpView(generics.CreateAPIView):
         user.add_balance(amount)
         logger.info(f'Balance updated for {user.email}. New balance: {user.balance}')
 
+    @idempotent('top_up')
     def create(self, request, *args, **kwargs):
         """Wrap creation to handle custom response and errors."""
         try: